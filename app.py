@@ -1,20 +1,27 @@
 import os
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+import io
+import sys
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session
 from collections import defaultdict
-from datetime import datetime
+from datetime import datetime, timedelta
 from flask_bcrypt import Bcrypt
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from insights import generate_insights
-from nlp.analysis import analyze_text
-from nlp.task_extractor import extract_tasks
-from nlp.scorer import custom_productivity_score
+from nlp.pipeline import analyze_entry, warm_up as warm_up_nlp
+from nlp.cache import nlp_cache
+from nlp.analysis_queue import ASYNC_ANALYSIS, analysis_queue, run_entry_analysis
 from flask_mail import Mail, Message
 from nlp.summarizer import generate_rule_based_summary
-from database.db import get_entries_for_period
+from database.db import get_entries_for_period, period_start, get_data_version, get_summary_from_cache, save_summary_to_cache
+from utils.cache import TTLCache
+from database.instrumentation import start_counting, current_round_trips
 import threading
 from werkzeug.utils import secure_filename
-from nlp.media_analyzer import transcribe_audio_local
+from nlp.media_analyzer import warm_up as warm_up_audio
+from nlp.audio_jobs import audio_jobs, AUDIO_UPLOAD_DIR
+from utils.uploads import UploadTooLarge, save_upload, remove_quietly
 from prompts import generate_prompt
+from database.journal_import import import_entries, detect_format, iter_records
 import subprocess
 
 
@@ -30,11 +37,11 @@ app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_USERNAME')
 
 mail = Mail(app) 
 from database.db import (
-    init_db, add_entry, add_task, update_task_status,
-    get_all_entries_sorted_asc, get_pending_tasks, 
-    get_tasks_with_entry_info, get_chart_data, get_tasks_for_entry_ids,
+    init_db, add_entry_with_tasks, update_task_status,
+    get_entry_days_page, get_dashboard_data, get_tasks_for_entry_ids,
     execute_aggregation, get_entries_and_tasks_for_date,
-    delete_entries_and_tasks
+    delete_entries_and_tasks, add_pending_entry, get_entry_analysis, get_audio_job, find_audio_job_by_hash,
+    clamp_tz_offset, local_date
 )
 from models import User
 
@@ -42,15 +49,65 @@ app.config['SECRET_KEY'] = 'a_very_secret_and_long_random_string_for_security'
 
 bcrypt = Bcrypt(app)
 login_manager = LoginManager(app)
+# "db" (default) loads users through the in-process cache in models.py;
+# "session" rebuilds them from fields kept in the signed session cookie, so
+# authenticated requests need no user lookup at all.
+USER_SESSION_MODE = os.getenv('USER_SESSION_MODE', 'db').lower()
+
 @login_manager.user_loader
 def load_user(user_id):
-    """Required by Flask-Login to load the current user from the database."""
+    """Required by Flask-Login to load the current user."""
+    if USER_SESSION_MODE == 'session':
+        user = User.from_session(session.get('user'), user_id)
+        if user is not None:
+            return user
+        # Sessions from before session mode was enabled: look up once, then store
+        user = User.find_by_id(user_id)
+        if user is not None:
+            session['user'] = user.to_session()
+        return user
     return User.find_by_id(user_id)
 login_manager.login_view = 'login' 
 login_manager.login_message_category = 'info'
 
 init_db() 
 
+# Heavy models load lazily on first use. WARM_UP_MODELS=nlp loads the mood
+# analyzers at startup; "all" also loads Whisper and the audio stack.
+WARM_UP_MODELS = os.getenv('WARM_UP_MODELS', 'none').lower()
+
+def warm_up_models(level=None):
+    level = level or WARM_UP_MODELS
+    if level in ('nlp', 'all'):
+        warm_up_nlp()
+    if level == 'all':
+        warm_up_audio()
+
+warm_up_models()
+
+# Count MongoDB round trips per request; reported in X-DB-Round-Trips and,
+# with LOG_DB_ROUND_TRIPS=true, printed for each request.
+LOG_DB_ROUND_TRIPS = os.getenv('LOG_DB_ROUND_TRIPS', 'False').lower() in ['true', '1', 't']
+
+@app.before_request
+def count_db_round_trips():
+    start_counting()
+
+@app.after_request
+def report_db_round_trips(response):
+    counter = current_round_trips()
+    if counter is not None:
+        response.headers['X-DB-Round-Trips'] = str(counter.count)
+        response.headers['Server-Timing'] = f"db;desc=\"{counter.count} round trips\";dur={counter.seconds * 1000:.1f}"
+        if LOG_DB_ROUND_TRIPS and counter.count:
+            print(f"{request.method} {request.path}: {counter.count} DB round trips "
+                  f"({counter.seconds * 1000:.1f} ms) {counter.commands}")
+    # This worker's NLP result cache counters since it started
+    cache = nlp_cache.stats()
+    response.headers['X-NLP-Cache'] = (f"hits={cache['hits']}; misses={cache['misses']}; "
+                                       f"persistent-hits={cache['persistent_hits']}; hit-rate={cache['hit_rate']}")
+    return response
+
 @app.route("/login", methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
@@ -59,6 +116,8 @@ def login():
         user = User.find_by_email(request.form.get('email'))
         if user and bcrypt.check_password_hash(user.password_hash, request.form.get('password')):
             login_user(user)
+            if USER_SESSION_MODE == 'session':
+                session['user'] = user.to_session()
             next_page = request.args.get('next')
             return redirect(next_page) if next_page else redirect(url_for('index'))
         else:
@@ -84,36 +143,32 @@ def register():
 @login_required
 def logout():
     logout_user()
+    session.pop('user', None)
     return redirect(url_for('login'))
 
  
 
-@app.route("/")
-@login_required
-def index():
-    user_id = current_user.get_id()
-    raw_entries = get_all_entries_sorted_asc(user_id)
-    pending_tasks = get_pending_tasks(user_id)
-    recent_tasks = get_tasks_with_entry_info(user_id, completed_status=None, limit=5)
-    completed_tasks = get_tasks_with_entry_info(user_id, completed_status=True, limit=5)
-    chart_data = get_chart_data(user_id, limit=30)
-    
+# Number of day panels rendered with the dashboard; older days load on scroll
+DASHBOARD_DAYS = int(os.getenv('DASHBOARD_DAYS', 14))
+mood_score_map = {"negative": -1, "neutral": 0, "positive": 1}
+
+def build_day_panels(user_id, raw_entries, all_tasks=None):
+    """Groups a page of entries (newest day first) into the dashboard's per-day panels."""
     grouped = defaultdict(list)
     for entry in raw_entries:
         grouped[entry['date']].append(entry)
 
-    entries_by_day = []
-    mood_score_map = {"negative": -1, "neutral": 0, "positive": 1}
-    all_entry_ids = [entry['_id'] for entry in raw_entries]
-    all_tasks = get_tasks_for_entry_ids(user_id, all_entry_ids)
-    
+    if all_tasks is None:
+        all_entry_ids = [entry['_id'] for entry in raw_entries]
+        all_tasks = get_tasks_for_entry_ids(user_id, all_entry_ids, {"entry_id": 1, "task_text": 1})
     tasks_by_entry_id = defaultdict(list)
     for task in all_tasks:
         tasks_by_entry_id[task['entry_id']].append(task['task_text'])
 
+    entries_by_day = []
     for date, items in grouped.items():
         moods = [e['mood'] for e in items]
-        prod_scores = [e['productivity'] for e in items]
+        prod_scores = [e['productivity'] for e in items if e.get('productivity') is not None]
         mood_numeric = [mood_score_map.get(m, 0) for m in moods]
         avg_mood_score = sum(mood_numeric) / len(mood_numeric) if mood_numeric else 0
         avg_prod_score = sum(prod_scores) / len(prod_scores) if prod_scores else 0
@@ -125,17 +180,40 @@ def index():
             "tasks_for_day": tasks_for_day
         })
     entries_by_day.sort(key=lambda x: x["date"], reverse=True)
+    return entries_by_day
 
-    weekly_mood = {}  
-    for date, items in grouped.items():
-        moods = [e['mood'] for e in items]
-        mood_numeric = [mood_score_map.get(m, 0) for m in moods]
-        if mood_numeric: weekly_mood[date] = round(sum(mood_numeric) / len(mood_numeric), 2)
+@app.route("/")
+@login_required
+def index():
+    user_id = current_user.get_id()
+    data = get_dashboard_data(user_id, days=DASHBOARD_DAYS, chart_limit=30, task_limit=5)
+    chart_data = data["chart_data"]
+
+    entries_by_day = build_day_panels(user_id, data["entries"], data["entry_tasks"])
+    weekly_mood = {row["date"]: round(row["avg_mood"], 2) for row in chart_data}
 
     return render_template("index.html", entries_by_day=entries_by_day,
-                           pending_tasks=pending_tasks, recent_tasks=recent_tasks,
-                           completed_tasks=completed_tasks, chart_data=chart_data,
-                           weekly_mood=weekly_mood)
+                           pending_tasks=data["pending_tasks"], recent_tasks=data["recent_tasks"],
+                           completed_tasks=data["completed_tasks"], chart_data=chart_data,
+                           weekly_mood=weekly_mood, next_cursor=data["next_cursor"])
+
+@app.route("/api/entry_days")
+@login_required
+def api_entry_days():
+    """Older day panels for the dashboard, keyset-paginated by date (?before=YYYY-MM-DD&days=N)."""
+    user_id = current_user.get_id()
+    before = request.args.get('before')
+    days = min(max(request.args.get('days', DASHBOARD_DAYS, type=int), 1), 90)
+    raw_entries, next_cursor = get_entry_days_page(user_id, days=days, before=before)
+    panels = [{
+        "date": day["date"],
+        "url": url_for('day_view', date=day["date"]),
+        "avg_mood_score": day["avg_mood_score"],
+        "avg_productivity": day["avg_productivity"],
+        "entry_count": len(day["entries"]),
+        "tasks": [task for item in day["tasks_for_day"] for task in item["tasks"]],
+    } for day in build_day_panels(user_id, raw_entries)]
+    return jsonify({"days": panels, "next_cursor": next_cursor})
 
 @app.route("/submit_journal_ajax", methods=["POST"])
 @login_required
@@ -143,15 +221,42 @@ def submit_journal_ajax():
     user_id = current_user.get_id()
     data = request.get_json()
     text = data["journal"]
-    analysis = analyze_text(text)
-    prod_score = custom_productivity_score(text)
+    # The browser sends its UTC offset so the entry lands on the user's local day
+    tz_offset = clamp_tz_offset(data.get("tz_offset"))
+    date = local_date(tz_offset)
+
+    if ASYNC_ANALYSIS:
+        # Persist the raw entry now; the analysis pool fills in the results.
+        entry_id = add_pending_entry(user_id, date, text, tz_offset=tz_offset)
+        if entry_id and analysis_queue.submit(user_id, entry_id, text):
+            return jsonify({"entry_id": str(entry_id), "status": "pending", "date": date}), 202
+        if entry_id:
+            # Queue is full: analyse inline rather than dropping the work.
+            try:
+                result = run_entry_analysis(user_id, entry_id, text)
+            except Exception as e:
+                return jsonify({"entry_id": str(entry_id), "status": "failed", "error": str(e), "date": date}), 500
+            return jsonify({"entry_id": str(entry_id), "status": "done", "mood": result['mood'],
+                            "productivity": result['productivity'], "date": date, "tasks": result['tasks']})
+
+    result = analyze_entry(text)
+    prod_score = result['productivity']
+    tasks = result['tasks']
     
-    entry_id = add_entry(user_id, datetime.now().strftime('%Y-%m-%d'), text, analysis['mood'], prod_score)
-    tasks = extract_tasks(text)
-    if entry_id and tasks:
-        for task in tasks:
-            add_task(user_id, entry_id, task)
-    return jsonify({"mood": analysis['mood'], "productivity": prod_score, "date": datetime.now().strftime('%Y-%m-%d'), "tasks": tasks})
+    add_entry_with_tasks(user_id, date, text, result['mood'], prod_score, tasks, tz_offset=tz_offset)
+    return jsonify({"mood": result['mood'], "productivity": prod_score, "date": date, "tasks": tasks})
+
+@app.route("/api/entry_status/<string:entry_id>")
+@login_required
+def entry_status(entry_id):
+    """Reports an entry's analysis state; once done, returns the same shape as the submit response."""
+    entry = get_entry_analysis(current_user.get_id(), entry_id)
+    if entry is None:
+        return jsonify({"error": "Entry not found."}), 404
+    response = {"entry_id": entry_id, "status": entry["analysis_status"], "date": entry.get("date")}
+    if entry["analysis_status"] == "done":
+        response.update({"mood": entry.get("mood"), "productivity": entry.get("productivity"), "tasks": entry["tasks"]})
+    return jsonify(response)
 
 @app.route('/complete_task/<string:task_id>', methods=['POST'])
 @login_required
@@ -170,23 +275,29 @@ def api_chart_data(period):
     user_id = current_user.get_id()
      
      
-    group_id, limit = None, 0
+    # Served from the daily_stats rollups: cost depends on the number of days
+    # charted, not on how many entries the user has written. Windows select on
+    # the `date` key; weeks and months are bucketed with $dateTrunc on the
+    # native `day`, derived from `date` for rollups written before it existed.
+    day = {"$ifNull": ["$day", {"$dateFromString": {"dateString": "$date", "format": "%Y-%m-%d"}}]}
     if period == "daily":
-        group_id, limit = "$date", 30
+        group_id, label, limit = day, "%Y-%m-%d", 30
+        window = [{"$sort": {"date": -1}}, {"$limit": limit}]
     elif period == "weekly":
-        group_id, limit = {"$dateToString": {"format": "%Y-W%U", "date": {"$toDate": "$date"}}}, 12
+        group_id, label, limit = {"$dateTrunc": {"date": day, "unit": "week"}}, "%Y-W%U", 12
+        window = [{"$match": {"date": {"$gte": (datetime.utcnow() - timedelta(weeks=limit + 1)).strftime('%Y-%m-%d')}}}]
     elif period == "monthly":
-        group_id, limit = {"$substr": ["$date", 0, 7]}, 12
+        group_id, label, limit = {"$dateTrunc": {"date": day, "unit": "month"}}, "%Y-%m", 12
+        window = [{"$match": {"date": {"$gte": (datetime.utcnow() - timedelta(days=31 * (limit + 1))).strftime('%Y-%m-%d')}}}]
     else:
         return jsonify({"error": "Invalid period"}), 400
     
-    pipeline = [
-        {"$addFields": {"mood_numeric": {"$switch": {"branches": [{"case": {"$eq": ["$mood", "positive"]}, "then": 1}, {"case": {"$eq": ["$mood", "negative"]}, "then": -1}], "default": 0}}}},
-        {"$group": {"_id": group_id, "avg_productivity": {"$avg": "$productivity"}, "avg_mood": {"$avg": "$mood_numeric"}}},
+    pipeline = [{"$match": {"count": {"$gt": 0}}}] + window + [
+        {"$group": {"_id": group_id, "count": {"$sum": "$count"}, "mood_sum": {"$sum": "$mood_sum"}, "productivity_sum": {"$sum": "$productivity_sum"}}},
         {"$sort": {"_id": -1}}, {"$limit": limit}, {"$sort": {"_id": 1}},
-        {"$project": {"label": "$_id", "productivity": {"$ifNull": ["$avg_productivity", 0]}, "mood": {"$ifNull": ["$avg_mood", 0]}, "_id": 0}}
+        {"$project": {"label": {"$dateToString": {"format": label, "date": "$_id"}}, "productivity": {"$divide": ["$productivity_sum", "$count"]}, "mood": {"$divide": ["$mood_sum", "$count"]}, "_id": 0}}
     ]
-    results = execute_aggregation(user_id, 'entries', pipeline)
+    results = execute_aggregation(user_id, 'daily_stats', pipeline)
     for row in results:
         row["productivity"] = round(row["productivity"], 2)
         row["mood"] = round(row["mood"], 2)
@@ -248,6 +359,12 @@ def send_report():
         print(f"Failed to send email: {e}")
         return jsonify({"success": False, "error": "Failed to send the report."}), 500
     
+# Summaries are keyed by the user's data version, so these only bound staleness
+# if a write ever bypasses database.db; set SUMMARY_CACHE_SIZE=0 to skip the LRU.
+SUMMARY_CACHE_SIZE = int(os.getenv('SUMMARY_CACHE_SIZE', 512))
+SUMMARY_CACHE_MAX_AGE_HOURS = float(os.getenv('SUMMARY_CACHE_MAX_AGE_HOURS', 6))
+summary_cache = TTLCache(maxsize=SUMMARY_CACHE_SIZE, ttl=SUMMARY_CACHE_MAX_AGE_HOURS * 3600)
+
 @app.route("/api/get_summary/<string:period>")
 @login_required
 def get_summary(period):
@@ -260,50 +377,68 @@ def get_summary(period):
         return jsonify({"error": "Invalid period specified."}), 400
 
     user_id = current_user.get_id()
-     
-    entries = get_entries_for_period(user_id, days=days)
-
-    summary_data = generate_rule_based_summary(entries)
-    
-    if "error" in summary_data:
-        return jsonify(summary_data), 500
+    window_start = period_start(days)
+    data_version = get_data_version(user_id)
+    cache_key = (user_id, period, data_version, window_start)
+
+    # Read-through: process LRU, then the Mongo 'summaries' tier, then compute.
+    summary_data = summary_cache.get(cache_key)
+    if summary_data is None:
+        summary_data = get_summary_from_cache(user_id, period, max_age_hours=SUMMARY_CACHE_MAX_AGE_HOURS,
+                                              data_version=data_version, window_start=window_start)
+        if summary_data is None:
+            entries = get_entries_for_period(user_id, days=days, start_date_str=window_start)
+            summary_data = generate_rule_based_summary(entries)
+            if "error" in summary_data:
+                return jsonify(summary_data), 500
+            save_summary_to_cache(user_id, period, summary_data, data_version=data_version, window_start=window_start)
+        summary_cache.set(cache_key, summary_data)
         
     return jsonify(summary_data)
 
-# This is the helper function that will run in the background
-def run_audio_analysis_background(file_path, user_id):
-    """A wrapper function to run the full audio analysis pipeline in a background thread."""
-    print(f"BACKGROUND THREAD: Starting audio analysis for {file_path}")
-    
-    # 1. Transcribe the audio to text
-    transcribed_text = transcribe_audio_local(file_path)
-    
-    if transcribed_text:
-        # 2. Run your EXISTING NLP analysis on the transcribed text
-        analysis = analyze_text(transcribed_text)
-        tasks = extract_tasks(transcribed_text)
-        
-        # 3. Create a new journal entry in the database with the results
-        # This makes the audio entry appear just like a written one
-        add_entry(
-            user_id,
-            datetime.now().strftime('%Y-%m-%d'),
-            f"(Audio Journal Entry)\n\n{transcribed_text}", # Mark it as an audio entry
-            analysis['mood'],
-            custom_productivity_score(transcribed_text) # Use your existing scorer
-        )
-        
-        # Optional: You could add the extracted tasks to the database as well.
-        print(f"--- BACKGROUND ANALYSIS COMPLETE (for User {user_id}) ---")
-        print(f"  > Mood: {analysis['mood']}, Tasks: {len(tasks)}")
-    else:
-        print(f"--- BACKGROUND ANALYSIS FAILED: No text transcribed. ---")
+# The HTTP import runs inside the request, so it only takes small files;
+# bulk imports go through `python -m database.journal_import`.
+IMPORT_API_MAX_MB = int(os.getenv('IMPORT_API_MAX_MB', 2))
+IMPORT_API_MAX_ENTRIES = int(os.getenv('IMPORT_API_MAX_ENTRIES', 1000))
+
+@app.route("/api/import_entries", methods=['POST'])
+@login_required
+def import_entries_api():
+    """Imports a small uploaded NDJSON or CSV export in-process and reports throughput."""
+    too_large = (f"Imports over {IMPORT_API_MAX_MB} MB or {IMPORT_API_MAX_ENTRIES} entries must use "
+                 "`python -m database.journal_import`.")
+    if request.content_length and request.content_length > IMPORT_API_MAX_MB * 1024 * 1024:
+        return jsonify({"error": too_large}), 413
+    if 'import_file' not in request.files:
+        return jsonify({"error": "No file part"}), 400
+    file = request.files['import_file']
+    fmt = request.form.get('format') or detect_format(file.filename, default=None)
+    if fmt not in ('ndjson', 'csv'):
+        return jsonify({"error": "Upload a .ndjson/.jsonl or .csv file, or pass format=ndjson|csv."}), 400
 
-    os.remove(file_path)
+    try:
+        text = file.stream.read(IMPORT_API_MAX_MB * 1024 * 1024 + 1).decode('utf-8')
+    except UnicodeDecodeError:
+        return jsonify({"error": "The file must be UTF-8 text."}), 400
+    if len(text) > IMPORT_API_MAX_MB * 1024 * 1024 \
+            or sum(1 for _ in iter_records(io.StringIO(text, newline=''), fmt)) > IMPORT_API_MAX_ENTRIES:
+        return jsonify({"error": too_large}), 413
+    # No process pool: forking one from a web worker multiplies processes per request.
+    report = import_entries(io.StringIO(text, newline=''), current_user.get_id(), fmt, workers=0,
+                            tz_offset=clamp_tz_offset(request.form.get('tz_offset')))
+    return jsonify(report)
+
+# Audio uploads are streamed into AUDIO_UPLOAD_DIR under generated names and
+# removed once processed; the audio dispatcher clears out stale leftovers.
+MAX_AUDIO_UPLOAD_MB = int(os.getenv('MAX_AUDIO_UPLOAD_MB', 100))
+MAX_AUDIO_UPLOAD_BYTES = MAX_AUDIO_UPLOAD_MB * 1024 * 1024
 
 @app.route("/api/analyze_audio", methods=['POST'])
 @login_required
 def analyze_audio():
+    # Refuse oversized bodies before Werkzeug parses (and spools) the multipart upload
+    if request.content_length and request.content_length > MAX_AUDIO_UPLOAD_BYTES:
+        return jsonify({"error": f"Recordings are limited to {MAX_AUDIO_UPLOAD_MB} MB."}), 413
     if 'audio_file' not in request.files:
         return jsonify({"error": "No file part"}), 400
     
@@ -315,28 +450,60 @@ def analyze_audio():
     if not file.filename.lower().endswith(".wav"):
         return jsonify({"error": "Only WAV files are supported"}), 400
 
+    user_id = current_user.get_id()
     filename = secure_filename(file.filename)
-    temp_dir = os.path.join(app.root_path, 'temp_uploads')
-    os.makedirs(temp_dir, exist_ok=True)
+    tz_offset = clamp_tz_offset(request.form.get('tz_offset'))
+    # Stream to a uniquely named file (never the client's name), hashing as it is written
+    try:
+        temp_file_path, digest, _ = save_upload(file.stream, AUDIO_UPLOAD_DIR, MAX_AUDIO_UPLOAD_BYTES, suffix='.wav')
+    except UploadTooLarge:
+        return jsonify({"error": f"Recordings are limited to {MAX_AUDIO_UPLOAD_MB} MB."}), 413
 
-    temp_file_path = os.path.abspath(os.path.join(temp_dir, filename))
-    file.save(temp_file_path)
+    job_id = None
+    try:
+        # A retried upload of the same audio returns the job already handling it
+        existing = find_audio_job_by_hash(user_id, digest)
+        if existing is not None:
+            return jsonify({
+                "job_id": str(existing["_id"]), "status": existing["status"], "duplicate": True,
+                "status_url": url_for('audio_job_status', job_id=str(existing["_id"])),
+                "message": "This recording was already uploaded."
+            }), 200
+
+        job_id = audio_jobs.submit(user_id, temp_file_path, filename, tz_offset, sha256=digest)
+        if job_id is None:
+            response = jsonify({"error": "Too many recordings are being processed. Please try again shortly."})
+            response.headers['Retry-After'] = '30'
+            return response, 429
+    finally:
+        # Once a job exists the dispatcher owns the file and deletes it when done
+        if job_id is None:
+            remove_quietly(temp_file_path)
 
-    print(f"File saved at: {temp_file_path}, exists? {os.path.exists(temp_file_path)}")
+    return jsonify({
+        "job_id": str(job_id), "status": "queued",
+        "status_url": url_for('audio_job_status', job_id=str(job_id)),
+        "message": "Audio file received. It will be transcribed and saved as a new journal entry."
+    }), 202
 
-    if not app.debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
-        import threading
-        threading.Thread(
-            target=run_audio_analysis_background,
-            args=(temp_file_path, current_user.get_id()),
-            daemon=True
-        ).start()
+@app.route("/api/audio_jobs/<string:job_id>")
+@login_required
+def audio_job_status(job_id):
+    """Status of a transcription job; once done, includes the transcript, analysis and tasks."""
+    job = get_audio_job(current_user.get_id(), job_id)
+    if job is None:
+        return jsonify({"error": "Job not found."}), 404
+    response = {"job_id": job_id, "status": job["status"], "filename": job.get("filename")}
+    if job["status"] == "done":
+        response.update({"entry_id": str(job["entry_id"]) if job.get("entry_id") else None,
+                         "transcript": job.get("transcript"), "mood": job.get("mood"),
+                         "productivity": job.get("productivity"), "tasks": job.get("tasks", [])})
+    elif job["status"] == "failed":
+        response["error"] = job.get("error")
     else:
-        run_audio_analysis_background(temp_file_path, current_user.get_id())
-
-    return jsonify({
-        "message": "Audio file has been successfully analyzed and saved as a new journal entry."
-    }), 200
+        # Long recordings report text as each segment is transcribed
+        response.update({"partial_transcript": job.get("partial_transcript"), "seconds_done": job.get("seconds_done")})
+    return jsonify(response)
 
 
 # Route to get a journal prompt
@@ -372,12 +539,29 @@ def insights_page(period):
     # Also pass the period to the template so we can display it in the title
     return render_template('insights.html', insights=insights_list, period=period)
 
+# The desktop recorder window (audio_recorder.py); at most one per server process
+_recorder_process = None
+_recorder_lock = threading.Lock()
+
 @app.route("/record_audio", methods=["POST"])
 def record_audio():
-    # Run your external recording script
-    subprocess.Popen(["python", "audio_recorder.py"])
+    global _recorder_process
+    with _recorder_lock:
+        if _recorder_process is not None and _recorder_process.poll() is None:
+            return "Recorder is already open.", 409
+        env = dict(os.environ, MINDSYNC_UPLOAD_URL=url_for('analyze_audio', _external=True))
+        session_cookie = request.cookies.get(app.config.get('SESSION_COOKIE_NAME', 'session'))
+        if session_cookie:
+            # Lets the recorder's upload button post to this user's account
+            env['MINDSYNC_COOKIE'] = f"{app.config.get('SESSION_COOKIE_NAME', 'session')}={session_cookie}"
+        _recorder_process = subprocess.Popen([sys.executable, os.path.join(app.root_path, "audio_recorder.py")], env=env)
     return "Recording started!"
 
 if __name__ == "__main__":
+    from nlp.audio_jobs import AUDIO_DISPATCH_IN_WEB
+    if AUDIO_DISPATCH_IN_WEB:
+        audio_jobs.start()
+    if ASYNC_ANALYSIS:
+        analysis_queue.start()
     app.run(debug=True, use_reloader=False)
 
@@ -1,118 +1,336 @@
-import sounddevice as sd
-import numpy as np
+"""
+Voice recorder for audio journal entries.
+
+The core is `Recorder`, which has no GUI: the audio callback copies each
+block into a preallocated ring buffer, and a writer thread drains it
+straight into a 16-bit PCM WAV file with soundfile, so memory use does not
+grow with the length of the recording. The input stream comes from a
+factory (sounddevice by default); pass any object with start/stop/close
+that calls `callback(indata, frames, time, status)` to drive it without a
+microphone.
+
+Run this file for the Tk recorder window:
+
+    python audio_recorder.py [--upload http://127.0.0.1:5000/api/analyze_audio]
+
+With --upload (or MINDSYNC_UPLOAD_URL) the finished recording can be sent
+to the app; MINDSYNC_COOKIE ("session=...") authenticates the upload.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
 import threading
-import tkinter as tk
-from tkinter import messagebox, filedialog
-from scipy.io.wavfile import write
+import numpy as np
 
-# Globals
 fs = 44100  # Sample rate
-is_recording = False
-is_paused = False
-audio_data = []
-stream = None
-
-
-def audio_callback(indata, frames, time, status):
-    """This function is called automatically when new audio data is available."""
-    global audio_data, is_paused
-    if not is_paused:
-        audio_data.append(indata.copy())
-
-
-def start_recording():
-    global is_recording, stream, audio_data
-
-    if is_recording:
-        messagebox.showwarning("Warning", "Already recording!")
-        return
-
-    is_recording = True
-    audio_data = []
-
-    # Start stream in a background thread
-    stream = sd.InputStream(samplerate=fs, channels=1, callback=audio_callback)
-    stream.start()
-
-    status_label.config(text="Recording... 🎙️", fg="lightgreen")
-
-
-def pause_recording():
-    global is_paused
-
-    if not is_recording:
-        messagebox.showwarning("Warning", "Recording not started yet.")
-        return
-
-    is_paused = not is_paused
-    if is_paused:
-        status_label.config(text="Paused ⏸️", fg="orange")
-        pause_btn.config(text="Resume")
-    else:
-        status_label.config(text="Recording... 🎙️", fg="lightgreen")
-        pause_btn.config(text="Pause")
 
 
-def stop_recording():
-    global is_recording, stream
-
-    if not is_recording:
-        messagebox.showwarning("Warning", "No active recording.")
-        return
-
-    is_recording = False
-    if stream is not None:
-        stream.stop()
-        stream.close()
-        stream = None
-
-    status_label.config(text="Recording stopped ⏹️", fg="red")
-
-
-def save_recording():
-    global audio_data
-
-    if not audio_data:
-        messagebox.showwarning("Warning", "No audio data to save.")
-        return
-
-    file_path = filedialog.asksaveasfilename(defaultextension=".wav",
-                                             filetypes=[("WAV files", "*.wav")],
-                                             title="Save Recording As")
-    if file_path:
-        audio_np = np.concatenate(audio_data, axis=0)
-        write(file_path, fs, (audio_np * 32767).astype(np.int16))
-        messagebox.showinfo("Saved", f"Recording saved successfully:\n{file_path}")
+class RingBuffer:
+    """
+    Fixed-size (frames, channels) float32 FIFO. `write` never allocates or
+    blocks for long (it runs in the audio callback); frames that do not fit
+    are dropped and counted in `dropped`.
+    """
+    def __init__(self, frames, channels):
+        self.capacity = frames
+        self.dropped = 0
+        self._data = np.zeros((frames, channels), dtype=np.float32)
+        self._read = 0
+        self._count = 0
+        self._cond = threading.Condition()
+
+    def write(self, block):
+        with self._cond:
+            n = len(block)
+            free = self.capacity - self._count
+            if n > free:
+                self.dropped += n - free
+                n = free
+            start = (self._read + self._count) % self.capacity
+            first = min(n, self.capacity - start)
+            self._data[start:start + first] = block[:first]
+            self._data[:n - first] = block[first:n]
+            self._count += n
+            self._cond.notify()
+
+    def read_into(self, out, timeout=None):
+        """Moves up to len(out) frames into `out`, waiting up to `timeout` for data. Returns the count."""
+        with self._cond:
+            if not self._count:
+                self._cond.wait(timeout)
+            n = min(self._count, len(out))
+            first = min(n, self.capacity - self._read)
+            out[:first] = self._data[self._read:self._read + first]
+            out[first:n] = self._data[:n - first]
+            self._read = (self._read + n) % self.capacity
+            self._count -= n
+            return n
+
+
+def sounddevice_stream(samplerate, channels, callback):
+    import sounddevice as sd
+    return sd.InputStream(samplerate=samplerate, channels=channels, dtype='float32', callback=callback)
+
+
+class Recorder:
+    """
+    Records from an input stream to a WAV file at `path`.
+
+        recorder = Recorder("entry.wav")
+        recorder.start(); ...; recorder.pause(); recorder.resume(); ...
+        recorder.stop()
+    """
+    def __init__(self, path, samplerate=fs, channels=1, buffer_seconds=10, chunk_frames=4096,
+                 stream_factory=sounddevice_stream):
+        self.path = path
+        self.samplerate = samplerate
+        self.channels = channels
+        self.chunk_frames = chunk_frames
+        self.stream_factory = stream_factory
+        self.paused = False
+        self.frames_written = 0
+        self.status_errors = 0
+        self._ring = RingBuffer(int(samplerate * buffer_seconds), channels)
+        self._stream = None
+        self._file = None
+        self._writer = None
+        self._running = False
+
+    @property
+    def is_recording(self):
+        return self._running
+
+    @property
+    def dropped_frames(self):
+        return self._ring.dropped
+
+    def _callback(self, indata, frames, time, status):
+        """This function is called automatically when new audio data is available."""
+        if status:
+            self.status_errors += 1
+        if not self.paused:
+            self._ring.write(indata)
+
+    def _drain(self):
+        chunk = np.empty((self.chunk_frames, self.channels), dtype=np.float32)
+        while True:
+            n = self._ring.read_into(chunk, timeout=0.1)
+            if n:
+                # soundfile converts to 16-bit PCM as it writes
+                self._file.write(chunk[:n])
+                self.frames_written += n
+            elif not self._running:
+                break
+
+    def start(self):
+        import soundfile as sf
+        if self._running:
+            raise RuntimeError("Already recording.")
+        self._file = sf.SoundFile(self.path, 'w', samplerate=self.samplerate, channels=self.channels,
+                                  format='WAV', subtype='PCM_16')
+        self._running = True
+        self.paused = False
+        self._writer = threading.Thread(target=self._drain, name='recorder-writer', daemon=True)
+        self._writer.start()
+        try:
+            self._stream = self.stream_factory(self.samplerate, self.channels, self._callback)
+            self._stream.start()
+        except Exception:
+            self._running = False
+            self._writer.join()
+            self._file.close()
+            raise
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+    def stop(self):
+        """Stops the stream, flushes everything buffered to disk and returns the file path."""
+        if not self._running:
+            return self.path
+        try:
+            self._stream.stop()
+            self._stream.close()
+        finally:
+            self._stream = None
+            self._running = False
+            self._writer.join()
+            self._file.close()
+        return self.path
+
+    @property
+    def duration(self):
+        return self.frames_written / self.samplerate
+
+
+def utc_offset_minutes():
+    """This machine's UTC offset in minutes east, as the web app expects."""
+    return time.localtime().tm_gmtoff // 60
+
+
+def upload_recording(path, url, cookie=None):
+    """POSTs a finished recording to /api/analyze_audio and returns the decoded JSON response."""
+    import requests
+    headers = {"Cookie": cookie} if cookie else {}
+    with open(path, 'rb') as f:
+        response = requests.post(url, files={"audio_file": (os.path.basename(path), f, "audio/wav")},
+                                 data={"tz_offset": utc_offset_minutes()}, headers=headers, timeout=300)
+    try:
+        body = response.json()
+    except ValueError:
+        body = {"error": response.text[:200] or f"HTTP {response.status_code}"}
+    if response.status_code >= 400:
+        raise RuntimeError(body.get("error") or f"HTTP {response.status_code}")
+    return body
 
 
 # --- GUI ---
-root = tk.Tk()
-root.title("🎤 Voice Recorder")
-root.geometry("360x250")
-root.config(bg="#1e1e1e")
-
-tk.Label(root, text="Voice Recorder", font=("Arial", 18, "bold"), fg="white", bg="#1e1e1e").pack(pady=10)
 
-status_label = tk.Label(root, text="Ready 🎧", fg="lightblue", bg="#1e1e1e", font=("Arial", 12))
-status_label.pack(pady=10)
-
-btn_frame = tk.Frame(root, bg="#1e1e1e")
-btn_frame.pack(pady=15)
-
-start_btn = tk.Button(btn_frame, text="Start", width=10, bg="#4CAF50", fg="white", font=("Arial", 12),
-                      command=start_recording)
-start_btn.grid(row=0, column=0, padx=5)
-
-pause_btn = tk.Button(btn_frame, text="Pause", width=10, bg="#FFC107", fg="black", font=("Arial", 12),
-                      command=pause_recording)
-pause_btn.grid(row=0, column=1, padx=5)
-
-stop_btn = tk.Button(btn_frame, text="Stop", width=10, bg="#F44336", fg="white", font=("Arial", 12),
-                     command=stop_recording)
-stop_btn.grid(row=1, column=0, padx=5, pady=5)
-
-save_btn = tk.Button(btn_frame, text="Save", width=10, bg="#2196F3", fg="white", font=("Arial", 12),
-                     command=save_recording)
-save_btn.grid(row=1, column=1, padx=5, pady=5)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record an audio journal entry.")
+    parser.add_argument('--upload', default=os.getenv('MINDSYNC_UPLOAD_URL'),
+                        help="URL of /api/analyze_audio to send recordings to.")
+    args = parser.parse_args(argv)
+    cookie = os.getenv('MINDSYNC_COOKIE')
+
+    import tkinter as tk
+    from tkinter import messagebox, filedialog
+
+    work_dir = tempfile.mkdtemp(prefix='mindsync-recorder-')
+    state = {"recorder": None}
+
+    def start_recording():
+        recorder = state["recorder"]
+        if recorder is not None and recorder.is_recording:
+            messagebox.showwarning("Warning", "Already recording!")
+            return
+        path = os.path.join(work_dir, time.strftime("recording-%Y%m%d-%H%M%S.wav"))
+        recorder = Recorder(path)
+        try:
+            recorder.start()
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not start recording:\n{e}")
+            return
+        state["recorder"] = recorder
+        status_label.config(text="Recording... 🎙️", fg="lightgreen")
 
-root.mainloop()
+    def pause_recording():
+        recorder = state["recorder"]
+        if recorder is None or not recorder.is_recording:
+            messagebox.showwarning("Warning", "Recording not started yet.")
+            return
+        if recorder.paused:
+            recorder.resume()
+            status_label.config(text="Recording... 🎙️", fg="lightgreen")
+            pause_btn.config(text="Pause")
+        else:
+            recorder.pause()
+            status_label.config(text="Paused ⏸️", fg="orange")
+            pause_btn.config(text="Resume")
+
+    def stop_recording():
+        recorder = state["recorder"]
+        if recorder is None or not recorder.is_recording:
+            messagebox.showwarning("Warning", "No active recording.")
+            return
+        recorder.stop()
+        pause_btn.config(text="Pause")
+        note = f" ({recorder.dropped_frames} frames dropped)" if recorder.dropped_frames else ""
+        status_label.config(text=f"Recording stopped ⏹️ {recorder.duration:.0f}s{note}", fg="red")
+
+    def finished_recording():
+        recorder = state["recorder"]
+        if recorder is None or not recorder.frames_written:
+            messagebox.showwarning("Warning", "No audio data to save.")
+            return None
+        if recorder.is_recording:
+            stop_recording()
+        return recorder.path
+
+    def save_recording():
+        path = finished_recording()
+        if not path:
+            return
+        file_path = filedialog.asksaveasfilename(defaultextension=".wav",
+                                                 filetypes=[("WAV files", "*.wav")],
+                                                 title="Save Recording As")
+        if file_path:
+            shutil.copyfile(path, file_path)
+            messagebox.showinfo("Saved", f"Recording saved successfully:\n{file_path}")
+
+    def upload():
+        path = finished_recording()
+        if not path:
+            return
+        upload_btn.config(state="disabled")
+        status_label.config(text="Uploading... ⏫", fg="lightblue")
+
+        def send():
+            try:
+                body = upload_recording(path, args.upload, cookie)
+                message, failed = body.get("message", "Uploaded."), False
+            except Exception as e:
+                message, failed = f"Upload failed: {e}", True
+            root.after(0, lambda: finish_upload(message, failed))
+
+        threading.Thread(target=send, daemon=True).start()
+
+    def finish_upload(message, failed):
+        upload_btn.config(state="normal")
+        status_label.config(text="Upload failed ⚠️" if failed else "Uploaded ✅", fg="red" if failed else "lightgreen")
+        (messagebox.showerror if failed else messagebox.showinfo)("Upload", message)
+
+    def on_close():
+        recorder = state["recorder"]
+        if recorder is not None and recorder.is_recording:
+            recorder.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+        root.destroy()
+
+    root = tk.Tk()
+    root.title("🎤 Voice Recorder")
+    root.geometry("360x290" if args.upload else "360x250")
+    root.config(bg="#1e1e1e")
+    root.protocol("WM_DELETE_WINDOW", on_close)
+
+    tk.Label(root, text="Voice Recorder", font=("Arial", 18, "bold"), fg="white", bg="#1e1e1e").pack(pady=10)
+
+    status_label = tk.Label(root, text="Ready 🎧", fg="lightblue", bg="#1e1e1e", font=("Arial", 12))
+    status_label.pack(pady=10)
+
+    btn_frame = tk.Frame(root, bg="#1e1e1e")
+    btn_frame.pack(pady=15)
+
+    start_btn = tk.Button(btn_frame, text="Start", width=10, bg="#4CAF50", fg="white", font=("Arial", 12),
+                          command=start_recording)
+    start_btn.grid(row=0, column=0, padx=5)
+
+    pause_btn = tk.Button(btn_frame, text="Pause", width=10, bg="#FFC107", fg="black", font=("Arial", 12),
+                          command=pause_recording)
+    pause_btn.grid(row=0, column=1, padx=5)
+
+    stop_btn = tk.Button(btn_frame, text="Stop", width=10, bg="#F44336", fg="white", font=("Arial", 12),
+                         command=stop_recording)
+    stop_btn.grid(row=1, column=0, padx=5, pady=5)
+
+    save_btn = tk.Button(btn_frame, text="Save", width=10, bg="#2196F3", fg="white", font=("Arial", 12),
+                         command=save_recording)
+    save_btn.grid(row=1, column=1, padx=5, pady=5)
+
+    upload_btn = tk.Button(btn_frame, text="Upload to MindSync", width=22, bg="#673AB7", fg="white",
+                           font=("Arial", 12), command=upload)
+    if args.upload:
+        upload_btn.grid(row=2, column=0, columnspan=2, padx=5, pady=5)
+
+    root.mainloop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
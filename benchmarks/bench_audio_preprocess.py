@@ -0,0 +1,95 @@
+"""
+Compares the previous audio preprocessing (float64 read, np.mean downmix,
+librosa.resample, float32 copy) with nlp.audio_preprocess (float32 read,
+in-place downmix, polyphase resampling with a cached filter).
+
+    python benchmarks/bench_audio_preprocess.py recordings/*.wav [--repeat 5]
+
+Pass real recordings; with no paths it falls back to synthetic 44.1 kHz
+stereo clips of 10 s and 60 s, which time the same code but are not a
+substitute for real audio. Timings exclude Whisper.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import numpy as np
+import soundfile as sf
+from nlp.audio_preprocess import load_for_whisper, resample_filter
+
+
+def legacy_load(path):
+    """The preprocessing transcribe_audio_local used before nlp.audio_preprocess."""
+    import librosa
+    audio, sr = sf.read(path)
+    if len(audio.shape) > 1:
+        audio = np.mean(audio, axis=1)
+    if sr != 16000:
+        audio = librosa.resample(audio, orig_sr=sr, target_sr=16000)
+    audio = np.asarray(audio, dtype=np.float32)
+    if audio.ndim != 1:
+        audio = audio.flatten()
+    return audio
+
+
+def synthetic_clips(directory):
+    rng = np.random.default_rng(0)
+    paths = []
+    for seconds in (10, 60):
+        t = np.arange(44100 * seconds) / 44100
+        tone = 0.3 * np.sin(2 * np.pi * 220 * t) * (np.sin(2 * np.pi * 0.5 * t) > 0)
+        stereo = np.stack([tone, tone], axis=1) + 0.01 * rng.standard_normal((len(t), 2))
+        path = os.path.join(directory, f"synthetic_{seconds}s.wav")
+        sf.write(path, stereo.astype(np.float32), 44100, subtype='PCM_16')
+        paths.append(path)
+    return paths
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('paths', nargs='*', help="WAV recordings to preprocess.")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = args.paths or synthetic_clips(tmp)
+        if not args.paths:
+            print("No recordings given; using synthetic clips.")
+
+        # First-call costs: the librosa import and the filter design
+        t0 = time.perf_counter()
+        import librosa  # noqa: F401
+        print(f"librosa import: {(time.perf_counter() - t0) * 1000:.0f} ms")
+        t0 = time.perf_counter()
+        resample_filter(44100)
+        print(f"44.1k->16k filter design (cached after first use): {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+        for path in paths:
+            info = sf.info(path)
+            legacy, old = best_of(lambda: legacy_load(path), args.repeat)
+            new, fresh = best_of(lambda: load_for_whisper(path), args.repeat)
+            n = min(len(old), len(fresh))
+            diff = np.sqrt(np.mean((old[:n] - fresh[:n]) ** 2)) / (np.sqrt(np.mean(old[:n] ** 2)) or 1.0)
+            print(f"{os.path.basename(path)}: {info.duration:.1f} s, {info.samplerate} Hz, {info.channels} ch")
+            print(f"  legacy      {legacy * 1000:8.1f} ms")
+            print(f"  preprocess  {new * 1000:8.1f} ms  ({legacy / new:.2f}x)")
+            print(f"  samples {len(old)} vs {len(fresh)}, relative RMS difference {diff:.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
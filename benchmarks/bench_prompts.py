@@ -0,0 +1,216 @@
+"""
+Compares the per-request work of prompt generation before and after the
+incremental phrase statistics, for synthetic users with thousands of entries
+drawn from the Emotion corpus.
+
+    python benchmarks/bench_prompts.py [--entries 1000 5000 20000] [--repeat 20]
+
+Runs in memory, without MongoDB:
+
+  legacy     re-tokenises the 30 most recent entries on every request, with
+             the old phrases x docs DF loop
+  linear DF  the same with the single-pass DF count now in prompts.py
+             (still used for anonymous users)
+  scan       counters kept per phrase, but every request ranks all of the
+             user's recurring phrases (what an unindexed $sort would do)
+  stats      counters with a score stored at write time, read through a
+             sorted index like the (user_id, score) one and the top 50
+             re-ranked with the current entry count; this is the path
+             prompts.stats_prompts takes
+
+It also reports the write-time cost of keeping the counters and the score
+index up to date, and how many counter documents each user ends up with.
+The stand-in index is a sorted list, so its inserts grow with the number of
+phrases where MongoDB's B-tree stays logarithmic; treat that column as an
+upper bound.
+"""
+import os
+import sys
+import math
+import time
+import heapq
+import bisect
+import random
+import argparse
+from collections import Counter
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from nlp.phrases import clean_text, find_phrases, has_stop_word, all_stop_words, phrase_tf
+
+MOOD_NUMERIC = {"positive": 1, "neutral": 0, "negative": -1}
+RECENT_ENTRIES = 30
+
+
+def load_texts():
+    texts = []
+    for name in ('train.txt', 'test.txt', 'val.txt'):
+        with open(os.path.join(BASE_DIR, 'Datasets', 'Emotion', name), encoding='utf-8') as f:
+            texts.extend(line.rsplit(';', 1)[0] for line in f if line.strip())
+    return texts
+
+
+def make_user(texts, count, rng):
+    """Newest first, like db.entries.find(...).sort("date", -1). Entries join a few lines each."""
+    return [{"text": '. '.join(rng.sample(texts, 4)), "mood": rng.choice(list(MOOD_NUMERIC))}
+            for _ in range(count)]
+
+
+def legacy_top_phrases(docs):
+    """The tf-idf ranking prompts.py used before (DF counted phrase by phrase over every doc)."""
+    tf_scores = []
+    for doc in docs:
+        doc_tf = Counter(find_phrases(doc, 2))
+        for phrase, count in doc_tf.items():
+            doc_tf[phrase] = count / len(doc.split())
+        tf_scores.append(doc_tf)
+    phrase_doc_counts = Counter()
+    for phrase in set(p for doc_tf in tf_scores for p in doc_tf):
+        for doc_tf in tf_scores:
+            if phrase in doc_tf:
+                phrase_doc_counts[phrase] += 1
+    idf = {p: math.log(len(docs) / (1 + c)) for p, c in phrase_doc_counts.items()}
+    scores = Counter()
+    for doc_tf in tf_scores:
+        for phrase, tf in doc_tf.items():
+            scores[phrase] += tf * idf[phrase]
+    return [p for p, _ in scores.most_common(5)]
+
+
+def recent_window_topics(entries, top_phrases):
+    """Both layers of the recent-entries path in generate_prompt, minus the database fetch."""
+    recent = entries[:RECENT_ENTRIES]
+    docs = [clean_text(e["text"]) for e in recent]
+    latest = set(p for p in find_phrases(docs[0], 2) if not has_stop_word(p))
+    unique = latest - set(p for doc in docs[1:] for p in find_phrases(doc, 2))
+    topics = []
+    for topic in top_phrases(docs):
+        if all_stop_words(topic):
+            continue
+        topic_entries = [e for e in recent if topic in e["text"].lower()]
+        if len(topic_entries) >= 2:
+            topics.append((topic, sum(MOOD_NUMERIC[e["mood"]] for e in topic_entries) / len(topic_entries)))
+    return unique, topics
+
+
+def linear_top_phrases(docs):
+    """prompts.get_top_tf_idf_phrases as it is now (one Counter update per doc for DF)."""
+    tf_scores = []
+    for doc in docs:
+        doc_tf = Counter(find_phrases(doc, 2))
+        for phrase, count in doc_tf.items():
+            doc_tf[phrase] = count / len(doc.split())
+        tf_scores.append(doc_tf)
+    phrase_doc_counts = Counter()
+    for doc_tf in tf_scores:
+        phrase_doc_counts.update(doc_tf.keys())
+    idf = {p: math.log(len(docs) / (1 + c)) for p, c in phrase_doc_counts.items()}
+    scores = Counter()
+    for doc_tf in tf_scores:
+        for phrase, tf in doc_tf.items():
+            scores[phrase] += tf * idf[phrase]
+    return [p for p, _ in scores.most_common(5)]
+
+
+class ScoreIndex:
+    """Stand-in for the (user_id, score) index: (-score, phrase) keys kept sorted."""
+    def __init__(self):
+        self.keys = []
+        self.scores = {}
+
+    def set(self, phrase, score):
+        old = self.scores.pop(phrase, None)
+        if old is not None:
+            del self.keys[bisect.bisect_left(self.keys, (-old, phrase))]
+        if score is not None:
+            self.scores[phrase] = score
+            bisect.insort(self.keys, (-score, phrase))
+
+    def top(self, limit):
+        return [phrase for _, phrase in self.keys[:limit]]
+
+
+def phrase_score(df, tf_sum, entry_count):
+    return tf_sum * math.log(entry_count / (1 + df)) if df >= 2 else None
+
+
+def add_to_stats(stats, index, entry, entry_count):
+    """What database.db's _phrase_increments/_apply_phrase_increments do for one new entry."""
+    mood = MOOD_NUMERIC[entry["mood"]]
+    for phrase, tf in phrase_tf(entry["text"]).items():
+        counter = stats.get(phrase)
+        if counter is None:
+            counter = stats[phrase] = [0, 0.0, 0]
+        counter[0] += 1
+        counter[1] += tf
+        counter[2] += mood
+        index.set(phrase, phrase_score(counter[0], counter[1], entry_count))
+
+
+def latest_unique(latest, stats):
+    latest_phrases = set(p for p in find_phrases(clean_text(latest["text"]), 2) if not has_stop_word(p))
+    return [p for p in latest_phrases if stats.get(p, (0,))[0] <= 1]
+
+
+def scan_topics(latest, stats, entry_count):
+    """Counters without a stored score: every recurring phrase is ranked per request."""
+    candidates = ((c[1] * math.log(entry_count / (1 + c[0])), p, c) for p, c in stats.items() if c[0] >= 2)
+    return latest_unique(latest, stats), [(p, c[2] / c[0]) for _, p, c in heapq.nlargest(5, candidates)]
+
+
+def stats_topics(latest, stats, index, entry_count, candidates=50):
+    """
+    Both layers of prompts.stats_prompts: a few lookups plus the first
+    `candidates` index keys, re-ranked with the current entry count.
+    """
+    top = sorted(index.top(candidates), key=lambda p: phrase_score(stats[p][0], stats[p][1], entry_count),
+                 reverse=True)[:5]
+    return latest_unique(latest, stats), [(p, stats[p][2] / stats[p][0]) for p in top]
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entries', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    texts = load_texts()
+    rng = random.Random(args.seed)
+    for count in args.entries:
+        entries = make_user(texts, count, rng)
+        stats, index = {}, ScoreIndex()
+        start = time.perf_counter()
+        for n, entry in enumerate(reversed(entries), 1):
+            add_to_stats(stats, index, entry, n)
+        build = time.perf_counter() - start
+        topic_candidates = sum(1 for c in stats.values() if c[0] >= 2)
+
+        legacy = best_of(lambda: recent_window_topics(entries, legacy_top_phrases), args.repeat)
+        recent = best_of(lambda: recent_window_topics(entries, linear_top_phrases), args.repeat)
+        scan = best_of(lambda: scan_topics(entries[0], stats, count), args.repeat)
+        lookup = best_of(lambda: stats_topics(entries[0], stats, index, count), args.repeat)
+        print(f"{count} entries: {len(stats):,} phrase counters ({topic_candidates:,} with df >= 2)")
+        print(f"  write-time update  {build / count * 1e6:9.1f} us/entry")
+        print(f"  legacy (30 recent) {legacy * 1000:9.3f} ms/request")
+        print(f"  linear DF (30)     {recent * 1000:9.3f} ms/request ({legacy / recent:.2f}x)")
+        print(f"  scan (all)         {scan * 1000:9.3f} ms/request ({legacy / scan:.2f}x)")
+        print(f"  stats (all)        {lookup * 1000:9.3f} ms/request ({legacy / lookup:.2f}x)")
+        exact = {p for p, _ in scan_topics(entries[0], stats, count)[1]}
+        approx = {p for p, _ in stats_topics(entries[0], stats, index, count)[1]}
+        print(f"  stats top 5 matching exact tf-idf: {len(exact & approx)}/{len(exact)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Measures the database side of a journal submit against a real deployment:
+latency percentiles and MongoDB round trips of add_entry_with_tasks, with the
+follow-up writes (tasks, daily rollup, phrase statistics, data version) sent
+concurrently as the app does, and one after the other for comparison.
+
+    python benchmarks/bench_submit.py [--submits 200] [--tasks 2]
+
+Needs MONGO_CLUSTER_URL. It writes to a throwaway user and deletes
+everything it wrote afterwards. Latency is dominated by the round-trip time
+to the cluster, so run it from where the app runs.
+"""
+import os
+import sys
+import time
+import uuid
+import argparse
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import database.db as database
+from database.instrumentation import start_counting
+
+TEXT = ("Today I finished the project report and went for a long walk in the park. "
+        "Tomorrow I need to call the dentist and prepare the slides for the weekly review.")
+
+
+def sequential(*calls):
+    return [call() for call in calls]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run(user_id, submits, tasks):
+    latencies, round_trips = [], 0
+    for _ in range(submits):
+        counter = start_counting()
+        start = time.perf_counter()
+        database.add_entry_with_tasks(user_id, database.local_date(), TEXT, "positive", 0.8,
+                                      [f"task {i}" for i in range(tasks)])
+        latencies.append(time.perf_counter() - start)
+        round_trips += counter.count
+    return latencies, round_trips / submits
+
+
+def cleanup(user_obj_id):
+    db = database.db
+    for name in ("entries", "tasks", "daily_stats", "phrase_stats"):
+        db[name].delete_many({"user_id": user_obj_id})
+    for name in ("phrase_totals", "data_versions", "users"):
+        db[name].delete_one({"_id": user_obj_id})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Latency of the journal submit writes.")
+    parser.add_argument('--submits', type=int, default=200)
+    parser.add_argument('--tasks', type=int, default=2, help="Tasks written with each entry.")
+    args = parser.parse_args(argv)
+
+    database.init_db(ensure=True)
+    if database.db is None:
+        print("Set MONGO_CLUSTER_URL to a deployment the benchmark may write to.")
+        return 1
+
+    user_obj_id = database.create_user(f"bench-{uuid.uuid4().hex}@example.com", "x").inserted_id
+    concurrent = database.run_concurrently
+    try:
+        run(str(user_obj_id), 5, args.tasks)  # warm up connections and the query pool
+        for label, runner in (("sequential", sequential), ("concurrent", concurrent)):
+            database.run_concurrently = runner
+            latencies, trips = run(str(user_obj_id), args.submits, args.tasks)
+            print(f"{label:<11} p50 {percentile(latencies, 50) * 1000:7.1f} ms  "
+                  f"p99 {percentile(latencies, 99) * 1000:7.1f} ms  {trips:.1f} round trips/submit")
+    finally:
+        database.run_concurrently = concurrent
+        cleanup(user_obj_id)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Compares the previous per-call, two-pass task extractor with the compiled
+single-pass one on the sample entries in testing_task.txt and the Emotion
+corpus.
+
+    python benchmarks/bench_task_extractor.py [--repeat 5]
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from nlp.task_extractor import extract_tasks, extract_tasks_batch
+
+
+def legacy_extract_tasks(text):
+    """The implementation this benchmark compares against (patterns rebuilt per call)."""
+    task_patterns = [
+        r"\b(?:need to|have to|must|should|want to|planning to|plan to|aim to|try to)\s+(.*?)(?:[.!\n]|$)",
+        r"\b(?:to[- ]do|todo)[^\w]*(.*?)(?:[.!\n]|$)"
+    ]
+    tasks = []
+    for pattern in task_patterns:
+        for match in re.findall(pattern, text, re.IGNORECASE):
+            task = match.strip().rstrip('.!')
+            if task:
+                tasks.append(task)
+    return tasks
+
+
+def load_corpora():
+    corpora = {}
+    with open(os.path.join(BASE_DIR, 'testing_task.txt'), encoding='utf-8') as f:
+        corpora['testing_task.txt'] = [line.strip() for line in f if line.strip()]
+    emotion = []
+    for name in ('train.txt', 'test.txt', 'val.txt'):
+        with open(os.path.join(BASE_DIR, 'Datasets', 'Emotion', name), encoding='utf-8') as f:
+            emotion.extend(line.rsplit(';', 1)[0] for line in f if line.strip())
+    corpora['Emotion corpus'] = emotion
+    return corpora
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    for name, texts in load_corpora().items():
+        # Sample entries are short; repeat them so timings are measurable.
+        if len(texts) < 1000:
+            texts = texts * (1000 // len(texts) + 1)
+        legacy = best_of(lambda: [legacy_extract_tasks(t) for t in texts], args.repeat)
+        single = best_of(lambda: [extract_tasks(t) for t in texts], args.repeat)
+        batch = best_of(lambda: extract_tasks_batch(texts), args.repeat)
+        legacy_count = sum(len(legacy_extract_tasks(t)) for t in texts)
+        new_count = sum(len(tasks) for tasks in extract_tasks_batch(texts))
+        print(f"{name}: {len(texts)} texts")
+        print(f"  legacy       {legacy * 1000:8.1f} ms  ({len(texts) / legacy:,.0f} texts/s)")
+        print(f"  extract_tasks{single * 1000:8.1f} ms  ({len(texts) / single:,.0f} texts/s, {legacy / single:.2f}x)")
+        print(f"  batch        {batch * 1000:8.1f} ms  ({len(texts) / batch:,.0f} texts/s, {legacy / batch:.2f}x)")
+        print(f"  tasks found: legacy {legacy_count}, new {new_count} (duplicates removed: {legacy_count - new_count})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Speed/accuracy comparison of Whisper configurations on reference clips:
+real-time factor (processing seconds per audio second), throughput and
+word error rate for every combination of model, quantization and threads.
+
+    python benchmarks/bench_whisper.py [--models tiny,base] [--quantize none,int8] [--threads 1,4]
+
+Clips are listed in benchmarks/whisper_clips/manifest.csv as
+`path,transcript` rows (paths relative to the manifest). Four short
+journal-style clips synthesized with eSpeak NG are bundled (regenerate them
+with benchmarks/whisper_clips/synthesize.py); synthetic speech is cleaner
+than a real microphone, so add your own recordings to the manifest for a
+realistic WER, and keep those out of version control if they contain
+personal speech. Models load from WHISPER_MODEL_DIR (fetch them first with
+`python -m nlp.media_analyzer fetch --model <name>`).
+"""
+import os
+import re
+import csv
+import sys
+import time
+import argparse
+import itertools
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from nlp.audio_preprocess import WHISPER_RATE, load_for_whisper
+from nlp.media_analyzer import configure_threads, load_whisper_model
+
+DEFAULT_MANIFEST = os.path.join(BASE_DIR, 'benchmarks', 'whisper_clips', 'manifest.csv')
+WORD_RE = re.compile(r"[\w']+")
+
+
+def load_manifest(path):
+    root = os.path.dirname(os.path.abspath(path))
+    with open(path, encoding='utf-8', newline='') as f:
+        return [(os.path.join(root, row['path']), row['transcript']) for row in csv.DictReader(f) if row.get('path')]
+
+
+def words(text):
+    return WORD_RE.findall(text.lower())
+
+
+def edit_distance(reference, hypothesis):
+    """Word-level Levenshtein distance (substitutions + insertions + deletions)."""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, start=1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1]
+
+
+def run_config(model_name, quantize, threads, clips):
+    """`clips` is a list of (reference transcript, 16 kHz mono audio)."""
+    configure_threads(threads)
+    t0 = time.perf_counter()
+    model = load_whisper_model(model_name, quantize)
+    load_seconds = time.perf_counter() - t0
+    # One untimed pass so lazy initialisation is not charged to the first clip
+    model.transcribe(clips[0][1][:WHISPER_RATE], fp16=False)
+
+    audio_seconds = busy_seconds = 0.0
+    errors = reference_words = 0
+    for transcript, audio in clips:
+        start = time.perf_counter()
+        text = model.transcribe(audio, fp16=False).get("text", "")
+        busy_seconds += time.perf_counter() - start
+        audio_seconds += len(audio) / WHISPER_RATE
+        reference = words(transcript)
+        errors += edit_distance(reference, words(text))
+        reference_words += len(reference)
+    return {
+        "load_s": load_seconds,
+        "rtf": busy_seconds / audio_seconds,
+        "throughput": audio_seconds / busy_seconds,
+        "wer": errors / reference_words if reference_words else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--manifest', default=DEFAULT_MANIFEST)
+    parser.add_argument('--models', default='tiny,base')
+    parser.add_argument('--quantize', default='none,int8')
+    parser.add_argument('--threads', default=','.join(sorted({'1', str(os.cpu_count() or 1)})))
+    args = parser.parse_args(argv)
+
+    manifest = load_manifest(args.manifest)
+    if not manifest:
+        print(f"No clips listed in {args.manifest}; add `path,transcript` rows (see this script's docstring).")
+        return 1
+    clips = [(transcript, load_for_whisper(path)) for path, transcript in manifest]
+    total = sum(len(audio) for _, audio in clips) / WHISPER_RATE
+    print(f"{len(clips)} clips, {total:.1f} s of audio")
+    print(f"{'model':<10}{'quant':<7}{'threads':>8}{'load s':>9}{'RTF':>8}{'x realtime':>12}{'WER':>8}")
+
+    configs = itertools.product(args.models.split(','), args.quantize.split(','), [int(t) for t in args.threads.split(',')])
+    for model_name, quantize, threads in configs:
+        try:
+            r = run_config(model_name, quantize, threads, clips)
+        except Exception as e:
+            print(f"{model_name:<10}{quantize:<7}{threads:>8}  failed: {e}")
+            continue
+        print(f"{model_name:<10}{quantize:<7}{threads:>8}{r['load_s']:>9.1f}{r['rtf']:>8.3f}{r['throughput']:>12.1f}{r['wer']:>8.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
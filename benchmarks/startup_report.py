@@ -0,0 +1,87 @@
+"""
+Breaks down what it costs to start the app: import time per top-level
+package (from `python -X importtime`) and the time taken by each lazy
+warm-up hook.
+
+    python benchmarks/startup_report.py [--module app] [--top 15] [--no-warm-up]
+
+Imports run in a fresh interpreter so nothing is already cached in
+sys.modules; warm-up hooks are timed in a second fresh interpreter.
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+from collections import defaultdict
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WARM_UP_SCRIPT = """
+import json, time
+t0 = time.perf_counter()
+import {module}
+timings = {{"import {module}": time.perf_counter() - t0}}
+for name, hook in [("nlp.pipeline.warm_up", "nlp.pipeline"), ("nlp.media_analyzer.warm_up", "nlp.media_analyzer")]:
+    t0 = time.perf_counter()
+    try:
+        __import__(hook, fromlist=["warm_up"]).warm_up()
+        timings[name] = time.perf_counter() - t0
+    except Exception as e:
+        timings[name] = repr(e)
+print(json.dumps(timings))
+"""
+
+
+def import_times(module):
+    """Runs `import module` under -X importtime; returns {module: (self_us, cumulative_us)}."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=BASE_DIR, capture_output=True, text=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    if proc.returncode != 0:
+        print(f"'import {module}' failed; times cover what was imported before the error:")
+        print("  " + (proc.stderr.strip().splitlines() or ["(no output)"])[-1])
+    return times
+
+
+def by_package(times):
+    """Sums self time per top-level package, which adds up to the total import time."""
+    totals = defaultdict(int)
+    for name, (self_us, _) in times.items():
+        totals[name.split(".")[0]] += self_us
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--module', default='app', help="Module to import (default: app).")
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--no-warm-up', action='store_true', help="Skip timing the warm-up hooks.")
+    args = parser.parse_args(argv)
+
+    times = import_times(args.module)
+    total = sum(self_us for self_us, _ in times.values())
+    print(f"import {args.module}: {total / 1000:.1f} ms across {len(times)} modules")
+    for package, self_us in by_package(times)[:args.top]:
+        print(f"  {package:<28}{self_us / 1000:9.1f} ms  {100 * self_us / total if total else 0:5.1f}%")
+
+    if not args.no_warm_up:
+        proc = subprocess.run([sys.executable, "-c", WARM_UP_SCRIPT.format(module=args.module)],
+                              cwd=BASE_DIR, capture_output=True, text=True)
+        lines = proc.stdout.strip().splitlines()
+        if proc.returncode != 0 or not lines:
+            print("Warm-up timing failed: " + (proc.stderr.strip().splitlines() or ["(no output)"])[-1])
+            return 1
+        print("warm-up hooks:")
+        for name, value in json.loads(lines[-1]).items():
+            print(f"  {name:<28}" + (f"{value * 1000:9.1f} ms" if isinstance(value, float) else f" failed: {value}"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
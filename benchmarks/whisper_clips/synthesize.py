@@ -0,0 +1,101 @@
+"""
+Regenerates the bundled benchmark clips with the eSpeak NG synthesizer and
+writes manifest.csv with their exact transcripts.
+
+    pip install espeakng-loader
+    python benchmarks/whisper_clips/synthesize.py
+
+The clips are synthetic speech (no personal recordings), 16-bit mono WAV at
+eSpeak's native 22.05 kHz so the benchmark also exercises resampling.
+Synthetic voices are cleaner than real microphones, so treat the WER they
+give as a floor; add real clips to the manifest for a realistic figure.
+"""
+import os
+import csv
+import sys
+import wave
+import ctypes
+import argparse
+
+CLIPS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CLIPS = [
+    ("morning_plan.wav",
+     "This morning I felt rested and calm. I need to finish the project report before lunch "
+     "and I want to call my sister in the evening."),
+    ("stressful_day.wav",
+     "Today was stressful. The meeting ran long, I missed the train, and I still have to "
+     "prepare the slides for tomorrow."),
+    ("gratitude.wav",
+     "I am grateful for a quiet walk in the park and a good conversation with an old friend. "
+     "Small moments like these make the week feel lighter."),
+    ("weekly_review.wav",
+     "Looking back at this week, I exercised three times, read two chapters of my book, "
+     "and finally cleaned the kitchen. Next week I plan to start studying for the exam."),
+]
+
+AUDIO_OUTPUT_SYNCHRONOUS = 0x0002
+ESPEAK_CHARS_UTF8 = 1
+POS_CHARACTER = 1
+SYNTH_CALLBACK = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.POINTER(ctypes.c_short), ctypes.c_int, ctypes.c_void_p)
+
+
+def load_espeak():
+    import espeakng_loader
+    lib = ctypes.CDLL(espeakng_loader.get_library_path())
+    lib.espeak_Initialize.restype = ctypes.c_int
+    lib.espeak_Initialize.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_char_p, ctypes.c_int]
+    lib.espeak_SetVoiceByName.argtypes = [ctypes.c_char_p]
+    lib.espeak_SetParameter.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int]
+    lib.espeak_Synth.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_uint, ctypes.c_int, ctypes.c_uint,
+                                 ctypes.c_uint, ctypes.c_void_p, ctypes.c_void_p]
+    sample_rate = lib.espeak_Initialize(AUDIO_OUTPUT_SYNCHRONOUS, 0,
+                                        espeakng_loader.get_data_path().encode(), 0)
+    if sample_rate <= 0:
+        raise RuntimeError("eSpeak NG failed to initialise")
+    return lib, sample_rate
+
+
+def synthesize(lib, text, voice, rate):
+    chunks = []
+
+    @SYNTH_CALLBACK
+    def collect(samples, count, events):
+        if count > 0:
+            chunks.append(ctypes.string_at(samples, count * 2))
+        return 0
+
+    lib.espeak_SetSynthCallback(collect)
+    lib.espeak_SetVoiceByName(voice.encode())
+    lib.espeak_SetParameter(1, rate, 0)  # espeakRATE, words per minute
+    data = text.encode('utf-8') + b'\0'
+    buffer = ctypes.create_string_buffer(data)
+    lib.espeak_Synth(buffer, len(data), 0, POS_CHARACTER, 0, ESPEAK_CHARS_UTF8, None, None)
+    lib.espeak_Synchronize()
+    return b''.join(chunks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Synthesize the Whisper benchmark clips.")
+    parser.add_argument('--voice', default='en-us')
+    parser.add_argument('--rate', type=int, default=150, help="Speaking rate in words per minute.")
+    args = parser.parse_args(argv)
+
+    lib, sample_rate = load_espeak()
+    with open(os.path.join(CLIPS_DIR, 'manifest.csv'), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['path', 'transcript'])
+        for name, text in CLIPS:
+            pcm = synthesize(lib, text, args.voice, args.rate)
+            with wave.open(os.path.join(CLIPS_DIR, name), 'wb') as out:
+                out.setnchannels(1)
+                out.setsampwidth(2)
+                out.setframerate(sample_rate)
+                out.writeframes(pcm)
+            writer.writerow([name, text])
+            print(f"{name}: {len(pcm) / 2 / sample_rate:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
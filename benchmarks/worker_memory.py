@@ -0,0 +1,109 @@
+"""
+Measures gunicorn worker memory with and without preloading (Linux only).
+
+    python benchmarks/worker_memory.py [--workers 4] [--settle 60] [--models nlp|all]
+    python benchmarks/worker_memory.py --pid <gunicorn master pid>
+
+By default it starts `gunicorn -c gunicorn.conf.py app:app` twice, with
+GUNICORN_PRELOAD=false and =true, both with the shipped WARM_UP_MODELS=nlp
+so every worker holds the NLP analyzers (Whisper runs in the transcription
+pool, not in web workers; `--models all` loads it into every worker as
+well), waits for the workers to settle, and reports RSS,
+PSS and private (USS) memory per worker from /proc/<pid>/smaps_rollup. PSS
+splits shared pages between the processes sharing them, so the PSS total is
+the real memory cost of the pool; RSS counts shared pages once per worker.
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def memory_kb(pid):
+    """Returns {'rss', 'pss', 'uss'} in kB for a process."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def child_pids(parent):
+    children = []
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as f:
+                # The ppid follows the parenthesised command name
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == parent:
+            children.append(int(name))
+    return sorted(children)
+
+
+def report(master_pid, label):
+    workers = child_pids(master_pid)
+    print(f"{label} (master {master_pid}, {len(workers)} workers)")
+    rows = [("master", memory_kb(master_pid))] + [(f"worker {pid}", memory_kb(pid)) for pid in workers]
+    for name, mem in rows:
+        print(f"  {name:<16}rss {mem['rss'] / 1024:8.1f} MB  pss {mem['pss'] / 1024:8.1f} MB  uss {mem['uss'] / 1024:8.1f} MB")
+    total_pss = sum(mem["pss"] for _, mem in rows)
+    per_worker = sum(mem["uss"] for _, mem in rows[1:]) / max(len(workers), 1)
+    print(f"  total pss {total_pss / 1024:.1f} MB, mean private per worker {per_worker / 1024:.1f} MB")
+    return total_pss
+
+
+def launch_and_measure(preload, workers, settle, port, models):
+    env = dict(os.environ, GUNICORN_PRELOAD=str(preload), WARM_UP_MODELS=models,
+               WEB_CONCURRENCY=str(workers), GUNICORN_BIND=f"127.0.0.1:{port}")
+    proc = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"], cwd=BASE_DIR, env=env)
+    try:
+        time.sleep(settle)
+        if proc.poll() is not None:
+            print(f"gunicorn exited with status {proc.returncode}")
+            return None
+        return report(proc.pid, f"preload={preload}")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pid', type=int, default=None, help="Measure a running gunicorn master instead.")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--settle', type=float, default=60.0, help="Seconds to wait for workers to load models.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--models', choices=['none', 'nlp', 'all'], default='nlp',
+                        help="WARM_UP_MODELS for both runs (default: the shipped 'nlp').")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        print("This script needs Linux /proc/<pid>/smaps_rollup.")
+        return 1
+    if args.pid:
+        report(args.pid, "gunicorn")
+        return 0
+
+    without = launch_and_measure(False, args.workers, args.settle, args.port, args.models)
+    with_preload = launch_and_measure(True, args.workers, args.settle, args.port, args.models)
+    if without and with_preload:
+        print(f"preloading saves {(without - with_preload) / 1024:.1f} MB total pss "
+              f"({100 * (without - with_preload) / without:.0f}%) with {args.workers} workers, WARM_UP_MODELS={args.models}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,34 +1,66 @@
 import os
-from pymongo import MongoClient
+import math
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import MongoClient, UpdateOne, ReplaceOne, ReturnDocument
 from pymongo.server_api import ServerApi
+from pymongo.errors import BulkWriteError
 from bson.objectid import ObjectId
 from dotenv import load_dotenv
 from urllib.parse import quote_plus
 from datetime import datetime, timedelta
+from database.instrumentation import round_trip_listener
+from nlp.phrases import phrase_tf
 
 
 # Load environment variables from your .env file
 load_dotenv()
 
 MONGO_CLUSTER_URL = os.getenv("MONGO_CLUSTER_URL")
+# Wrap entry + task writes in a transaction (needs a replica set, e.g. Atlas)
+MONGO_USE_TRANSACTIONS = os.getenv('MONGO_USE_TRANSACTIONS', 'False').lower() in ['true', '1', 't']
+# Create any missing indexes (see database/indexes.py) when connecting
+MONGO_ENSURE_INDEXES = os.getenv('MONGO_ENSURE_INDEXES', 'True').lower() in ['true', '1', 't']
+# Threads used to run independent dashboard queries side by side
+MONGO_QUERY_THREADS = int(os.getenv('MONGO_QUERY_THREADS', 5))
+# Stored-score candidates re-ranked with the current entry count for prompt topics
+PHRASE_TOPIC_CANDIDATES = int(os.getenv('PHRASE_TOPIC_CANDIDATES', 50))
+client = None
 db = None
 
-def init_db():
+def init_db(ensure=None):
     """Initializes the connection to the MongoDB Atlas database."""
-    global db
+    global client, db
     if db is None:
         try:
             if not MONGO_CLUSTER_URL:
                 raise ValueError("Missing MongoDB credentials in your .env file.")
             
-            client = MongoClient(MONGO_CLUSTER_URL, server_api=ServerApi('1'))
+            client = MongoClient(MONGO_CLUSTER_URL, server_api=ServerApi('1'),
+                                 event_listeners=[round_trip_listener])
             client.admin.command('ping')
             print("Pinged your deployment. You successfully connected to MongoDB!")
             db = client.journal_db
+            if ensure if ensure is not None else MONGO_ENSURE_INDEXES:
+                from database.indexes import ensure_indexes
+                ensure_indexes(db)
         except Exception as e:
             print(f"Error connecting to MongoDB: {e}")
+            client = None
             db = None
 
+def close_db():
+    """Closes the client; the next init_db() opens a fresh one (used around forks)."""
+    global client, db
+    if client is not None:
+        try:
+            client.close()
+        except Exception as e:
+            print(f"Error closing MongoDB client: {e}")
+    client = None
+    db = None
+
 # --- NEW: User Management Functions ---
 def find_user_by_email(email):
     """Finds a user document by their email."""
@@ -46,32 +78,558 @@ def find_user_by_id(user_id):
 def create_user(email, password_hash):
     """Inserts a new user document into the database."""
     if db is None: return None
-    return db.users.insert_one({"email": email, "password": password_hash})
+    result = db.users.insert_one({"email": email, "password": password_hash})
+    # A new user's phrase statistics start out built (and empty)
+    db.phrase_totals.insert_one({"_id": result.inserted_id, "entries": 0})
+    return result
+
+def update_user(user_id, fields):
+    """Sets `fields` on a user document. Callers should go through User.update so caches are invalidated."""
+    if db is None: return None
+    return db.users.update_one({"_id": ObjectId(user_id)}, {"$set": fields})
 
 # --- UPDATED: All functions below now require a user_id for security ---
 
-def add_entry(user_id, date, text, mood, productivity):
+# --- Entry timestamps ---
+# `date` stays the user's local calendar day ('YYYY-MM-DD', the key for day
+# panels and rollups). `date_at` is a native UTC datetime used for range
+# queries, and `tz_offset` is the user's UTC offset in minutes (east positive).
+
+MAX_TZ_OFFSET = 14 * 60
+
+def clamp_tz_offset(value):
+    """Parses a client-supplied UTC offset in minutes; anything invalid becomes 0."""
+    try:
+        return max(-MAX_TZ_OFFSET, min(MAX_TZ_OFFSET, int(value)))
+    except (TypeError, ValueError):
+        return 0
+
+def local_date(tz_offset=0, now=None):
+    """The user's current calendar day for a UTC offset in minutes."""
+    return ((now or datetime.utcnow()) + timedelta(minutes=tz_offset)).strftime('%Y-%m-%d')
+
+def day_start_utc(date, tz_offset=0):
+    """UTC datetime of local midnight at the start of `date` ('YYYY-MM-DD')."""
+    return datetime.strptime(date, '%Y-%m-%d') - timedelta(minutes=tz_offset)
+
+# --- Per-user data version ---
+# Bumped on every entry/task write or delete. Cached summaries are keyed by it,
+# so a summary can never outlive the data it was computed from.
+
+def bump_data_version(user_id, session=None):
+    if db is None: return
+    db.data_versions.update_one({"_id": ObjectId(user_id)}, {"$inc": {"version": 1}}, upsert=True, session=session)
+
+def get_data_version(user_id):
+    if db is None: return 0
+    doc = db.data_versions.find_one({"_id": ObjectId(user_id)})
+    return doc.get("version", 0) if doc else 0
+
+# --- Daily rollups ---
+# `daily_stats` holds one document per (user_id, date) with the count and sums
+# of mood and productivity for that day's analysed entries. Every write path
+# below keeps it in step with $inc, so charts never scan raw entries.
+
+MOOD_NUMERIC = {"positive": 1, "neutral": 0, "negative": -1}
+
+def _daily_increments(entries, sign=1):
+    """Sums entries (dicts with date, mood, productivity) into per-date $inc documents."""
+    increments = {}
+    for entry in entries:
+        if entry.get("mood") is None:
+            continue  # not analysed yet; counted when the analysis completes
+        inc = increments.setdefault(entry["date"], {"count": 0, "mood_sum": 0, "productivity_sum": 0.0})
+        inc["count"] += sign
+        inc["mood_sum"] += sign * MOOD_NUMERIC.get(entry["mood"], 0)
+        inc["productivity_sum"] += sign * float(entry.get("productivity") or 0)
+    return increments
+
+def _apply_daily_increments(user_id, increments, session=None):
+    if not increments: return
+    user_obj_id = ObjectId(user_id)
+    db.daily_stats.bulk_write([
+        UpdateOne({"user_id": user_obj_id, "date": date},
+                  {"$inc": inc, "$setOnInsert": {"day": datetime.strptime(date, '%Y-%m-%d')}}, upsert=True)
+        for date, inc in increments.items()
+    ], ordered=False, session=session)
+
+def rebuild_daily_stats(user_id=None, dates=None):
+    """
+    Recomputes rollups from raw entries: for everyone, one user, or some of
+    a user's dates. Used after bulk rescoring and to repair drift; request
+    paths keep the rollups current with increments instead.
+
+    Each rollup is replaced in place, so readers never see a day missing
+    mid-rebuild. Rollups for days that no longer have analysed entries are
+    deleted afterwards.
+    """
+    if db is None: return
+    scope = {}
+    if user_id is not None:
+        scope["user_id"] = ObjectId(user_id)
+    if dates is not None:
+        scope["date"] = {"$in": list(dates)}
+    rebuilt_at = datetime.utcnow()
+    db.entries.aggregate([
+        {"$match": {**scope, "mood": {"$ne": None}}},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "date": "$date"},
+            "count": {"$sum": 1},
+            "mood_sum": {"$sum": {"$switch": {"branches": [{"case": {"$eq": ["$mood", "positive"]}, "then": 1}, {"case": {"$eq": ["$mood", "negative"]}, "then": -1}], "default": 0}}},
+            "productivity_sum": {"$sum": {"$ifNull": ["$productivity", 0]}}
+        }},
+        {"$project": {"_id": 0, "user_id": "$_id.user_id", "date": "$_id.date",
+                      "day": {"$dateFromString": {"dateString": "$_id.date", "format": "%Y-%m-%d"}},
+                      "count": 1, "mood_sum": 1, "productivity_sum": 1, "rebuilt_at": {"$literal": rebuilt_at}}},
+        {"$merge": {"into": "daily_stats", "on": ["user_id", "date"], "whenMatched": "replace", "whenNotMatched": "insert"}}
+    ])
+    # Rollups this run did not write: their days lost their entries, unless
+    # an entry was added while the rebuild ran, so check before deleting.
+    for stale in db.daily_stats.find({**scope, "rebuilt_at": {"$ne": rebuilt_at}}, {"user_id": 1, "date": 1}):
+        if db.entries.find_one({"user_id": stale["user_id"], "date": stale["date"], "mood": {"$ne": None}}, {"_id": 1}) is None:
+            db.daily_stats.delete_one({"_id": stale["_id"], "rebuilt_at": {"$ne": rebuilt_at}})
+
+# --- Phrase statistics ---
+# `phrase_stats` holds one document per (user_id, phrase) for every bigram in
+# the user's analysed entries: how many entries contain it (df), the sum of its
+# per-entry term frequency (tf_sum), the sum of those entries' numeric moods
+# (mood_sum) and a stored tf-idf score, tf_sum * ln(entries / (1 + df)), set
+# only once df >= 2. `phrase_totals` holds each user's analysed entry count and
+# marks their statistics as built: it is created with the user or by
+# rebuild_phrase_stats, and writes only update users that have one, so a user
+# whose history was never counted stays on the old prompt path.
+#
+# A stored score uses the entry count from the last time its phrase changed,
+# so untouched phrases drift from true tf-idf as the user writes more. Reads
+# therefore take the top candidates by stored score and re-rank them with the
+# current count; refresh_phrase_scores (run on a schedule) resets the drift.
+
+def _phrase_increments(entries, sign=1):
+    """Returns (entry count delta, {phrase: $inc document}) for entries with text and mood."""
+    counted, increments = 0, {}
+    for entry in entries:
+        if entry.get("mood") is None:
+            continue  # not analysed yet; counted when the analysis completes
+        counted += sign
+        mood = sign * MOOD_NUMERIC.get(entry["mood"], 0)
+        for phrase, tf in phrase_tf(entry.get("text")).items():
+            inc = increments.setdefault(phrase, {"df": 0, "tf_sum": 0.0, "mood_sum": 0})
+            inc["df"] += sign
+            inc["tf_sum"] += sign * tf
+            inc["mood_sum"] += mood
+    return counted, increments
+
+def _phrase_score(df, tf_sum, entry_count):
+    return tf_sum * math.log(entry_count / (1 + df)) if df >= 2 else None
+
+def _score_expression(entry_count):
+    return {"$cond": [
+        {"$gte": ["$df", 2]},
+        {"$multiply": ["$tf_sum", {"$ln": {"$divide": [entry_count, {"$add": [1, "$df"]}]}}]},
+        None
+    ]}
+
+def _phrase_update(inc, entry_count):
+    # Pipeline update: apply the increments, then rescore from the new values.
+    return [
+        {"$set": {field: {"$add": [{"$ifNull": [f"${field}", 0]}, value]} for field, value in inc.items()}},
+        {"$set": {"score": _score_expression(entry_count)}}
+    ]
+
+def _apply_phrase_increments(user_id, counted, increments, session=None):
+    if not counted: return
+    user_obj_id = ObjectId(user_id)
+    totals = db.phrase_totals.find_one_and_update({"_id": user_obj_id}, {"$inc": {"entries": counted}},
+                                                  return_document=ReturnDocument.AFTER, session=session)
+    if totals is None:
+        return  # statistics never built for this user; rebuild_phrase_stats counts everything
+    if increments:
+        db.phrase_stats.bulk_write([
+            UpdateOne({"user_id": user_obj_id, "phrase": phrase}, _phrase_update(inc, totals["entries"]), upsert=True)
+            for phrase, inc in increments.items()
+        ], ordered=False, session=session)
+    if counted < 0:
+        db.phrase_stats.delete_many({"user_id": user_obj_id, "df": {"$lte": 0}}, session=session)
+
+def rebuild_phrase_stats(user_id=None):
+    """
+    Recomputes phrase statistics from raw entries, for everyone or one user.
+    Counters are replaced in place and phrases the rebuild did not write are
+    deleted afterwards, so prompts keep reading a full set meanwhile.
+    """
+    if db is None: return
+    if user_id is not None:
+        user_ids = [ObjectId(user_id)]
+    else:
+        user_ids = [user["_id"] for user in db.users.find({}, {"_id": 1})]
+    for user_obj_id in user_ids:
+        counted, increments = _phrase_increments(
+            db.entries.find({"user_id": user_obj_id, "mood": {"$ne": None}}, {"text": 1, "mood": 1}))
+        rebuilt_at = datetime.utcnow()
+        if increments:
+            db.phrase_stats.bulk_write([
+                ReplaceOne({"user_id": user_obj_id, "phrase": phrase},
+                           {"user_id": user_obj_id, "phrase": phrase, **inc, "rebuilt_at": rebuilt_at,
+                            "score": _phrase_score(inc["df"], inc["tf_sum"], counted)}, upsert=True)
+                for phrase, inc in increments.items()
+            ], ordered=False)
+        db.phrase_stats.delete_many({"user_id": user_obj_id, "rebuilt_at": {"$ne": rebuilt_at}})
+        db.phrase_totals.replace_one({"_id": user_obj_id}, {"entries": counted}, upsert=True)
+
+def refresh_phrase_scores(user_id=None):
+    """Rescores stored phrases with each user's current entry count, on the server. Returns users refreshed."""
+    if db is None: return 0
+    scope = {} if user_id is None else {"_id": ObjectId(user_id)}
+    refreshed = 0
+    for totals in db.phrase_totals.find(scope):
+        if totals.get("entries", 0) > 0:
+            db.phrase_stats.update_many({"user_id": totals["_id"], "df": {"$gte": 2}},
+                                        [{"$set": {"score": _score_expression(totals["entries"])}}])
+            refreshed += 1
+    return refreshed
+
+def get_phrase_totals(user_id):
+    """The user's analysed entry count, or None if phrase stats were never built for them."""
+    if db is None: return None
+    doc = db.phrase_totals.find_one({"_id": ObjectId(user_id)})
+    return doc.get("entries", 0) if doc else None
+
+def get_phrase_doc_freqs(user_id, phrases):
+    """{phrase: df} for those of `phrases` the user has written before."""
+    if db is None or not phrases: return {}
+    cursor = db.phrase_stats.find({"user_id": ObjectId(user_id), "phrase": {"$in": list(phrases)}},
+                                  {"_id": 0, "phrase": 1, "df": 1})
+    return {doc["phrase"]: doc["df"] for doc in cursor}
+
+def get_top_phrases(user_id, entry_count, limit=5, candidates=PHRASE_TOPIC_CANDIDATES):
+    """
+    The user's highest tf-idf recurring bigrams (df >= 2): the first
+    `candidates` keys of the (user_id, score) index, re-ranked with the
+    current entry count. Returns dicts with phrase, df and mood_sum.
+    """
+    if db is None or not entry_count: return []
+    # Unscored phrases (df < 2) hold a null score, which sorts last
+    cursor = db.phrase_stats.find({"user_id": ObjectId(user_id)},
+                                  {"_id": 0, "phrase": 1, "df": 1, "tf_sum": 1, "mood_sum": 1, "score": 1})
+    scored = [doc for doc in cursor.sort("score", -1).limit(max(limit, candidates)) if doc.get("score") is not None]
+    scored.sort(key=lambda doc: _phrase_score(doc["df"], doc["tf_sum"], entry_count), reverse=True)
+    return scored[:limit]
+
+def get_latest_entry(user_id):
+    """The user's most recent entry (text and mood only)."""
+    if db is None: return None
+    return db.entries.find_one({"user_id": ObjectId(user_id)}, {"text": 1, "mood": 1}, sort=[("date", -1)])
+
+def _record_entry_changes(user_id, entries, sign=1, task_write=None, session=None):
+    """
+    The writes that follow an entry insert or delete: its tasks (`task_write`,
+    a callable taking the session), the rollup and phrase increments and the
+    data version bump. They are independent, so they run concurrently and a
+    submit waits on the slowest rather than their sum. A session cannot be
+    shared between threads, so inside a transaction they run in turn.
+    """
+    calls = [
+        lambda: _apply_daily_increments(user_id, _daily_increments(entries, sign), session=session),
+        lambda: _apply_phrase_increments(user_id, *_phrase_increments(entries, sign), session=session),
+        lambda: bump_data_version(user_id, session=session),
+    ]
+    if task_write is not None:
+        calls.insert(0, lambda: task_write(session))
+    if session is not None:
+        for call in calls:
+            call()
+    else:
+        run_concurrently(*calls)
+
+def add_entry(user_id, date, text, mood, productivity, date_at=None, tz_offset=0):
     if db is None: return None
     entry_document = {
         "user_id": ObjectId(user_id), 
         "date": date, 
+        "date_at": date_at or datetime.utcnow(),
+        "tz_offset": tz_offset,
         "text": text, 
         "mood": mood, 
         "productivity": productivity
     }
     result = db.entries.insert_one(entry_document)
+    _record_entry_changes(user_id, [entry_document])
     return result.inserted_id
 
-def add_task(user_id, entry_id, task_text):
-    if db is None: return None
-    task_document = {
+def _task_document(user_id, entry_id, task_text):
+    return {
         "user_id": ObjectId(user_id),
         "entry_id": entry_id, 
         "task_text": task_text, 
         "status": "pending", 
         "completed": False
     }
-    db.tasks.insert_one(task_document)
+
+def add_task(user_id, entry_id, task_text):
+    if db is None: return None
+    db.tasks.insert_one(_task_document(user_id, entry_id, task_text))
+    bump_data_version(user_id)
+
+def add_entry_with_tasks(user_id, date, text, mood, productivity, tasks, use_transaction=None,
+                         date_at=None, tz_offset=0):
+    """
+    Writes an entry and all of its tasks together: one insert_one for the entry
+    and one insert_many for the tasks (instead of 1+N round trips), optionally
+    inside a transaction so a failure never leaves an entry without its tasks.
+    Returns the new entry's _id.
+    """
+    if db is None: return None
+    if use_transaction is None:
+        use_transaction = MONGO_USE_TRANSACTIONS
+    entry_document = {
+        "user_id": ObjectId(user_id), 
+        "date": date, 
+        "date_at": date_at or datetime.utcnow(),
+        "tz_offset": tz_offset,
+        "text": text, 
+        "mood": mood, 
+        "productivity": productivity
+    }
+
+    def write(session=None):
+        entry_id = db.entries.insert_one(entry_document, session=session).inserted_id
+        task_write = None
+        if tasks:
+            task_write = lambda s: db.tasks.insert_many([_task_document(user_id, entry_id, t) for t in tasks], session=s)
+        _record_entry_changes(user_id, [entry_document], task_write=task_write, session=session)
+        return entry_id
+
+    if use_transaction and client is not None:
+        with client.start_session() as session:
+            return session.with_transaction(write)
+    return write()
+
+def add_entries_bulk(user_id, entries):
+    """
+    Inserts many analysed entries and their tasks with unordered insert_many
+    calls. `entries` is a list of dicts with date, text, mood, productivity
+    and tasks, plus optional date_at / tz_offset (date_at defaults to local
+    midnight of `date`). Entry ids are generated client-side so the tasks can
+    reference them without waiting for the entry insert. Returns (entries, tasks) inserted.
+    """
+    if db is None or not entries: return 0, 0
+    user_obj_id = ObjectId(user_id)
+    entry_documents, task_documents = [], []
+    for entry in entries:
+        entry_id = ObjectId()
+        entry_documents.append({
+            "_id": entry_id,
+            "user_id": user_obj_id,
+            "date": entry["date"],
+            "date_at": entry.get("date_at") or day_start_utc(entry["date"], entry.get("tz_offset", 0)),
+            "tz_offset": entry.get("tz_offset", 0),
+            "text": entry["text"],
+            "mood": entry["mood"],
+            "productivity": entry["productivity"]
+        })
+        task_documents.extend(_task_document(user_id, entry_id, t) for t in entry.get("tasks", []))
+
+    landed = entry_documents
+    try:
+        db.entries.insert_many(entry_documents, ordered=False)
+    except BulkWriteError as e:
+        # Some inserts failed: count only the entries that landed, and keep their tasks only
+        failed = {error["index"] for error in e.details.get("writeErrors", [])}
+        landed = [doc for i, doc in enumerate(entry_documents) if i not in failed]
+        landed_ids = {doc["_id"] for doc in landed}
+        task_documents = [task for task in task_documents if task["entry_id"] in landed_ids]
+    inserted_entries = len(landed)
+    _apply_daily_increments(user_id, _daily_increments(landed))
+    _apply_phrase_increments(user_id, *_phrase_increments(landed))
+    inserted_tasks = 0
+    if task_documents:
+        try:
+            inserted_tasks = len(db.tasks.insert_many(task_documents, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            inserted_tasks = e.details.get("nInserted", 0)
+    bump_data_version(user_id)
+    return inserted_entries, inserted_tasks
+
+def add_pending_entry(user_id, date, text, date_at=None, tz_offset=0):
+    """Stores a raw entry straight away; mood, productivity and tasks are filled in later."""
+    if db is None: return None
+    entry_document = {
+        "user_id": ObjectId(user_id), 
+        "date": date, 
+        "date_at": date_at or datetime.utcnow(),
+        "tz_offset": tz_offset,
+        "text": text, 
+        "mood": None, 
+        "productivity": None,
+        "analysis_status": "pending",
+        "analysis_queued_at": datetime.utcnow()
+    }
+    entry_id = db.entries.insert_one(entry_document).inserted_id
+    bump_data_version(user_id)
+    return entry_id
+
+def complete_entry_analysis(user_id, entry_id, mood, productivity, tasks, use_transaction=None):
+    """Records the analysis results for a pending entry and inserts its tasks."""
+    if db is None: return
+    if use_transaction is None:
+        use_transaction = MONGO_USE_TRANSACTIONS
+
+    def write(session=None):
+        # Only a still-pending entry is updated, so a retried job cannot count twice.
+        entry = db.entries.find_one_and_update(
+            {"_id": entry_id, "user_id": ObjectId(user_id), "analysis_status": "pending"},
+            {"$set": {"mood": mood, "productivity": productivity, "analysis_status": "done"}},
+            projection={"date": 1, "text": 1},
+            session=session
+        )
+        if entry is None: return
+        task_write = None
+        if tasks:
+            task_write = lambda s: db.tasks.insert_many([_task_document(user_id, entry_id, t) for t in tasks], session=s)
+        _record_entry_changes(user_id, [{"date": entry["date"], "text": entry.get("text"), "mood": mood,
+                                         "productivity": productivity}], task_write=task_write, session=session)
+
+    if use_transaction and client is not None:
+        with client.start_session() as session:
+            session.with_transaction(write)
+    else:
+        write()
+
+def claim_stale_pending_entry(queued_before):
+    """
+    Takes over one entry that has been pending since before `queued_before`
+    (its analysis was lost with a restarted worker) by stamping it as queued
+    now. Returns the entry's id, user and text, or None if there is none.
+    """
+    if db is None: return None
+    return db.entries.find_one_and_update(
+        # Entries stored before analysis_queued_at existed have no stamp and count as stale
+        {"analysis_status": "pending", "analysis_queued_at": {"$not": {"$gte": queued_before}}},
+        {"$set": {"analysis_queued_at": datetime.utcnow()}},
+        projection={"user_id": 1, "text": 1}
+    )
+
+def mark_entry_analysis_failed(user_id, entry_id, error):
+    if db is None: return
+    db.entries.update_one(
+        {"_id": entry_id, "user_id": ObjectId(user_id)},
+        {"$set": {"analysis_status": "failed", "analysis_error": str(error)}}
+    )
+
+def get_entry_analysis(user_id, entry_id):
+    """Returns an entry's analysis state and, once done, its results and tasks."""
+    if db is None: return None
+    try:
+        entry_obj_id = ObjectId(entry_id)
+    except Exception:
+        return None
+    entry = db.entries.find_one(
+        {"_id": entry_obj_id, "user_id": ObjectId(user_id)},
+        {"date": 1, "mood": 1, "productivity": 1, "analysis_status": 1}
+    )
+    if entry is None: return None
+    entry["analysis_status"] = entry.get("analysis_status", "done")
+    entry["tasks"] = []
+    if entry["analysis_status"] == "done":
+        entry["tasks"] = [t["task_text"] for t in db.tasks.find({"entry_id": entry_obj_id}, {"task_text": 1})]
+    return entry
+
+# --- Audio transcription jobs ---
+# One document per upload: status moves queued -> transcribing -> analyzing -> done | failed.
+
+# Audio jobs move queued -> transcribing -> analyzing -> done | failed. Queued
+# jobs wait here, with the path of their upload on `host`, until that host's
+# transcription dispatcher claims them (see nlp/audio_jobs.py).
+AUDIO_ACTIVE_STATUSES = ["queued", "transcribing", "analyzing"]
+
+def create_audio_job(job_id, user_id, filename=None, sha256=None, file_path=None, tz_offset=0, host=None):
+    if db is None: return None
+    now = datetime.utcnow()
+    return db.audio_jobs.insert_one({
+        "_id": job_id, "user_id": ObjectId(user_id), "filename": filename, "sha256": sha256,
+        "file_path": file_path, "tz_offset": tz_offset, "host": host,
+        "status": "queued", "created_at": now, "updated_at": now
+    })
+
+def count_active_audio_jobs(host):
+    """Jobs waiting or in progress on `host` (the bound behind the upload endpoint's 429)."""
+    if db is None: return 0
+    return db.audio_jobs.count_documents({"host": host, "status": {"$in": AUDIO_ACTIVE_STATUSES}})
+
+def get_live_audio_files(host):
+    """Upload paths still needed by jobs waiting or in progress on `host`."""
+    if db is None: return set()
+    jobs = db.audio_jobs.find({"host": host, "status": {"$in": AUDIO_ACTIVE_STATUSES}}, {"file_path": 1})
+    return {job["file_path"] for job in jobs if job.get("file_path")}
+
+def claim_audio_job(host):
+    """Atomically takes the oldest queued job on `host` and marks it transcribing, or returns None."""
+    if db is None: return None
+    return db.audio_jobs.find_one_and_update(
+        {"host": host, "status": "queued"},
+        {"$set": {"status": "transcribing", "updated_at": datetime.utcnow()}},
+        sort=[("_id", 1)], return_document=ReturnDocument.AFTER
+    )
+
+def fail_interrupted_audio_jobs(host):
+    """
+    Marks jobs that were in progress on `host` when its dispatcher stopped as
+    failed, and returns them so their uploads can be removed. Queued jobs are
+    left for the next dispatcher.
+    """
+    if db is None: return []
+    query = {"host": host, "status": {"$in": ["transcribing", "analyzing"]}}
+    jobs = list(db.audio_jobs.find(query, {"file_path": 1}))
+    if jobs:
+        db.audio_jobs.update_many(
+            {"_id": {"$in": [job["_id"] for job in jobs]}, "status": {"$in": ["transcribing", "analyzing"]}},
+            {"$set": {"status": "failed", "error": "Processing was interrupted by a restart. Please upload the recording again.",
+                      "updated_at": datetime.utcnow()}})
+    return jobs
+
+def update_audio_job(job_id, fields):
+    if db is None: return
+    db.audio_jobs.update_one({"_id": job_id}, {"$set": {**fields, "updated_at": datetime.utcnow()}})
+
+def find_audio_job_by_hash(user_id, sha256):
+    """
+    The user's most recent job for identical audio that is still in progress,
+    or finished with its entry still there, if any (upload retries). Audio
+    whose entry was deleted can be uploaded again.
+    """
+    if db is None: return None
+    job = db.audio_jobs.find_one(
+        {"user_id": ObjectId(user_id), "sha256": sha256, "status": {"$in": AUDIO_ACTIVE_STATUSES + ["done"]}},
+        {"status": 1, "entry_id": 1},
+        sort=[("_id", -1)]
+    )
+    if job is None or job["status"] in AUDIO_ACTIVE_STATUSES:
+        return job
+    entry = db.entries.find_one({"_id": job.get("entry_id"), "user_id": ObjectId(user_id)}, {"_id": 1})
+    return job if entry is not None else None
+
+def get_cached_transcript(sha256, model):
+    """A transcript previously produced by `model` for audio with this SHA-256, or None."""
+    if db is None: return None
+    doc = db.audio_transcripts.find_one({"_id": f"{model}:{sha256}"}, {"text": 1})
+    return doc["text"] if doc else None
+
+def save_cached_transcript(sha256, model, text):
+    if db is None: return
+    db.audio_transcripts.update_one(
+        {"_id": f"{model}:{sha256}"},
+        {"$set": {"text": text, "created_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+def get_audio_job(user_id, job_id):
+    """Returns a user's audio job, or None if it does not exist or belongs to someone else."""
+    if db is None: return None
+    try:
+        job_obj_id = ObjectId(job_id)
+    except Exception:
+        return None
+    return db.audio_jobs.find_one({"_id": job_obj_id, "user_id": ObjectId(user_id)})
 
 def update_task_status(user_id, task_id, completed):
     if db is None: return None
@@ -80,14 +638,94 @@ def update_task_status(user_id, task_id, completed):
         {"_id": ObjectId(task_id), "user_id": ObjectId(user_id)}, 
         {"$set": {"completed": completed}}
     )
+    bump_data_version(user_id)
 
 def get_all_entries_sorted_asc(user_id):
     if db is None: return []
     return list(db.entries.find({"user_id": ObjectId(user_id)}).sort("date", 1))
 
+# Fields the dashboard's day panels need; the entry text is left out
+ENTRY_SUMMARY_PROJECTION = {"date": 1, "mood": 1, "productivity": 1, "analysis_status": 1}
+
+def get_entry_days_page(user_id, days=14, before=None):
+    """
+    Keyset-paginated entries for the `days` most recent dates strictly before
+    `before` (a 'YYYY-MM-DD' cursor; None means from the newest). Pages always
+    contain whole days. Returns (entries sorted newest day first, next cursor
+    or None when there is nothing older).
+    """
+    if db is None: return [], None
+    query = {"user_id": ObjectId(user_id)}
+    if before:
+        query["date"] = {"$lt": before}
+
+    # Walk the (user_id, date, _id) index newest-first projecting only the date,
+    # so this is a covered scan that stops once days+1 distinct dates are seen.
+    dates = []
+    for doc in db.entries.find(query, {"date": 1, "_id": 0}).sort("date", -1):
+        if not dates or doc["date"] != dates[-1]:
+            dates.append(doc["date"])
+            if len(dates) > days:
+                break
+    if not dates: return [], None
+
+    has_more = len(dates) > days
+    oldest = dates[:days][-1]
+    query["date"] = {"$gte": oldest, **({"$lt": before} if before else {})}
+    # Matches the (user_id, date desc, _id) index, so no in-memory SORT
+    entries = list(db.entries.find(query, ENTRY_SUMMARY_PROJECTION).sort([("date", -1), ("_id", 1)]))
+    return entries, (oldest if has_more else None)
+
+# --- Dashboard ---
+
+_query_pool = None
+_query_pool_lock = threading.Lock()
+
+def run_concurrently(*calls):
+    """
+    Runs independent zero-argument callables on a shared thread pool and
+    returns their results in order. Each runs in a copy of the caller's
+    context so per-request instrumentation still sees it.
+    """
+    global _query_pool
+    if _query_pool is None:
+        # Created on first use, so a pre-forked server starts its threads in each worker
+        with _query_pool_lock:
+            if _query_pool is None:
+                _query_pool = ThreadPoolExecutor(max_workers=MONGO_QUERY_THREADS, thread_name_prefix='mongo-query')
+    futures = [_query_pool.submit(contextvars.copy_context().run, call) for call in calls]
+    return [future.result() for future in futures]
+
+def get_dashboard_data(user_id, days=14, chart_limit=30, task_limit=5):
+    """
+    Everything the dashboard renders. The pending, recent and completed task
+    lists, the chart rollups and the day-panel entries plus their tasks are
+    independent index-backed queries, fetched concurrently. The day panels
+    take three in a row (date scan, entries, their tasks) and the other four
+    queries run alongside, so latency is three round trips instead of seven.
+    """
+    def entry_page():
+        entries, next_cursor = get_entry_days_page(user_id, days=days)
+        tasks = get_tasks_for_entry_ids(user_id, [e["_id"] for e in entries], {"entry_id": 1, "task_text": 1})
+        return entries, next_cursor, tasks
+
+    (entries, next_cursor, entry_tasks), pending_tasks, recent_tasks, completed_tasks, chart_data = run_concurrently(
+        entry_page,
+        lambda: get_pending_tasks(user_id),
+        lambda: get_tasks_with_entry_info(user_id, None, task_limit),
+        lambda: get_tasks_with_entry_info(user_id, True, task_limit),
+        lambda: get_chart_data(user_id, chart_limit),
+    )
+    return {
+        "entries": entries, "next_cursor": next_cursor, "entry_tasks": entry_tasks,
+        "pending_tasks": pending_tasks, "recent_tasks": recent_tasks,
+        "completed_tasks": completed_tasks, "chart_data": chart_data,
+    }
+
 def get_pending_tasks(user_id):
     if db is None: return []
-    return list(db.tasks.find({"user_id": ObjectId(user_id), "completed": False}))
+    # Oldest first, off the (user_id, completed, _id) index
+    return list(db.tasks.find({"user_id": ObjectId(user_id), "completed": False}).sort("_id", 1))
 
 def get_tasks_with_entry_info(user_id, completed_status=None, limit=5):
     if db is None: return []
@@ -105,21 +743,18 @@ def get_tasks_with_entry_info(user_id, completed_status=None, limit=5):
     return list(db.tasks.aggregate(pipeline))
 
 def get_chart_data(user_id, limit=30):
+    """Per-day averages for the `limit` most recent days with entries, oldest first (from rollups)."""
     if db is None: return []
-    pipeline = [
-        {"$match": {"user_id": ObjectId(user_id)}}, # Filter by user first
-        {"$sort": {"date": -1}},
-        {"$limit": limit},
-        {"$addFields": {"mood_numeric": {"$switch": {"branches": [{"case": {"$eq": ["$mood", "positive"]}, "then": 1}, {"case": {"$eq": ["$mood", "negative"]}, "then": -1}], "default": 0}}}},
-        {"$group": {"_id": "$date", "avg_productivity": {"$avg": "$productivity"}, "avg_mood": {"$avg": "$mood_numeric"}}},
-        {"$sort": {"_id": 1}},
-        {"$project": {"date": "$_id", "avg_productivity": "$avg_productivity", "avg_mood": "$avg_mood", "_id": 0}}
-    ]
-    return list(db.entries.aggregate(pipeline))
+    days = db.daily_stats.find({"user_id": ObjectId(user_id), "count": {"$gt": 0}}).sort("date", -1).limit(limit)
+    return [{
+        "date": day["date"],
+        "avg_productivity": day["productivity_sum"] / day["count"],
+        "avg_mood": day["mood_sum"] / day["count"]
+    } for day in reversed(list(days))]
 
-def get_tasks_for_entry_ids(user_id, entry_ids):
+def get_tasks_for_entry_ids(user_id, entry_ids, projection=None):
     if db is None or not entry_ids: return []
-    return list(db.tasks.find({"user_id": ObjectId(user_id), "entry_id": {"$in": entry_ids}}))
+    return list(db.tasks.find({"user_id": ObjectId(user_id), "entry_id": {"$in": entry_ids}}, projection))
 
 def execute_aggregation(user_id, collection_name, pipeline):
     if db is None: return []
@@ -136,45 +771,99 @@ def get_entries_and_tasks_for_date(user_id, date):
     ]
     return list(db.entries.aggregate(pipeline))
 
-def delete_entries_and_tasks(user_id, entry_ids):
+def delete_entries_and_tasks(user_id, entry_ids, use_transaction=None):
+    """
+    Deletes entries and their tasks and takes them out of the rollups: one
+    find for the entries, one delete_many, then the task delete, decrements
+    and version bump together. With MONGO_USE_TRANSACTIONS the fetch and
+    delete run in a transaction, so the decrements match exactly what was
+    deleted even when two requests delete the same entries.
+    """
     if db is None or not entry_ids: return
+    if use_transaction is None:
+        use_transaction = MONGO_USE_TRANSACTIONS
 
     valid_object_ids = [ObjectId(eid) for eid in entry_ids if eid and len(eid) == 24]
     if not valid_object_ids: return
 
     # Security: Ensure the queries include the user_id
-    db.tasks.delete_many({"user_id": ObjectId(user_id), "entry_id": {"$in": valid_object_ids}})
-    db.entries.delete_many({"user_id": ObjectId(user_id), "_id": {"$in": valid_object_ids}})
+    user_obj_id = ObjectId(user_id)
 
-def get_entries_for_period(user_id, days=7):
+    def write(session=None):
+        doomed = list(db.entries.find({"user_id": user_obj_id, "_id": {"$in": valid_object_ids}},
+                                      {"date": 1, "mood": 1, "productivity": 1, "text": 1}, session=session))
+        if not doomed: return
+        deleted_count = db.entries.delete_many({"user_id": user_obj_id, "_id": {"$in": [e["_id"] for e in doomed]}},
+                                               session=session).deleted_count
+        if deleted_count < len(doomed):
+            # Only without a transaction: a concurrent delete took some of these
+            # and there is no telling which, so neither request decrements them.
+            # `python -m database.rollups rebuild` repairs the counts.
+            if deleted_count:
+                print(f"Concurrent delete for user {user_id}: rollups not updated for {len(doomed)} entries")
+            db.tasks.delete_many({"user_id": user_obj_id, "entry_id": {"$in": [e["_id"] for e in doomed]}},
+                                 session=session)
+            bump_data_version(user_id, session=session)
+            return
+        doomed_ids = [e["_id"] for e in doomed]
+        _record_entry_changes(
+            user_id, doomed, sign=-1, session=session,
+            task_write=lambda s: db.tasks.delete_many({"user_id": user_obj_id, "entry_id": {"$in": doomed_ids}}, session=s))
+
+    if use_transaction and client is not None:
+        with client.start_session() as session:
+            session.with_transaction(write)
+    else:
+        write()
+
+def period_start(days):
+    """First date (inclusive, 'YYYY-MM-DD') of the last-N-days window used by summaries."""
+    return (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+
+def get_entries_for_period(user_id, days=7, start_date_str=None):
     """Fetches all journal entries for a user within the last N days."""
     if db is None: return []
-    start_date = datetime.now() - timedelta(days=days)
-    start_date_str = start_date.strftime('%Y-%m-%d')
+    start_date_str = start_date_str or period_start(days)
     
-    return list(db.entries.find({
-        "user_id": ObjectId(user_id),
-        "date": {"$gte": start_date_str}
-    }).sort("date", 1))
+    # Range scan on the (user_id, date_at) index. Local midnight is at most 14h
+    # ahead of UTC, so widen the bound by that and let the local `date` trim it.
+    # Entries not yet backfilled by database.migrate_dates have no date_at and
+    # are found on the (user_id, date) index instead.
+    user_obj_id = ObjectId(user_id)
+    entries = db.entries.find({"$or": [
+        {"user_id": user_obj_id, "date_at": {"$gte": day_start_utc(start_date_str, MAX_TZ_OFFSET)},
+         "date": {"$gte": start_date_str}},
+        {"user_id": user_obj_id, "date": {"$gte": start_date_str}, "date_at": {"$exists": False}},
+    ]})
+    return sorted(entries, key=lambda e: (e["date"], e.get("date_at") or datetime.min))
 
-def save_summary_to_cache(user_id, period, summary_data):
+def save_summary_to_cache(user_id, period, summary_data, data_version=None, window_start=None):
     """Saves a generated summary to the 'summaries' collection with a timestamp."""
     if db is None: return
     db.summaries.update_one(
         {"user_id": ObjectId(user_id), "period": period},
-        {"$set": {"summary": summary_data, "created_at": datetime.utcnow()}},
+        {"$set": {"summary": summary_data, "created_at": datetime.utcnow(),
+                  "data_version": data_version, "window_start": window_start}},
         upsert=True
     )
 
-def get_summary_from_cache(user_id, period, max_age_hours=6):
-    """Retrieves a summary from the cache if it's not too old."""
+def get_summary_from_cache(user_id, period, max_age_hours=6, data_version=None, window_start=None):
+    """
+    Retrieves a summary from the cache if it's not too old. When a data
+    version / window start is given, the cached summary must match them too.
+    """
     if db is None: return None
     try:
         user_obj_id = ObjectId(user_id)
     except Exception:
         return None
         
-    cached = db.summaries.find_one({"user_id": user_obj_id, "period": period})
+    query = {"user_id": user_obj_id, "period": period}
+    if data_version is not None:
+        query["data_version"] = data_version
+    if window_start is not None:
+        query["window_start"] = window_start
+    cached = db.summaries.find_one(query)
     
     if cached and 'created_at' in cached:
         cache_age = datetime.utcnow() - cached['created_at']
@@ -0,0 +1,244 @@
+"""
+Declarative index definitions for every collection used by database.db,
+plus a query-plan audit.
+
+    python -m database.indexes ensure
+    python -m database.indexes audit [--user <user_id>]
+
+`ensure` creates any missing index (it also runs from init_db unless
+MONGO_ENSURE_INDEXES=false). `audit` calls each read function in
+database.db, captures the commands it sends, runs explain() on them and
+flags any COLLSCAN or blocking in-memory SORT.
+"""
+import os
+import sys
+import argparse
+from datetime import datetime
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel, monitoring
+
+NLP_CACHE_TTL = int(os.getenv('NLP_CACHE_TTL', 6 * 3600))
+AUDIO_TRANSCRIPT_CACHE_TTL = int(os.getenv('AUDIO_TRANSCRIPT_CACHE_TTL', 30 * 86400))
+
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "entries": [
+        # Dashboard, day view, period queries and charts: always user + date. The
+        # _id suffix lets day pages sort newest day first, oldest entry first,
+        # straight off the index; the (user_id, date) prefix serves everything else.
+        IndexModel([("user_id", ASCENDING), ("date", DESCENDING), ("_id", ASCENDING)], name="user_date_id"),
+        # Period range scans on the native datetime
+        IndexModel([("user_id", ASCENDING), ("date_at", ASCENDING)], name="user_date_at"),
+        # Recovery of async analyses lost in a restart; only pending entries are indexed
+        IndexModel([("analysis_queued_at", ASCENDING)], name="pending_queued_at",
+                   partialFilterExpression={"analysis_status": "pending"}),
+    ],
+    "tasks": [
+        # Pending/completed lists sorted newest first
+        IndexModel([("user_id", ASCENDING), ("completed", ASCENDING), ("_id", DESCENDING)], name="user_completed_id"),
+        # Recent tasks regardless of status
+        IndexModel([("user_id", ASCENDING), ("_id", DESCENDING)], name="user_id_desc"),
+        # Tasks for a set of entries, and deletes by entry
+        IndexModel([("user_id", ASCENDING), ("entry_id", ASCENDING)], name="user_entry"),
+        # $lookup from entries joins on entry_id alone
+        IndexModel([("entry_id", ASCENDING)], name="entry_id"),
+    ],
+    "daily_stats": [
+        # One rollup document per user and day; also the $merge key for rebuilds
+        IndexModel([("user_id", ASCENDING), ("date", ASCENDING)], name="user_date", unique=True),
+        # Chart windows and $dateTrunc buckets on the native datetime
+        IndexModel([("user_id", ASCENDING), ("day", ASCENDING)], name="user_day"),
+    ],
+    "phrase_stats": [
+        # One counter document per user and bigram; also the key for $inc upserts
+        IndexModel([("user_id", ASCENDING), ("phrase", ASCENDING)], name="user_phrase", unique=True),
+        # Top prompt topics: the first few keys in score order
+        IndexModel([("user_id", ASCENDING), ("score", DESCENDING)], name="user_score"),
+        # Cleanup of zeroed counters after deletes
+        IndexModel([("user_id", ASCENDING), ("df", ASCENDING)], name="user_df"),
+    ],
+    "audio_jobs": [
+        # Upload retries: the user's latest job for the same audio hash
+        IndexModel([("user_id", ASCENDING), ("sha256", ASCENDING), ("_id", DESCENDING)], name="user_sha256_id"),
+        # Per-host queue: claiming the oldest queued job, the queue bound and restart recovery
+        IndexModel([("host", ASCENDING), ("status", ASCENDING), ("_id", ASCENDING)], name="host_status_id"),
+    ],
+    "audio_transcripts": [
+        # Cached Whisper output expires so the collection does not grow with every upload
+        IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=AUDIO_TRANSCRIPT_CACHE_TTL),
+    ],
+    "summaries": [
+        IndexModel([("user_id", ASCENDING), ("period", ASCENDING)], name="user_period", unique=True),
+    ],
+    "nlp_cache": [
+        IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=NLP_CACHE_TTL),
+    ],
+}
+
+
+def ensure_indexes(db):
+    """Creates every declared index that is missing. Safe to run repeatedly."""
+    if db is None: return
+    for collection, models in INDEXES.items():
+        try:
+            created = db[collection].create_indexes(models)
+            print(f"Indexes ensured on '{collection}': {', '.join(created)}")
+        except Exception as e:
+            print(f"Could not create indexes on '{collection}': {e}")
+
+
+# --- Audit ---
+
+class _CommandRecorder(monitoring.CommandListener):
+    """Remembers the read commands issued while `recording` is set."""
+    READ_COMMANDS = ("find", "aggregate", "count", "distinct")
+
+    def __init__(self):
+        self.recording = False
+        self.commands = []
+
+    def started(self, event):
+        if self.recording and event.command_name in self.READ_COMMANDS:
+            self.commands.append(dict(event.command))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+_DRIVER_FIELDS = {"lsid", "txnNumber", "apiVersion", "apiStrict", "apiDeprecationErrors",
+                  "readConcern", "writeConcern", "batchSize", "singleBatch"}
+
+
+def _explainable(command):
+    return {k: v for k, v in command.items() if not k.startswith("$") and k not in _DRIVER_FIELDS}
+
+
+def _problem_stages(plan):
+    """Walks an explain() result and returns every COLLSCAN / in-memory SORT stage found."""
+    found = []
+    if isinstance(plan, dict):
+        if plan.get("stage") in ("COLLSCAN", "SORT"):
+            found.append(plan["stage"])
+        for key, value in plan.items():
+            if key in ("rejectedPlans",):
+                continue
+            found.extend(_problem_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            found.extend(_problem_stages(value))
+    return found
+
+
+def _audit_calls(database, user_id):
+    """Every read path in database.db, called with representative arguments."""
+    today = datetime.now().strftime('%Y-%m-%d')
+    some_id = ObjectId()
+    return [
+        ("find_user_by_email", lambda: database.find_user_by_email("audit@example.com")),
+        ("find_user_by_id", lambda: database.find_user_by_id(user_id)),
+        ("get_all_entries_sorted_asc", lambda: database.get_all_entries_sorted_asc(user_id)),
+        ("get_entry_days_page", lambda: database.get_entry_days_page(user_id, 14)),
+        ("get_entry_days_page(before)", lambda: database.get_entry_days_page(user_id, 14, today)),
+        ("get_pending_tasks", lambda: database.get_pending_tasks(user_id)),
+        ("get_tasks_with_entry_info(all)", lambda: database.get_tasks_with_entry_info(user_id, None, 5)),
+        ("get_tasks_with_entry_info(completed)", lambda: database.get_tasks_with_entry_info(user_id, True, 5)),
+        ("get_chart_data", lambda: database.get_chart_data(user_id, 30)),
+        ("get_tasks_for_entry_ids", lambda: database.get_tasks_for_entry_ids(user_id, [some_id])),
+        ("get_entries_and_tasks_for_date", lambda: database.get_entries_and_tasks_for_date(user_id, today)),
+        ("get_entries_for_period", lambda: database.get_entries_for_period(user_id, 7)),
+        ("get_summary_from_cache", lambda: database.get_summary_from_cache(user_id, "week")),
+        ("get_data_version", lambda: database.get_data_version(user_id)),
+        ("get_entry_analysis", lambda: database.get_entry_analysis(user_id, str(some_id))),
+        ("get_audio_job", lambda: database.get_audio_job(user_id, str(some_id))),
+        ("find_audio_job_by_hash", lambda: database.find_audio_job_by_hash(user_id, "0" * 64)),
+        ("get_cached_transcript", lambda: database.get_cached_transcript("0" * 64, "base")),
+        ("count_active_audio_jobs", lambda: database.count_active_audio_jobs("audit-host")),
+        ("get_live_audio_files", lambda: database.get_live_audio_files("audit-host")),
+        ("get_phrase_totals", lambda: database.get_phrase_totals(user_id)),
+        ("get_phrase_doc_freqs", lambda: database.get_phrase_doc_freqs(user_id, ["audit phrase"])),
+        ("get_top_phrases", lambda: database.get_top_phrases(user_id, 100)),
+        ("get_latest_entry", lambda: database.get_latest_entry(user_id)),
+    ]
+
+
+def _write_filters(user_id):
+    """Filters used by writes in database.db, explained without executing them."""
+    user_obj_id = ObjectId(user_id)
+    some_id = ObjectId()
+    return [
+        ("update_task_status", {"update": "tasks", "updates": [
+            {"q": {"_id": some_id, "user_id": user_obj_id}, "u": {"$set": {"completed": True}}}]}),
+        ("delete_entries_and_tasks(tasks)", {"delete": "tasks", "deletes": [
+            {"q": {"user_id": user_obj_id, "entry_id": {"$in": [some_id]}}, "limit": 0}]}),
+        ("delete_entries_and_tasks(entries)", {"delete": "entries", "deletes": [
+            {"q": {"user_id": user_obj_id, "_id": {"$in": [some_id]}}, "limit": 0}]}),
+        ("claim_stale_pending_entry", {"findAndModify": "entries", "query": {
+            "analysis_status": "pending", "analysis_queued_at": {"$not": {"$gte": datetime.utcnow()}}},
+            "update": {"$set": {"analysis_queued_at": datetime.utcnow()}}}),
+        ("claim_audio_job", {"findAndModify": "audio_jobs", "query": {"host": "audit-host", "status": "queued"},
+                             "sort": {"_id": 1}, "update": {"$set": {"status": "transcribing"}}}),
+    ]
+
+
+def audit_queries(user_id=None):
+    """Explains every query in database.db; returns a list of (name, problems)."""
+    recorder = _CommandRecorder()
+    monitoring.register(recorder)  # must happen before the client is created
+    import database.db as database
+    database.init_db()
+    if database.db is None:
+        print("Database is not available; cannot audit.")
+        return []
+
+    if user_id is None:
+        user = database.db.users.find_one({}, {"_id": 1})
+        user_id = str(user["_id"]) if user else str(ObjectId())
+
+    explained = []
+    for name, call in _audit_calls(database, user_id):
+        recorder.commands = []
+        recorder.recording = True
+        try:
+            call()
+        finally:
+            recorder.recording = False
+        for i, command in enumerate(recorder.commands):
+            explained.append((name if len(recorder.commands) == 1 else f"{name}#{i + 1}", _explainable(command)))
+    explained.extend(_write_filters(user_id))
+
+    report = []
+    for name, command in explained:
+        try:
+            plan = database.db.command("explain", command, verbosity="queryPlanner")
+            problems = sorted(set(_problem_stages(plan)))
+        except Exception as e:
+            problems = [f"explain failed: {e}"]
+        report.append((name, problems))
+        print(f"{'FLAG' if problems else 'ok  '}  {name}{': ' + ', '.join(problems) if problems else ''}")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage and audit MongoDB indexes.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('ensure', help="Create any missing indexes.")
+    audit = sub.add_parser('audit', help="Explain every query and flag COLLSCAN / in-memory SORT.")
+    audit.add_argument('--user', default=None, help="User id to run the queries as (default: any user).")
+    args = parser.parse_args(argv)
+
+    if args.command == 'ensure':
+        import database.db as database
+        database.init_db(ensure=False)
+        ensure_indexes(database.db)
+        return 0
+    report = audit_queries(args.user)
+    return 1 if any(problems for _, problems in report) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+Per-request MongoDB round-trip counting.
+
+A pymongo CommandListener attached to the client counts every command sent
+to the server against the counter of the current context. The app starts a
+counter for each request and reports it in the X-DB-Round-Trips response
+header; work fanned out to threads is counted when it runs in a copy of the
+request context (see database.db.run_concurrently).
+"""
+import threading
+from contextvars import ContextVar
+from pymongo import monitoring
+
+_current = ContextVar('mongo_round_trips', default=None)
+
+
+class RoundTrips:
+    """Commands sent, and the server time they took, during one request."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.seconds = 0.0
+        self.commands = {}
+
+    def add(self, command_name):
+        with self._lock:
+            self.count += 1
+            self.commands[command_name] = self.commands.get(command_name, 0) + 1
+
+    def add_time(self, seconds):
+        with self._lock:
+            self.seconds += seconds
+
+
+class RoundTripListener(monitoring.CommandListener):
+    def started(self, event):
+        counter = _current.get()
+        if counter is not None:
+            counter.add(event.command_name)
+
+    def succeeded(self, event):
+        counter = _current.get()
+        if counter is not None:
+            counter.add_time(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        counter = _current.get()
+        if counter is not None:
+            counter.add_time(event.duration_micros / 1e6)
+
+
+round_trip_listener = RoundTripListener()
+
+
+def start_counting():
+    """Starts a fresh counter for the current context and returns it."""
+    counter = RoundTrips()
+    _current.set(counter)
+    return counter
+
+
+def current_round_trips():
+    return _current.get()
@@ -0,0 +1,179 @@
+"""
+Bulk import of journal entries from NDJSON or CSV exports.
+
+    python -m database.journal_import --user <user_id> entries.ndjson
+    python -m database.journal_import --user <user_id> --format csv entries.csv
+
+NDJSON lines look like {"date": "2024-01-31", "text": "..."}; CSV files need
+a header with `date` and `text` columns. The file is parsed incrementally,
+batches are analysed in a process pool with a bounded number in flight, and
+results are written with unordered insert_many in fixed-size chunks, so
+memory stays flat however large the file is.
+"""
+import io
+import os
+import csv
+import sys
+import json
+import time
+import argparse
+from collections import deque
+from datetime import datetime
+from contextlib import nullcontext
+from concurrent.futures import Future, ProcessPoolExecutor
+import database.db as database
+
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 500))
+IMPORT_WORKERS = int(os.getenv('IMPORT_WORKERS', os.cpu_count() or 1))
+TEXT_FIELDS = ('text', 'journal', 'content', 'entry', 'body')
+
+
+def _parse_date(value):
+    """Accepts 'YYYY-MM-DD' or any ISO-8601 timestamp; returns 'YYYY-MM-DD' or None."""
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+
+
+def _record(row):
+    date = _parse_date(str(row.get('date') or ''))
+    text = next((row[f] for f in TEXT_FIELDS if isinstance(row.get(f), str) and row[f].strip()), None)
+    return (date, text) if date and text else None
+
+
+def iter_records(stream, fmt):
+    """
+    Yields (date, text) tuples from a text stream, or None for rows that
+    could not be parsed (so the caller can count them).
+    """
+    if fmt == 'csv':
+        for row in csv.DictReader(stream):
+            yield _record(row)
+    else:
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield None
+                continue
+            yield _record(row) if isinstance(row, dict) else None
+
+
+def _analyze_batch(records):
+    # Runs in a worker process. The shared cache is skipped here: worker
+    # processes must not touch the parent's Mongo client.
+    from nlp.pipeline import analyze_entries
+    start = time.perf_counter()
+    results = analyze_entries([text for _, text in records], use_cache=False)
+    entries = [
+        {"date": date, "text": text, "mood": r["mood"], "productivity": r["productivity"], "tasks": r["tasks"]}
+        for (date, text), r in zip(records, results)
+    ]
+    return entries, time.perf_counter() - start
+
+
+def _run_inline(fn, *args):
+    future = Future()
+    future.set_result(fn(*args))
+    return future
+
+
+def import_entries(stream, user_id, fmt='ndjson', batch_size=IMPORT_BATCH_SIZE, workers=IMPORT_WORKERS, tz_offset=0):
+    """
+    Imports entries from `stream` for `user_id` and returns a report with
+    counts, throughput and per-stage timings. Dates are the user's local days;
+    `tz_offset` (minutes east of UTC) places them on the timeline. With
+    workers=0 batches are analysed in the calling process, without a pool.
+    """
+    stats = {"entries": 0, "tasks": 0, "skipped": 0}
+    timings = {"parse": 0.0, "analyze_cpu": 0.0, "analyze_wait": 0.0, "write": 0.0}
+    start = time.perf_counter()
+
+    def write(future):
+        t0 = time.perf_counter()
+        entries, cpu_time = future.result()
+        for entry in entries:
+            entry["tz_offset"] = tz_offset
+        timings["analyze_wait"] += time.perf_counter() - t0
+        timings["analyze_cpu"] += cpu_time
+        t0 = time.perf_counter()
+        inserted_entries, inserted_tasks = database.add_entries_bulk(user_id, entries)
+        timings["write"] += time.perf_counter() - t0
+        stats["entries"] += inserted_entries
+        stats["tasks"] += inserted_tasks
+
+    with (ProcessPoolExecutor(max_workers=workers) if workers > 0 else nullcontext()) as pool:
+        submit = pool.submit if pool is not None else _run_inline
+        in_flight = deque()
+        batch = []
+        records = iter_records(stream, fmt)
+        while True:
+            t0 = time.perf_counter()
+            record = next(records, StopIteration)
+            timings["parse"] += time.perf_counter() - t0
+            if record is StopIteration:
+                break
+            if record is None:
+                stats["skipped"] += 1
+                continue
+            batch.append(record)
+            if len(batch) >= batch_size:
+                in_flight.append(submit(_analyze_batch, batch))
+                batch = []
+                # Bounded in-flight work keeps memory flat; oldest batch is written first.
+                if len(in_flight) >= 2 * max(workers, 1):
+                    write(in_flight.popleft())
+        if batch:
+            in_flight.append(submit(_analyze_batch, batch))
+        while in_flight:
+            write(in_flight.popleft())
+
+    elapsed = time.perf_counter() - start
+    return {
+        **stats,
+        "seconds": round(elapsed, 3),
+        "entries_per_second": round(stats["entries"] / elapsed, 1) if elapsed else 0.0,
+        "timings": {stage: round(seconds, 3) for stage, seconds in timings.items()},
+    }
+
+
+def detect_format(filename, default='ndjson'):
+    name = (filename or '').lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.ndjson', '.jsonl', '.json')):
+        return 'ndjson'
+    return default
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import journal entries from NDJSON or CSV.")
+    parser.add_argument('path')
+    parser.add_argument('--user', required=True, help="Id of the user the entries belong to.")
+    parser.add_argument('--format', choices=['ndjson', 'csv'], default=None)
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=IMPORT_WORKERS)
+    parser.add_argument('--tz-offset', type=int, default=0, help="User's UTC offset in minutes (e.g. 330, -300).")
+    args = parser.parse_args(argv)
+
+    database.init_db()
+    if database.db is None:
+        print("Database is not available; aborting import.")
+        return 1
+    fmt = args.format or detect_format(args.path)
+    with io.open(args.path, encoding='utf-8', newline='') as f:
+        report = import_entries(f, args.user, fmt, args.batch_size, args.workers,
+                                database.clamp_tz_offset(args.tz_offset))
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Online migration from string-only dates to native datetimes.
+
+    python -m database.migrate_dates [--batch-size 1000] [--sleep 0.1]
+
+Entries written before `date_at` existed get it derived from their local
+`date` (midnight, shifted by `tz_offset` when one is stored, UTC otherwise),
+and `daily_stats` documents get their `day`. Documents are walked in _id
+order in small batches with unordered bulk writes, so the app can keep
+serving traffic while it runs; it is safe to stop and re-run at any time.
+The app reads unmigrated documents through their `date` meanwhile, and the
+data version of every affected user is bumped at the end.
+"""
+import sys
+import time
+import argparse
+from pymongo import UpdateOne
+import database.db as database
+
+MIGRATE_BATCH_SIZE = 1000
+
+
+def _migrate(collection, missing_field, to_value, batch_size, pause, users=None):
+    """
+    Sets `missing_field` on every document lacking it, one _id-ordered batch
+    at a time. The owners of updated documents are added to `users`.
+    """
+    updated, last_id = 0, None
+    while True:
+        query = {missing_field: {"$exists": False}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = list(collection.find(query, {"user_id": 1, "date": 1, "tz_offset": 1}).sort("_id", 1).limit(batch_size))
+        if not batch:
+            return updated
+        ops = []
+        for doc in batch:
+            value = to_value(doc)
+            if value is not None:
+                # The $exists guard avoids clobbering a value written by the app meanwhile
+                ops.append(UpdateOne({"_id": doc["_id"], missing_field: {"$exists": False}},
+                                     {"$set": {missing_field: value}}))
+                if users is not None and doc.get("user_id") is not None:
+                    users.add(doc["user_id"])
+        if ops:
+            updated += collection.bulk_write(ops, ordered=False).modified_count
+        last_id = batch[-1]["_id"]
+        print(f"  {collection.name}: {updated} updated (last _id {last_id})")
+        if pause:
+            time.sleep(pause)
+
+
+def _entry_date_at(doc):
+    try:
+        return database.day_start_utc(doc["date"], doc.get("tz_offset") or 0)
+    except (KeyError, TypeError, ValueError):
+        print(f"  skipping entry {doc['_id']}: unparseable date {doc.get('date')!r}")
+        return None
+
+
+def _stats_day(doc):
+    try:
+        return database.day_start_utc(doc["date"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def migrate_dates(batch_size=MIGRATE_BATCH_SIZE, pause=0.0):
+    """
+    Backfills entries.date_at / tz_offset and daily_stats.day, then bumps the
+    data version of every user whose entries changed so cached summaries are
+    recomputed. Returns counts per collection.
+    """
+    db = database.db
+    if db is None: return {}
+    users = set()
+    counts = {
+        "entries": _migrate(db.entries, "date_at", _entry_date_at, batch_size, pause, users),
+        "daily_stats": _migrate(db.daily_stats, "day", _stats_day, batch_size, pause),
+        # Entries from before offsets were recorded are treated as UTC
+        "tz_offset": _migrate(db.entries, "tz_offset", lambda doc: 0, batch_size, pause, users),
+    }
+    for user_id in users:
+        database.bump_data_version(user_id)
+    counts["users"] = len(users)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill native datetime fields on entries and rollups.")
+    parser.add_argument('--batch-size', type=int, default=MIGRATE_BATCH_SIZE)
+    parser.add_argument('--sleep', type=float, default=0.0, help="Seconds to pause between batches.")
+    args = parser.parse_args(argv)
+
+    database.init_db()
+    if database.db is None:
+        print("Database is not available; nothing to migrate.")
+        return 1
+    start = time.perf_counter()
+    counts = migrate_dates(args.batch_size, args.sleep)
+    print(f"Migrated {counts} in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
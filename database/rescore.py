@@ -0,0 +1,125 @@
+"""
+Backfill command that recomputes stored productivity scores (and optionally
+moods) for existing entries with a registered scorer.
+
+    python -m database.rescore --scorer custom --chunk-size 5000 --workers 4
+
+Entries are streamed from `db.entries` in chunks, scored in a process pool
+with the vectorized batch path, and written back with unordered bulk_write.
+Each entry is tagged with the scorer it was scored by ("custom@2"), so an
+interrupted run resumes where it left off.
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+import database.db as database
+
+
+def _score_chunk(scorer_name, ids, texts, with_mood):
+    # Runs in a worker process: no database access here, only CPU work.
+    from nlp.scorer import get_scorer
+    scores = get_scorer(scorer_name).score_many(texts)
+    moods = None
+    if with_mood:
+        from nlp.analysis import analyze_texts
+        moods = [a['mood'] for a in analyze_texts(texts)]
+    return ids, scores, moods
+
+
+def _iter_chunks(cursor, chunk_size, users):
+    """Yields (ids, texts) chunks, adding each entry's owner to `users`."""
+    ids, texts = [], []
+    for doc in cursor:
+        if doc.get('user_id') is not None:
+            users.add(doc['user_id'])
+        ids.append(doc['_id'])
+        texts.append(doc.get('text') or '')
+        if len(ids) >= chunk_size:
+            yield ids, texts
+            ids, texts = [], []
+    if ids:
+        yield ids, texts
+
+
+def _write_chunk(ids, scores, moods, tag):
+    operations = []
+    for i, (entry_id, score) in enumerate(zip(ids, scores)):
+        fields = {"productivity": score, "productivity_scorer": tag}
+        if moods is not None:
+            fields["mood"] = moods[i]
+        operations.append(UpdateOne({"_id": entry_id}, {"$set": fields}))
+    if operations:
+        database.db.entries.bulk_write(operations, ordered=False)
+    return len(operations)
+
+
+def rescore_entries(scorer_name=None, chunk_size=5000, workers=None, user_id=None,
+                    with_mood=False, rescore_all=False):
+    """Rescores entries and returns the number of documents updated."""
+    from nlp.scorer import get_scorer
+    database.init_db()
+    if database.db is None:
+        print("Database is not available; nothing to rescore.")
+        return 0
+
+    scorer = get_scorer(scorer_name)
+    query = {}
+    if not rescore_all:
+        query["productivity_scorer"] = {"$ne": scorer.tag}
+    if user_id:
+        query["user_id"] = ObjectId(user_id)
+    cursor = database.db.entries.find(query, {"text": 1, "user_id": 1}, batch_size=chunk_size)
+    users = set()
+
+    start = time.perf_counter()
+    updated = 0
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        max_in_flight = 2 * workers
+        pending = set()
+        for ids, texts in _iter_chunks(cursor, chunk_size, users):
+            pending.add(pool.submit(_score_chunk, scorer.name, ids, texts, with_mood))
+            # Keep a bounded number of chunks in flight so memory stays flat
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    updated += _write_chunk(*future.result(), scorer.tag)
+                print(f"Rescored {updated} entries ({updated / (time.perf_counter() - start):.0f}/s)")
+        for future in pending:
+            updated += _write_chunk(*future.result(), scorer.tag)
+
+    if updated:
+        # Stored scores changed, so the daily rollups have to be recounted
+        database.rebuild_daily_stats(user_id)
+        if with_mood:
+            # Phrase statistics carry mood sums too
+            database.rebuild_phrase_stats(user_id)
+        # Cached summaries are keyed by data version; rescored users need fresh ones
+        for owner in users:
+            database.bump_data_version(owner)
+
+    elapsed = time.perf_counter() - start
+    print(f"Done: {updated} entries rescored with {scorer.tag} in {elapsed:.1f}s "
+          f"({updated / elapsed if elapsed else 0:.0f} entries/s)")
+    return updated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute stored productivity scores.")
+    parser.add_argument('--scorer', default=None, help="Registered scorer name (default: PRODUCTIVITY_SCORER).")
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--user', default=None, help="Only rescore this user's entries.")
+    parser.add_argument('--mood', action='store_true', help="Also recompute moods with the current mood backend.")
+    parser.add_argument('--all', action='store_true', help="Rescore entries already tagged with this scorer version.")
+    args = parser.parse_args(argv)
+    rescore_entries(args.scorer, args.chunk_size, args.workers, args.user, args.mood, args.all)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
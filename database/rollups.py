@@ -0,0 +1,53 @@
+"""
+Maintenance commands for the `daily_stats` rollups that back the charts and
+the `phrase_stats` counters behind journal prompts.
+
+    python -m database.rollups rebuild [--user <user_id>]
+    python -m database.rollups phrases [--user <user_id>]
+    python -m database.rollups phrase-scores [--user <user_id>]
+
+Run `rebuild` and `phrases` once after deploying to backfill existing
+entries, and any time the counters need repairing. Until `phrases` has
+covered a user, their prompts keep using the recent-entries path.
+`phrase-scores` only rescores stored phrases with each user's current
+entry count (no re-tokenising); schedule it, e.g. nightly, to keep the
+stored tf-idf ranking from drifting.
+"""
+import sys
+import time
+import argparse
+import database.db as database
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild chart rollups and prompt phrase statistics.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    rebuild = sub.add_parser('rebuild', help="Recompute daily_stats from raw entries.")
+    rebuild.add_argument('--user', default=None, help="Only rebuild this user's rollups.")
+    phrases = sub.add_parser('phrases', help="Recompute phrase_stats from raw entries.")
+    phrases.add_argument('--user', default=None, help="Only rebuild this user's phrase statistics.")
+    scores = sub.add_parser('phrase-scores', help="Rescore phrase_stats with current entry counts.")
+    scores.add_argument('--user', default=None, help="Only rescore this user's phrases.")
+    args = parser.parse_args(argv)
+
+    database.init_db()
+    if database.db is None:
+        print("Database is not available; nothing to rebuild.")
+        return 1
+    start = time.perf_counter()
+    if args.command == 'phrase-scores':
+        count = database.refresh_phrase_scores(args.user)
+        print(f"Rescored phrases for {count} user(s) in {time.perf_counter() - start:.1f}s")
+        return 0
+    if args.command == 'phrases':
+        database.rebuild_phrase_stats(args.user)
+        collection = 'phrase_stats'
+    else:
+        database.rebuild_daily_stats(args.user)
+        collection = 'daily_stats'
+    print(f"Rebuilt {collection}{' for ' + args.user if args.user else ''} in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Gunicorn configuration.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+With GUNICORN_PRELOAD=true (the default) the app is imported once in the
+master and the NLP analyzers are loaded there (WARM_UP_MODELS, default
+"nlp"; Whisper runs in the separate transcription processes, see
+nlp/audio_jobs.py, so the web workers do not need it). After forking,
+each worker starts the audio dispatcher thread, which transcribes only in
+the one process holding the host's lock. The loaded objects are moved out of the
+garbage collector's reach with gc.freeze() so workers keep sharing those
+pages copy-on-write instead of each holding a private copy. The master's
+MongoDB client is closed before forking and every worker opens its own,
+since pymongo clients are not fork-safe.
+
+Measure the effect with `python benchmarks/worker_memory.py`.
+"""
+import gc
+import os
+
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', '8000')}")
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True').lower() in ['true', '1', 't']
+
+if preload_app:
+    # Read by app.py when the master imports it
+    os.environ.setdefault('WARM_UP_MODELS', 'nlp')
+    # Avoid collections while the models load; everything loaded is frozen below
+    gc.disable()
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    import database.db as database
+    # Connections must not be shared with the forked workers
+    database.close_db()
+    gc.enable()
+    gc.collect()
+    # Keep the collector from touching (and so un-sharing) the preloaded objects
+    gc.freeze()
+    server.log.info(f"Preloaded app; {gc.get_freeze_count()} objects frozen for copy-on-write sharing")
+
+
+def post_fork(server, worker):
+    if preload_app:
+        import database.db as database
+        database.init_db(ensure=False)
+    # Every worker waits on the host lock; only the holder runs the transcription pool
+    from nlp.audio_jobs import audio_jobs, AUDIO_DISPATCH_IN_WEB
+    if AUDIO_DISPATCH_IN_WEB:
+        audio_jobs.start()
+    # Picks up async analyses that a previous worker accepted but never finished
+    from nlp.analysis_queue import analysis_queue, ASYNC_ANALYSIS
+    if ASYNC_ANALYSIS:
+        analysis_queue.start()
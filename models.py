@@ -1,12 +1,24 @@
+import os
 from flask_login import UserMixin
-from database.db import find_user_by_email, find_user_by_id, create_user as db_create_user
+from database.db import find_user_by_email, find_user_by_id, create_user as db_create_user, update_user
+from utils.cache import TTLCache
 # We removed "from app import bcrypt" from here to break the circular import.
 
+# Users loaded by id are cached in-process so Flask-Login's user_loader does not
+# hit MongoDB on every request. Entries expire after USER_CACHE_TTL seconds,
+# which bounds staleness for changes made by other processes.
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 1024))
+USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', 300))
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
 class User(UserMixin):
     """
     A user model that integrates with Flask-Login.
     It's a wrapper around the user data stored in MongoDB.
     """
+    # Fields kept in the signed session cookie when USER_SESSION_MODE=session
+    SESSION_FIELDS = ('id', 'email')
+
     def __init__(self, user_data):
         self.id = str(user_data.get('_id'))
         self.email = user_data.get('email')
@@ -22,12 +34,41 @@ class User(UserMixin):
 
     @staticmethod
     def find_by_id(user_id):
-        """Finds a user by their ID in the database."""
+        """Finds a user by their ID, from the in-process cache when possible."""
+        user_id = str(user_id)
+        user = user_cache.get(user_id)
+        if user is not None:
+            return user
         user_data = find_user_by_id(user_id)
         if user_data:
-            return User(user_data)
+            user = User(user_data)
+            user_cache.set(user_id, user)
+            return user
         return None
 
+    @staticmethod
+    def invalidate(user_id):
+        """Drops a user from the cache; call after anything changes their document."""
+        user_cache.pop(str(user_id))
+
+    @staticmethod
+    def update(user_id, **fields):
+        """Updates a user's stored fields and invalidates the cached copy."""
+        result = update_user(user_id, fields)
+        User.invalidate(user_id)
+        return result
+
+    def to_session(self):
+        """The minimal, non-secret fields stored in the session for session mode."""
+        return {field: getattr(self, field) for field in self.SESSION_FIELDS}
+
+    @staticmethod
+    def from_session(data, user_id):
+        """Rebuilds a user from session data, if it belongs to `user_id`."""
+        if not isinstance(data, dict) or data.get('id') != str(user_id):
+            return None
+        return User({'_id': data['id'], 'email': data.get('email')})
+
     @staticmethod
     def create(email, password):
         """Creates a new user and saves them to the database."""
@@ -37,4 +78,3 @@ class User(UserMixin):
         # Hash the password before storing it for security
         hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
         return db_create_user(email, hashed_password)
-
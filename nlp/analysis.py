@@ -1,24 +1,93 @@
-from textblob import TextBlob
-import nltk
-from nltk.sentiment import SentimentIntensityAnalyzer
+import os
+import threading
+
+# 'textblob' (polarity thresholds) or 'classifier' (trained model, see nlp/mood_model.py)
+MOOD_BACKEND = os.getenv('MOOD_BACKEND', 'textblob').lower()
+MOOD_BACKENDS = ('textblob', 'classifier')
+
+
+class MoodEngine:
+    """
+    Holds one VADER analyzer and one mood backend per process. Importing
+    TextBlob/NLTK and loading the VADER lexicon (and the trained model, if
+    selected) is the expensive part, so it happens once, on first use or in
+    `warm_up()`, behind a lock; scoring afterwards is read-only and can be
+    shared between request threads.
+    """
+    def __init__(self, backend=MOOD_BACKEND):
+        if backend not in MOOD_BACKENDS:
+            raise ValueError(f"Unknown mood backend '{backend}'. Choose one of {MOOD_BACKENDS}.")
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._sia = None
+        self._blob_analyzer = None
+        self._classifier = None
+
+    def _ensure_loaded(self):
+        if self._sia is None:
+            with self._lock:
+                if self._sia is None:
+                    from nltk.sentiment import SentimentIntensityAnalyzer
+                    if self.backend == 'classifier':
+                        from nlp.mood_model import load_model
+                        self._classifier = load_model()
+                    else:
+                        from textblob.sentiments import PatternAnalyzer
+                        self._blob_analyzer = PatternAnalyzer()
+                    self._sia = SentimentIntensityAnalyzer()
+
+    def warm_up(self):
+        """Loads the analyzers now rather than on the first request."""
+        self._ensure_loaded()
+
+    @property
+    def version(self):
+        """Identifies the backend (and trained model) so cached results can be keyed by it."""
+        self._ensure_loaded()
+        if self._classifier is not None:
+            return f"classifier-{self._classifier.version}"
+        return "textblob-1"
+
+    def _polarity_and_mood(self, texts):
+        if self._classifier is not None:
+            # One vectorizer transform + matrix multiply for the whole batch
+            return self._classifier.predict(texts)
+        results = []
+        for text in texts:
+            polarity = self._blob_analyzer.analyze(text).polarity
+            # Use a threshold on TextBlob's polarity for mood classification
+            mood = 'positive' if polarity > 0.2 else 'negative' if polarity < -0.2 else 'neutral'
+            results.append((polarity, mood))
+        return results
+
+    def analyze(self, text):
+        """Analyzes a single text. Same result shape as `analyze_text`."""
+        return self.analyze_many([text])[0]
+
+    def analyze_many(self, texts):
+        """Analyzes an iterable of texts, returning a list of result dicts in order."""
+        self._ensure_loaded()
+        texts = list(texts)
+        return [
+            {'polarity': polarity, 'vader': self._sia.polarity_scores(text), 'mood': mood}
+            for text, (polarity, mood) in zip(texts, self._polarity_and_mood(texts))
+        ]
+
+
+# Shared by the request handlers, the audio background path and backfill jobs.
+engine = MoodEngine()
 
-try:
-    nltk.data.find('sentiment/vader_lexicon.zip')
-except nltk.downloader.DownloadError:
-    pass
 
 def analyze_text(text):
     """
-    Analyzes text to determine mood using both TextBlob and VADER.
+    Analyzes text to determine mood using the configured backend and VADER.
     """
-    blob = TextBlob(text)
-    polarity = blob.sentiment.polarity
+    return engine.analyze(text)
 
-    sia = SentimentIntensityAnalyzer()
-    vader_score = sia.polarity_scores(text)
 
-    # Use a threshold on TextBlob's polarity for mood classification
-    mood = 'positive' if polarity > 0.2 else 'negative' if polarity < -0.2 else 'neutral'
-    
-    # Return a dictionary with detailed analysis results
-    return {'polarity': polarity, 'vader': vader_score, 'mood': mood}
+def analyze_texts(texts):
+    """
+    Batch version of `analyze_text`: returns one {'polarity', 'vader', 'mood'}
+    dict per input text, reusing the process-wide analyzers.
+    """
+    return engine.analyze_many(texts)
@@ -0,0 +1,114 @@
+"""
+Optional asynchronous analysis: journal submissions are stored immediately
+with analysis_status 'pending', and a bounded thread pool runs the NLP
+pipeline and fills in mood, productivity and tasks afterwards.
+
+Enable with ASYNC_ANALYSIS=true. ANALYSIS_WORKERS sets the pool size and
+ANALYSIS_QUEUE_SIZE caps how many entries may be waiting or running.
+
+The pool lives in memory, so a restart loses whatever it held. Each process
+that called `start` checks every ANALYSIS_RECOVER_SECONDS for entries still
+pending ANALYSIS_STALE_SECONDS after they were queued and submits them
+again; the claim is atomic, so only one process picks up each entry.
+"""
+import os
+import time
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from nlp.pipeline import analyze_entry
+from database.db import complete_entry_analysis, mark_entry_analysis_failed, claim_stale_pending_entry
+
+ASYNC_ANALYSIS = os.getenv('ASYNC_ANALYSIS', 'False').lower() in ['true', '1', 't']
+ANALYSIS_WORKERS = int(os.getenv('ANALYSIS_WORKERS', 2))
+ANALYSIS_QUEUE_SIZE = int(os.getenv('ANALYSIS_QUEUE_SIZE', 100))
+ANALYSIS_STALE_SECONDS = int(os.getenv('ANALYSIS_STALE_SECONDS', 300))
+ANALYSIS_RECOVER_SECONDS = int(os.getenv('ANALYSIS_RECOVER_SECONDS', 60))
+
+
+def run_entry_analysis(user_id, entry_id, text):
+    """
+    Analyzes a pending entry and stores the results. Returns the pipeline
+    result; on error the entry is marked failed and the error re-raised.
+    """
+    try:
+        result = analyze_entry(text)
+        complete_entry_analysis(user_id, entry_id, result['mood'], result['productivity'], result['tasks'])
+    except Exception as e:
+        print(f"Analysis failed for entry {entry_id}: {e}")
+        mark_entry_analysis_failed(user_id, entry_id, e)
+        raise
+    return result
+
+
+class AnalysisQueue:
+    """
+    A fixed-size worker pool with a bounded number of outstanding jobs.
+    `submit` never blocks: it returns False when the queue is full so the
+    caller can fall back to analysing inline.
+    """
+    def __init__(self, workers=ANALYSIS_WORKERS, max_pending=ANALYSIS_QUEUE_SIZE):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._recovery = None
+
+    def _get_executor(self):
+        # Created on first use, so a pre-forked server starts its threads in each worker
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='analysis')
+        return self._executor
+
+    def submit(self, user_id, entry_id, text):
+        if not self._slots.acquire(blocking=False):
+            return False
+        try:
+            self._get_executor().submit(self._run, user_id, entry_id, text)
+        except Exception:
+            self._slots.release()
+            raise
+        return True
+
+    def _run(self, user_id, entry_id, text):
+        try:
+            run_entry_analysis(user_id, entry_id, text)
+        except Exception:
+            pass  # already logged and recorded on the entry
+        finally:
+            self._slots.release()
+
+    def start(self, stale_seconds=ANALYSIS_STALE_SECONDS, interval=ANALYSIS_RECOVER_SECONDS):
+        """Starts the recovery thread in this process (once)."""
+        with self._lock:
+            if self._recovery is None:
+                self._recovery = threading.Thread(
+                    target=self._recover_forever, args=(stale_seconds, interval), name='analysis-recover', daemon=True)
+                self._recovery.start()
+
+    def recover(self, stale_seconds=ANALYSIS_STALE_SECONDS):
+        """Resubmits entries left pending by a lost job while the queue has room. Returns how many."""
+        recovered = 0
+        while True:
+            if not self._slots.acquire(blocking=False):
+                return recovered
+            self._slots.release()
+            entry = claim_stale_pending_entry(datetime.utcnow() - timedelta(seconds=stale_seconds))
+            if entry is None or not self.submit(entry["user_id"], entry["_id"], entry.get("text", "")):
+                return recovered
+            recovered += 1
+
+    def _recover_forever(self, stale_seconds, interval):
+        while True:
+            try:
+                recovered = self.recover(stale_seconds)
+                if recovered:
+                    print(f"Resubmitted {recovered} pending entries for analysis")
+            except Exception as e:
+                print(f"Analysis recovery error: {e}")
+            time.sleep(interval)
+
+
+analysis_queue = AnalysisQueue()
@@ -0,0 +1,285 @@
+"""
+Bounded background transcription for uploaded audio journals.
+
+Uploads become jobs in the `audio_jobs` collection, tagged with the host
+that holds the file. Web workers only queue jobs: `submit` refuses one (so
+the endpoint can answer 429) once AUDIO_QUEUE_SIZE jobs are waiting or in
+progress on the host. A single dispatcher per host, whichever process holds
+the AUDIO_LOCK_FILE lock, claims queued jobs and runs Whisper in a fixed
+pool of AUDIO_WORKERS processes (so inference is not limited by the GIL and
+the pool size does not multiply with the number of web workers). When a
+transcript comes back, the dispatcher runs the NLP pipeline and stores the
+entry and its tasks. Transcripts are cached by the SHA-256 of the audio (and
+the Whisper model), so identical audio never runs inference twice. Long
+recordings are transcribed in streaming mode and the worker saves the
+partial transcript on the job after every segment.
+
+Queued jobs survive restarts; jobs that were mid-transcription when the
+dispatcher stopped are marked failed by the next one. The dispatcher also
+removes stale uploads in AUDIO_UPLOAD_DIR, keeping those that live jobs
+still need. By default every web
+worker runs a dispatcher thread that waits for the lock; with
+AUDIO_DISPATCH_IN_WEB=false run one per host instead:
+
+    python -m nlp.audio_jobs
+"""
+import os
+import sys
+import time
+import socket
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from bson.objectid import ObjectId
+from nlp.pipeline import analyze_entry
+from nlp.media_analyzer import WHISPER_MODEL_TAG, configure_threads, transcribe_audio_local
+from database.db import (
+    add_entry_with_tasks, create_audio_job, update_audio_job, local_date, count_active_audio_jobs,
+    claim_audio_job, fail_interrupted_audio_jobs, get_cached_transcript, save_cached_transcript, get_live_audio_files
+)
+from utils.uploads import remove_quietly, cleanup_stale_uploads
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so the dev server's single process dispatches
+    fcntl = None
+
+AUDIO_WORKERS = int(os.getenv('AUDIO_WORKERS', 1))
+AUDIO_QUEUE_SIZE = int(os.getenv('AUDIO_QUEUE_SIZE', 8))
+# 'spawn' keeps worker processes independent of the server's threads and
+# sockets; each loads Whisper once and keeps it for later jobs.
+AUDIO_START_METHOD = os.getenv('AUDIO_START_METHOD', 'spawn')
+# torch threads per worker; by default the cores are split evenly across workers
+WHISPER_THREADS = int(os.getenv('WHISPER_THREADS', 0)) or max(1, (os.cpu_count() or 1) // AUDIO_WORKERS)
+# Uploads live on local disk, so jobs belong to the host that received them
+AUDIO_HOST = os.getenv('AUDIO_HOST') or socket.gethostname()
+AUDIO_LOCK_FILE = os.getenv('AUDIO_LOCK_FILE', os.path.join(tempfile.gettempdir(), 'mindsync-audio.lock'))
+AUDIO_POLL_SECONDS = float(os.getenv('AUDIO_POLL_SECONDS', 2))
+AUDIO_DISPATCH_IN_WEB = os.getenv('AUDIO_DISPATCH_IN_WEB', 'True').lower() in ['true', '1', 't']
+# Where the web app streams uploads (relative to the project root); the dispatcher clears out stale ones
+AUDIO_UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                os.getenv('AUDIO_UPLOAD_DIR', 'temp_uploads'))
+AUDIO_UPLOAD_MAX_AGE_HOURS = 24
+
+
+def transcribe_job(job_id, file_path):
+    """
+    Runs in a worker process: transcribes the file, recording progress and
+    partial text on the job as segments complete. The worker opens its own
+    MongoDB connection the first time it has something to report.
+    """
+    import database.db as database
+
+    def report(fields):
+        if database.db is None:
+            database.init_db(ensure=False)
+        update_audio_job(job_id, fields)
+
+    return transcribe_audio_local(
+        file_path, on_partial=lambda text, seconds: report({"partial_transcript": text, "seconds_done": round(seconds, 1)}))
+
+
+def store_transcript(user_id, text, tz_offset=0):
+    """Analyzes a transcript and saves it, with its tasks, as a journal entry."""
+    result = analyze_entry(text)
+    entry_id = add_entry_with_tasks(
+        user_id,
+        local_date(tz_offset),
+        f"(Audio Journal Entry)\n\n{text}", # Mark it as an audio entry
+        result['mood'],
+        result['productivity'],
+        result['tasks'],
+        tz_offset=tz_offset
+    )
+    return entry_id, result
+
+
+class AudioJobManager:
+    """
+    Queues uploads as jobs (`submit`, from any process) and, in the one
+    process per host that holds the lock file, feeds them to a process pool
+    (`run`, started in a background thread by `start`).
+    """
+    def __init__(self, workers=AUDIO_WORKERS, max_pending=AUDIO_QUEUE_SIZE, start_method=AUDIO_START_METHOD,
+                 threads=WHISPER_THREADS, host=AUDIO_HOST, lock_path=AUDIO_LOCK_FILE, poll_seconds=AUDIO_POLL_SECONDS,
+                 upload_dir=AUDIO_UPLOAD_DIR):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.threads = threads
+        self.start_method = start_method
+        self.host = host
+        self.lock_path = lock_path
+        self.poll_seconds = poll_seconds
+        self.upload_dir = upload_dir
+        # Jobs handed to the pool at once; the rest stay queued in the database
+        self._slots = threading.BoundedSemaphore(workers)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._finisher = None
+        self._dispatcher = None
+        self._lock_file = None
+
+    def submit(self, user_id, file_path, filename=None, tz_offset=0, sha256=None):
+        """
+        Queues a WAV file for transcription. Returns the job id, or None if the
+        host's queue is full. Once a job id is returned the dispatcher owns
+        `file_path` and deletes it; otherwise the caller must.
+        """
+        if count_active_audio_jobs(self.host) >= self.max_pending:
+            return None
+        job_id = ObjectId()
+        create_audio_job(job_id, user_id, filename, sha256, file_path=file_path, tz_offset=tz_offset, host=self.host)
+        return job_id
+
+    # --- Dispatcher ---
+
+    def start(self):
+        """Starts the dispatcher thread in this process (once); it idles until it holds the host lock."""
+        with self._lock:
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self.run, name='audio-dispatch', daemon=True)
+                self._dispatcher.start()
+
+    def _acquire_host_lock(self):
+        if fcntl is None:
+            return True
+        if self._lock_file is None:
+            self._lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def run(self):
+        """Waits to become the host's dispatcher, recovers after a restart, then dispatches forever."""
+        while not self._acquire_host_lock():
+            time.sleep(self.poll_seconds * 5)
+        print(f"Audio dispatcher for host {self.host} started in process {os.getpid()}")
+        for job in fail_interrupted_audio_jobs(self.host):
+            if job.get("file_path"):
+                remove_quietly(job["file_path"])
+        next_cleanup = 0
+        while True:
+            try:
+                if time.monotonic() >= next_cleanup:
+                    self._cleanup_uploads()
+                    next_cleanup = time.monotonic() + 3600
+                dispatched = self._dispatch_one()
+            except Exception as e:
+                print(f"Audio dispatcher error: {e}")
+                dispatched = False
+            if not dispatched:
+                time.sleep(self.poll_seconds)
+
+    def _cleanup_uploads(self):
+        """Removes old leftover uploads on this host, except those queued or running jobs still need."""
+        removed = cleanup_stale_uploads(self.upload_dir, AUDIO_UPLOAD_MAX_AGE_HOURS,
+                                        keep=get_live_audio_files(self.host))
+        if removed:
+            print(f"Removed {removed} stale audio uploads from {self.upload_dir}")
+
+    def _dispatch_one(self):
+        """Hands the oldest queued job to the pool if a worker is free. Returns True if it did."""
+        if not self._slots.acquire(blocking=False):
+            return False
+        try:
+            job = claim_audio_job(self.host)
+        except Exception:
+            self._slots.release()
+            raise
+        if job is None:
+            self._slots.release()
+            return False
+
+        job_id, user_id, file_path = job["_id"], job["user_id"], job.get("file_path")
+        tz_offset, sha256 = job.get("tz_offset", 0), job.get("sha256")
+        cached = get_cached_transcript(sha256, WHISPER_MODEL_TAG) if sha256 else None
+        if cached is not None:
+            # Identical audio was transcribed before: skip the worker pool entirely
+            self._slots.release()
+            remove_quietly(file_path)
+            self._get_finisher().submit(self._complete, job_id, user_id, cached, tz_offset)
+            return True
+
+        try:
+            finisher = self._get_finisher()
+            future = self._get_executor().submit(transcribe_job, job_id, file_path)
+        except Exception as e:
+            self._slots.release()
+            remove_quietly(file_path)
+            update_audio_job(job_id, {"status": "failed", "error": str(e)})
+            raise
+        # Done-callbacks run on the pool's management thread; keep them short
+        future.add_done_callback(
+            lambda f: finisher.submit(self._finish, f, job_id, user_id, file_path, tz_offset, sha256))
+        return True
+
+    def _get_finisher(self):
+        if self._finisher is None:
+            with self._lock:
+                if self._finisher is None:
+                    self._finisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='audio-finish')
+        return self._finisher
+
+    def _get_executor(self):
+        # Created on first dispatch, so only the process holding the host lock starts a pool
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context(self.start_method),
+                        initializer=configure_threads, initargs=(self.threads,))
+        return self._executor
+
+    def _complete(self, job_id, user_id, text, tz_offset):
+        """Analyzes a transcript and records the stored entry on the job."""
+        try:
+            update_audio_job(job_id, {"status": "analyzing"})
+            entry_id, result = store_transcript(user_id, text, tz_offset)
+            update_audio_job(job_id, {
+                "status": "done", "entry_id": entry_id, "transcript": text,
+                "mood": result['mood'], "productivity": result['productivity'], "tasks": result['tasks']
+            })
+        except Exception as e:
+            print(f"Audio job {job_id} failed: {e}")
+            update_audio_job(job_id, {"status": "failed", "error": str(e)})
+
+    def _finish(self, future, job_id, user_id, file_path, tz_offset, sha256):
+        try:
+            text = future.result()
+            if not text or not text.strip():
+                raise ValueError("No speech could be transcribed from the recording.")
+            if sha256:
+                save_cached_transcript(sha256, WHISPER_MODEL_TAG, text)
+        except Exception as e:
+            print(f"Audio job {job_id} failed: {e!r}")
+            if isinstance(e, BrokenProcessPool):
+                # A worker died (e.g. out of memory); start a fresh pool for later jobs
+                with self._lock:
+                    self._executor = None
+            update_audio_job(job_id, {"status": "failed", "error": str(e)})
+            return
+        finally:
+            self._slots.release()
+            remove_quietly(file_path)
+        self._complete(job_id, user_id, text, tz_offset)
+
+
+audio_jobs = AudioJobManager()
+
+
+def main(argv=None):
+    import database.db as database
+    database.init_db(ensure=False)
+    if database.db is None:
+        print("Database is not available; cannot dispatch audio jobs.")
+        return 1
+    audio_jobs.run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
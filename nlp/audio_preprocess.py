@@ -0,0 +1,135 @@
+"""
+Audio preprocessing for Whisper: downmix to mono and resample to 16 kHz.
+
+Resampling is polyphase (scipy.signal.resample_poly) at the reduced integer
+ratio of the two rates, e.g. 44.1 kHz -> 16 kHz is up 160 / down 441. The
+anti-aliasing FIR filter is designed once per rate pair and cached, and the
+signal stays float32 throughout, with the downmix written into a single
+output buffer instead of mean/asarray/flatten copies.
+"""
+from functools import lru_cache
+from math import gcd
+
+WHISPER_RATE = 16000
+
+
+@lru_cache(maxsize=32)
+def resample_filter(orig_sr, target_sr=WHISPER_RATE):
+    """
+    Returns (up, down, taps) for a rate pair. The taps are the filter
+    resample_poly designs by default (Kaiser window, beta 5, 10 * max(up, down)
+    taps per side), computed once and shared read-only.
+    """
+    import numpy as np
+    from scipy.signal import firwin
+    divisor = gcd(int(orig_sr), int(target_sr))
+    up, down = int(target_sr) // divisor, int(orig_sr) // divisor
+    if up == down:
+        raise ValueError("resample_filter needs two different rates; equal rates need no filter")
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    taps = firwin(2 * half_len + 1, 1.0 / max_rate, window=('kaiser', 5.0)).astype(np.float64)
+    taps.setflags(write=False)
+    return up, down, taps
+
+
+def downmix(audio, out=None):
+    """
+    Averages (frames, channels) audio into a mono float32 array. A 1-D
+    float32 input is returned as is; otherwise the channels are summed
+    straight into `out` (allocated if not given) and scaled in place.
+    """
+    import numpy as np
+    if audio.ndim == 1:
+        return audio if audio.dtype == np.float32 else audio.astype(np.float32)
+    if audio.shape[1] == 1:
+        mono = audio[:, 0]
+        return mono if mono.dtype == np.float32 else mono.astype(np.float32)
+    if out is None or len(out) < len(audio):
+        out = np.empty(len(audio), dtype=np.float32)
+    out = out[:len(audio)]
+    np.sum(audio, axis=1, dtype=np.float32, out=out)
+    out *= np.float32(1.0 / audio.shape[1])
+    return out
+
+
+def resample(audio, orig_sr, target_sr=WHISPER_RATE):
+    """Polyphase resampling of mono float32 audio using the cached filter for the rate pair."""
+    import numpy as np
+    from scipy.signal import resample_poly
+    if int(orig_sr) == int(target_sr):
+        return audio
+    up, down, taps = resample_filter(int(orig_sr), int(target_sr))
+    return resample_poly(audio, up, down, window=taps).astype(np.float32, copy=False)
+
+
+def to_whisper_input(audio, orig_sr):
+    """Any (frames,) or (frames, channels) array at any rate -> contiguous mono float32 at 16 kHz."""
+    import numpy as np
+    return np.ascontiguousarray(resample(downmix(audio), orig_sr))
+
+
+def load_for_whisper(audio_file_path):
+    """Reads a WAV file as float32 and preprocesses it in one pass."""
+    import soundfile as sf
+    audio, sr = sf.read(audio_file_path, dtype='float32', always_2d=True)
+    return to_whisper_input(audio, sr)
+
+
+class StreamResampler:
+    """
+    Polyphase resampling of a signal that arrives in blocks, giving the same
+    samples as resampling it in one piece. Each call resamples the new block
+    together with `pad` samples of context on either side (the FIR filter's
+    reach); the newest `pad` samples are held back until the next block, or
+    `flush()`. `pad` is a multiple of the decimation factor so every buffer
+    starts on an exact output sample.
+    """
+    def __init__(self, orig_sr, target_sr=WHISPER_RATE):
+        import numpy as np
+        self.orig_sr, self.target_sr = int(orig_sr), int(target_sr)
+        if self.orig_sr == self.target_sr:
+            # Already at the target rate: blocks pass through and no filter is designed
+            self.up = self.down = 1
+            self.pad = 0
+        else:
+            self.up, self.down, taps = resample_filter(self.orig_sr, self.target_sr)
+            reach = -(-(len(taps) // 2) // self.up) + 1
+            self.pad = -(-reach // self.down) * self.down
+        self._buf = np.zeros(0, dtype=np.float32)
+        self._start = 0     # input index of _buf[0]
+        self._emitted = 0   # output samples returned so far
+
+    def _resample(self, final):
+        import numpy as np
+        end = self._start + len(self._buf)
+        if final:
+            valid_end = -(-end * self.up // self.down)
+        else:
+            valid_end = max(self._emitted, (end - self.pad) * self.up // self.down)
+        if valid_end <= self._emitted:
+            return np.zeros(0, dtype=np.float32)
+        out = resample(self._buf, self.orig_sr, self.target_sr)
+        offset = self._start * self.up // self.down
+        chunk = out[self._emitted - offset:valid_end - offset]
+        self._emitted = valid_end
+        # Keep only the input still needed as left context for the next outputs
+        keep_from = max(0, self._emitted * self.down // self.up - self.pad)
+        keep_from -= keep_from % self.down
+        if keep_from > self._start:
+            self._buf = self._buf[keep_from - self._start:]
+            self._start = keep_from
+        return chunk
+
+    def process(self, block):
+        import numpy as np
+        if self.up == self.down:
+            return np.array(block, dtype=np.float32)
+        self._buf = np.concatenate([self._buf, np.asarray(block, dtype=np.float32)])
+        return self._resample(final=False)
+
+    def flush(self):
+        import numpy as np
+        if self.up == self.down or not len(self._buf):
+            return np.zeros(0, dtype=np.float32)
+        return self._resample(final=True)
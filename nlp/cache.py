@@ -0,0 +1,99 @@
+"""
+Content-addressed cache for NLP results. Entries are keyed by a SHA-256 of
+the analyzer version plus the normalized text, so changing any analyzer
+(mood backend, scorer or task extractor version) automatically misses every
+old entry. An in-process LRU sits in front of an optional Mongo tier.
+"""
+import os
+import hashlib
+import unicodedata
+from datetime import datetime
+from utils.cache import TTLCache
+import database.db as database
+
+NLP_CACHE_SIZE = int(os.getenv('NLP_CACHE_SIZE', 2048))
+NLP_CACHE_TTL = int(os.getenv('NLP_CACHE_TTL', 6 * 3600))
+NLP_CACHE_PERSISTENT = os.getenv('NLP_CACHE_PERSISTENT', 'False').lower() in ['true', '1', 't']
+
+
+def normalize_text(text):
+    """
+    Canonical form used both for hashing and for analysis: NFC unicode,
+    unified line endings, no trailing whitespace on lines or around the text.
+    Newlines are kept because task extraction treats them as separators.
+    """
+    text = unicodedata.normalize('NFC', text or '')
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return '\n'.join(line.rstrip() for line in text.split('\n')).strip()
+
+
+def cache_key(normalized_text, version):
+    return hashlib.sha256(f"{version}\x00{normalized_text}".encode('utf-8')).hexdigest()
+
+
+class NLPCache:
+    """Two-tier (memory, then Mongo `nlp_cache` collection) result cache."""
+    def __init__(self, maxsize=NLP_CACHE_SIZE, ttl=NLP_CACHE_TTL, persistent=NLP_CACHE_PERSISTENT):
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.persistent = persistent
+        self.hits = 0
+        self.misses = 0
+        self.persistent_hits = 0
+        self._version = None
+
+    def _check_version(self, version):
+        # Old entries can never be hit again once the version changes;
+        # dropping them just frees the memory sooner.
+        if version != self._version:
+            self.memory.clear()
+            self._version = version
+
+    def get_many(self, keys, version):
+        """Returns {key: result} for every key found in either tier."""
+        self._check_version(version)
+        found = {}
+        for key in keys:
+            value = self.memory.get(key)
+            if value is not None:
+                found[key] = value
+
+        missing = [k for k in keys if k not in found]
+        if missing and self.persistent and database.db is not None:
+            try:
+                for doc in database.db.nlp_cache.find({"_id": {"$in": missing}, "version": version}):
+                    found[doc["_id"]] = doc["result"]
+                    self.memory.set(doc["_id"], doc["result"])
+                    self.persistent_hits += 1
+            except Exception as e:
+                print(f"NLP cache lookup failed: {e}")
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, items, version):
+        """Stores {key: result} in both tiers."""
+        self._check_version(version)
+        for key, value in items.items():
+            self.memory.set(key, value)
+        if items and self.persistent and database.db is not None:
+            from pymongo import ReplaceOne
+            now = datetime.utcnow()
+            try:
+                database.db.nlp_cache.bulk_write([
+                    ReplaceOne({"_id": key}, {"_id": key, "version": version, "result": value, "created_at": now}, upsert=True)
+                    for key, value in items.items()
+                ], ordered=False)
+            except Exception as e:
+                print(f"NLP cache write failed: {e}")
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "version": self._version, "hits": self.hits, "misses": self.misses,
+            "persistent_hits": self.persistent_hits, "memory_size": len(self.memory),
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }
+
+
+nlp_cache = NLPCache()
@@ -1,41 +1,287 @@
-import whisper
-import soundfile as sf
-import numpy as np
-import librosa
+"""
+Local speech-to-text with Whisper.
 
-# Load model once
-whisper_model = whisper.load_model("base")
+whisper (and with it torch), soundfile and scipy are imported, and
+the model loaded, on first use rather than at import time, so importing the
+app stays cheap. Call `warm_up()` to pay that cost up front, e.g. before
+forking server workers.
 
-def transcribe_audio_local(audio_file_path):
+Recordings longer than AUDIO_STREAM_MIN_SECONDS are transcribed in streaming
+mode: the file is read in fixed-size blocks, downmixed and resampled block by
+block, split into segments at silences and transcribed one segment at a time,
+so memory stays constant however long the recording is and partial text is
+available as soon as each segment is done.
+
+The model never downloads at runtime: WHISPER_MODEL is either a path to a
+checkpoint or a model name looked up as <name>.pt in WHISPER_MODEL_DIR. Fetch
+named checkpoints at deploy time with
+
+    python -m nlp.media_analyzer fetch [--model base]
+
+WHISPER_QUANTIZE=int8 swaps the model's Linear layers for dynamically
+int8-quantized ones (CPU only): smaller and usually faster, slightly less
+accurate; compare with benchmarks/bench_whisper.py.
+"""
+import os
+import sys
+import argparse
+import threading
+from nlp.audio_preprocess import WHISPER_RATE, StreamResampler, downmix, load_for_whisper
+
+WHISPER_MODEL = os.getenv('WHISPER_MODEL', 'base')
+WHISPER_MODEL_DIR = os.getenv('WHISPER_MODEL_DIR', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Datasets', 'whisper'))
+WHISPER_QUANTIZE = os.getenv('WHISPER_QUANTIZE', 'none').lower()
+# Identifies the model configuration; cached transcripts are keyed by it
+WHISPER_MODEL_TAG = os.path.basename(WHISPER_MODEL) + ('-int8' if WHISPER_QUANTIZE == 'int8' else '')
+AUDIO_STREAM_MIN_SECONDS = float(os.getenv('AUDIO_STREAM_MIN_SECONDS', 60))
+AUDIO_BLOCK_SECONDS = float(os.getenv('AUDIO_BLOCK_SECONDS', 2))
+AUDIO_SILENCE_DB = float(os.getenv('AUDIO_SILENCE_DB', -40))
+# Whisper decodes 30 s windows; keep segments just under that
+AUDIO_MAX_SEGMENT_SECONDS = float(os.getenv('AUDIO_MAX_SEGMENT_SECONDS', 28))
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def resolve_model_path(model=WHISPER_MODEL, model_dir=WHISPER_MODEL_DIR):
+    """Maps a model name or path to a local checkpoint file; raises if it is not there."""
+    path = model if os.path.sep in model or model.endswith('.pt') else os.path.join(model_dir, f"{model}.pt")
+    if not os.path.isfile(path):
+        raise FileNotFoundError(
+            f"Whisper checkpoint '{path}' not found. Run `python -m nlp.media_analyzer fetch --model {model}` "
+            f"at deploy time or set WHISPER_MODEL to a local .pt file.")
+    return path
+
+
+def quantize_int8(model):
+    """Dynamically quantizes the model's Linear layers to int8 (CPU inference only)."""
+    import torch
+    import whisper.model
+    for module in model.modules():
+        # Whisper's Linear only adds a dtype cast; quantize_dynamic matches the exact nn.Linear type
+        if type(module) is whisper.model.Linear:
+            module.__class__ = torch.nn.Linear
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_whisper_model(model=WHISPER_MODEL, quantize=WHISPER_QUANTIZE, model_dir=WHISPER_MODEL_DIR):
+    """Loads a Whisper checkpoint from local disk, optionally int8-quantized."""
+    import whisper
+    device = 'cpu' if quantize == 'int8' else None
+    loaded = whisper.load_model(resolve_model_path(model, model_dir), device=device)
+    if quantize == 'int8':
+        loaded = quantize_int8(loaded)
+    elif quantize not in ('none', ''):
+        raise ValueError(f"Unknown WHISPER_QUANTIZE '{quantize}'. Use 'none' or 'int8'.")
+    return loaded
+
+
+def configure_threads(threads):
+    """
+    Caps torch's intra-op threads for this process. Transcription workers
+    call it on start-up with their share of the cores so concurrent jobs do
+    not oversubscribe the CPU.
+    """
+    import torch
+    torch.set_num_threads(max(1, int(threads)))
     try:
-        if not audio_file_path.lower().endswith(".wav"):
-            print("ERROR: Only WAV files supported without ffmpeg.")
-            return ""
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # Only settable before torch starts any parallel work
+
+
+def get_whisper_model():
+    """Returns the shared Whisper model, loading it on first call (thread-safe)."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = load_whisper_model()
+    return _model
+
+
+def warm_up():
+    """Imports the audio stack and loads the Whisper model now instead of on the first upload."""
+    import soundfile  # noqa: F401
+    import scipy.signal  # noqa: F401
+    get_whisper_model()
+
+
+# --- Streaming ---
+
+def iter_audio_blocks(audio_file_path, block_seconds=AUDIO_BLOCK_SECONDS, target_sr=WHISPER_RATE):
+    """Yields the recording as mono float32 blocks at `target_sr`, reading one block at a time."""
+    import numpy as np
+    import soundfile as sf
+    info = sf.info(audio_file_path)
+    resampler = StreamResampler(info.samplerate, target_sr)
+    blocksize = max(1, int(info.samplerate * block_seconds))
+    # One downmix buffer for the whole file; the resampler copies what it keeps
+    buffer = np.empty(blocksize, dtype=np.float32)
+    for block in sf.blocks(audio_file_path, blocksize=blocksize, dtype='float32', always_2d=True):
+        out = resampler.process(downmix(block, out=buffer))
+        if len(out):
+            yield out
+    tail = resampler.flush()
+    if len(tail):
+        yield tail
+
+
+class SpeechSegmenter:
+    """
+    Splits a 16 kHz stream into speech segments using frame energy: a
+    segment ends after `min_silence` seconds below `silence_db` (dBFS), or at
+    the quietest recent frame once it reaches `max_segment` seconds.
+    Stretches of pure silence are dropped.
+    """
+    def __init__(self, rate=WHISPER_RATE, frame_ms=30, silence_db=AUDIO_SILENCE_DB,
+                 min_silence=0.6, min_segment=1.0, max_segment=AUDIO_MAX_SEGMENT_SECONDS):
+        import numpy as np
+        self.rate = rate
+        self.frame = int(rate * frame_ms / 1000)
+        self.threshold = 10 ** (silence_db / 20)
+        self.min_silence = int(min_silence * 1000 / frame_ms)
+        self.min_segment = int(min_segment * 1000 / frame_ms)
+        self.max_segment = int(max_segment * 1000 / frame_ms)
+        self.lead_in = int(200 / frame_ms)
+        self._rest = np.zeros(0, dtype=np.float32)
+        self._frames, self._levels = [], []
+        self._voiced = False
+        self._silent_run = 0
+        self._position = 0  # samples already emitted or dropped
+
+    def _emit(self, n_frames):
+        """Returns (start_seconds, samples) for the first n_frames frames and keeps the rest."""
+        import numpy as np
+        samples = np.concatenate(self._frames[:n_frames])
+        start = self._position / self.rate
+        self._position += len(samples)
+        self._frames, self._levels = self._frames[n_frames:], self._levels[n_frames:]
+        self._voiced = any(level >= self.threshold for level in self._levels)
+        self._silent_run = 0
+        return start, samples
+
+    def _drop(self, n_frames):
+        self._position += n_frames * self.frame
+        self._frames, self._levels = self._frames[n_frames:], self._levels[n_frames:]
+
+    def feed(self, samples):
+        """Adds samples; yields (start_seconds, segment) for every segment completed."""
+        import numpy as np
+        data = np.concatenate([self._rest, samples]) if len(self._rest) else samples
+        n_frames = len(data) // self.frame
+        self._rest = data[n_frames * self.frame:]
+        if not n_frames:
+            return
+        frames = data[:n_frames * self.frame].reshape(n_frames, self.frame)
+        levels = np.sqrt(np.mean(frames * frames, axis=1))
+        for frame, level in zip(frames, levels):
+            self._frames.append(frame)
+            self._levels.append(level)
+            if level >= self.threshold:
+                self._voiced = True
+                self._silent_run = 0
+            else:
+                self._silent_run += 1
+                if not self._voiced:
+                    # Leading silence: keep a short lead-in only
+                    if len(self._frames) > self.lead_in:
+                        self._drop(len(self._frames) - self.lead_in)
+                    continue
+                if self._silent_run >= self.min_silence and len(self._frames) >= self.min_segment:
+                    yield self._emit(len(self._frames))
+                    continue
+            if self._voiced and len(self._frames) >= self.max_segment:
+                # No pause long enough: cut at the quietest frame in the last quarter
+                window = self._levels[-(self.max_segment // 4):]
+                yield self._emit(len(self._frames) - len(window) + int(np.argmin(window)) + 1)
+
+    def flush(self):
+        import numpy as np
+        if len(self._rest):
+            self._frames.append(self._rest)
+            self._levels.append(float(np.sqrt(np.mean(self._rest * self._rest))))
+            self._rest = self._rest[:0]
+        if self._frames and any(level >= self.threshold for level in self._levels):
+            yield self._emit(len(self._frames))
+
+
+def iter_transcript_segments(audio_file_path):
+    """
+    Streams a recording through Whisper segment by segment. Yields
+    (start_seconds, end_seconds, text) as each segment is transcribed.
+    """
+    model = get_whisper_model()
+    segmenter = SpeechSegmenter()
+    previous = ""
+
+    def transcribe(start, segment):
+        nonlocal previous
+        # The tail of the previous segment keeps spelling and style consistent across cuts
+        text = model.transcribe(segment, initial_prompt=previous[-200:] or None,
+                                condition_on_previous_text=False).get("text", "").strip()
+        if text:
+            previous = text
+        return start, start + len(segment) / WHISPER_RATE, text
+
+    for block in iter_audio_blocks(audio_file_path):
+        for start, segment in segmenter.feed(block):
+            yield transcribe(start, segment)
+    for start, segment in segmenter.flush():
+        yield transcribe(start, segment)
+
+
+def transcribe_audio_stream(audio_file_path, on_partial=None):
+    """
+    Transcribes a recording in streaming mode and returns the full text.
+    `on_partial(text_so_far, seconds_done)` is called after every segment.
+    """
+    parts = []
+    for _, end, text in iter_transcript_segments(audio_file_path):
+        if text:
+            parts.append(text)
+        if on_partial is not None:
+            on_partial(" ".join(parts), end)
+    return " ".join(parts)
+
+
+def transcribe_audio_local(audio_file_path, on_partial=None):
+    """
+    Transcribes a WAV file and returns the text. Errors (unsupported file,
+    missing checkpoint, decode failures) are raised so the job records them.
+    """
+    if not audio_file_path.lower().endswith(".wav"):
+        raise ValueError("Only WAV files are supported without ffmpeg.")
+
+    import soundfile as sf
 
-        # Read WAV
-        audio, sr = sf.read(audio_file_path)
+    # Long recordings are streamed so memory does not grow with their length
+    if sf.info(audio_file_path).duration > AUDIO_STREAM_MIN_SECONDS:
+        return transcribe_audio_stream(audio_file_path, on_partial)
 
-        # Convert stereo -> mono
-        if len(audio.shape) > 1:
-            audio = np.mean(audio, axis=1)
+    # Read as float32, downmix and resample to 16 kHz mono (what Whisper expects)
+    audio = load_for_whisper(audio_file_path)
 
-        # Resample to 16kHz
-        if sr != 16000:
-            audio = librosa.resample(audio, orig_sr=sr, target_sr=16000)
+    result = get_whisper_model().transcribe(audio)
+    text = result.get("text", "")
+    if on_partial is not None:
+        on_partial(text, len(audio) / WHISPER_RATE)
+    return text
 
-        # Convert to float32 (Whisper expects float32)
-        audio = np.asarray(audio, dtype=np.float32)
 
-        # Whisper requires 1D array
-        if audio.ndim != 1:
-            audio = audio.flatten()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage local Whisper checkpoints.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    fetch = sub.add_parser('fetch', help="Download a named checkpoint into WHISPER_MODEL_DIR.")
+    fetch.add_argument('--model', default=WHISPER_MODEL)
+    args = parser.parse_args(argv)
 
-        print(f"DEBUG: audio dtype={audio.dtype}, shape={audio.shape}")
+    import whisper
+    whisper.load_model(args.model, device='cpu', download_root=WHISPER_MODEL_DIR)
+    print(f"Saved '{args.model}' to {resolve_model_path(args.model)}")
+    return 0
 
-        # Transcribe using numpy array (force dtype float32)
-        result = whisper_model.transcribe(audio)
-        return result.get("text", "")
 
-    except Exception as e:
-        print(f"ERROR during Whisper transcription: {e}")
-        return ""
+if __name__ == "__main__":
+    sys.exit(main())
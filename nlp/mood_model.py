@@ -0,0 +1,157 @@
+"""
+Trained mood classifier (TF-IDF + LogisticRegression) built from the bundled
+Emotion dataset, usable as an alternative backend to TextBlob's thresholds.
+
+Build the artifact offline with:
+
+    python -m nlp.mood_model build
+
+and select it at runtime with MOOD_BACKEND=classifier.
+"""
+import os
+import sys
+import csv
+import pickle
+import hashlib
+import argparse
+import time
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TRAIN_PATH = os.path.join(BASE_DIR, 'Datasets', 'Emotion', 'train_converted.csv')
+DEFAULT_TEST_PATH = os.path.join(BASE_DIR, 'Datasets', 'Emotion', 'test_converted.csv')
+DEFAULT_MODEL_PATH = os.path.join(BASE_DIR, 'Datasets', 'Emotion', 'mood_model.pkl')
+MOOD_MODEL_PATH = os.getenv('MOOD_MODEL_PATH', DEFAULT_MODEL_PATH)
+
+
+class MoodClassifier:
+    """
+    A fitted vectorizer plus the linear model's weights. Scoring a batch is
+    one vectorizer transform and one sparse-by-dense matrix multiply.
+    """
+    def __init__(self, vectorizer, classes, weights, bias, version):
+        self.vectorizer = vectorizer
+        self.classes = list(classes)
+        self.weights = weights  # shape (n_features, n_classes)
+        self.bias = bias        # shape (n_classes,)
+        self.version = version
+        self._pos = self.classes.index('positive') if 'positive' in self.classes else None
+        self._neg = self.classes.index('negative') if 'negative' in self.classes else None
+
+    def predict_proba(self, texts):
+        """Returns an (n_texts, n_classes) array of class probabilities."""
+        X = self.vectorizer.transform(texts)
+        scores = np.asarray(X @ self.weights) + self.bias
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+    def predict(self, texts):
+        """
+        Returns a list of (polarity, mood) tuples. Polarity is
+        P(positive) - P(negative), so it stays on TextBlob's -1..1 scale.
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        proba = self.predict_proba(texts)
+        labels = proba.argmax(axis=1)
+        polarity = np.zeros(len(texts))
+        if self._pos is not None:
+            polarity += proba[:, self._pos]
+        if self._neg is not None:
+            polarity -= proba[:, self._neg]
+        return [(float(p), self.classes[i]) for p, i in zip(polarity, labels)]
+
+
+def _read_dataset(path):
+    texts, labels = [], []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if row.get('text') and row.get('mood'):
+                texts.append(row['text'])
+                labels.append(row['mood'])
+    return texts, labels
+
+
+def _file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def build_model(train_path=DEFAULT_TRAIN_PATH, out_path=DEFAULT_MODEL_PATH,
+                test_path=DEFAULT_TEST_PATH, max_features=5000):
+    """Trains the classifier on the Emotion dataset and pickles it to `out_path`."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+
+    texts, labels = _read_dataset(train_path)
+    start = time.perf_counter()
+    vectorizer = TfidfVectorizer(stop_words="english", max_features=max_features)
+    X = vectorizer.fit_transform(texts)
+    model = LogisticRegression(max_iter=1000)
+    model.fit(X, labels)
+    print(f"Trained on {len(texts)} texts in {time.perf_counter() - start:.2f}s")
+
+    weights = model.coef_.T.astype(np.float64)
+    bias = model.intercept_.astype(np.float64)
+    if weights.shape[1] == 1:
+        # Binary LogisticRegression stores a single column; softmax over
+        # [0, z] gives the same probabilities as the sigmoid of z.
+        weights = np.hstack([np.zeros_like(weights), weights])
+        bias = np.concatenate([[0.0], bias])
+
+    version = f"{_file_digest(train_path)[:12]}-{max_features}"
+    classifier = MoodClassifier(vectorizer, model.classes_, weights, bias, version)
+
+    if test_path and os.path.exists(test_path):
+        test_texts, test_labels = _read_dataset(test_path)
+        predicted = [mood for _, mood in classifier.predict(test_texts)]
+        accuracy = sum(p == t for p, t in zip(predicted, test_labels)) / max(1, len(test_labels))
+        print(f"Held-out accuracy on {len(test_labels)} texts: {accuracy:.4f}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    artifact = {
+        'vectorizer': vectorizer, 'classes': list(model.classes_),
+        'weights': weights, 'bias': bias, 'version': version,
+    }
+    with open(out_path, 'wb') as f:
+        pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+    print(f"Saved mood model {version} to {out_path}")
+    return classifier
+
+
+def load_model(path=None):
+    """Loads a classifier previously written by `build_model`."""
+    path = path or MOOD_MODEL_PATH
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"Mood model not found at {path}. Build it with: python -m nlp.mood_model build"
+        )
+    with open(path, 'rb') as f:
+        artifact = pickle.load(f)
+    return MoodClassifier(artifact['vectorizer'], artifact['classes'],
+                          artifact['weights'], artifact['bias'], artifact['version'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the trained mood classifier.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help="Train on the Emotion dataset and save the artifact.")
+    build.add_argument('--train', default=DEFAULT_TRAIN_PATH)
+    build.add_argument('--test', default=DEFAULT_TEST_PATH)
+    build.add_argument('--out', default=MOOD_MODEL_PATH)
+    build.add_argument('--max-features', type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        build_model(args.train, args.out, args.test, args.max_features)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
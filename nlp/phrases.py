@@ -0,0 +1,54 @@
+"""
+Bigram extraction shared by prompt generation and the per-user phrase
+statistics kept in database.db.
+
+Text is lower-cased and stripped to letters and whitespace, then split into
+overlapping word pairs. Pure Python and import-free, so database.db can use
+it on every write without pulling in the NLP models.
+"""
+import re
+from collections import Counter
+
+STOP_WORDS = [
+    'a', 'about', 'am', 'an', 'and', 'are', 'as', 'at', 'be', 'been', 'being', 'but',
+    'by', 'can', 'did', 'do', 'does', 'doing', 'don', 'for', 'from', 'had', 'has',
+    'have', 'having', 'he', 'her', 'him', 'his', 'i', 'if', 'in', 'is', 'it', 'its',
+    'just', 'me', 'my', 'myself', 'now', 'of', 'off', 'on', 'or', 'our', 'ours',
+    's', 'she', 'should', 'so', 't', 'that', 'the', 'their', 'them', 'then',
+    'these', 'they', 'this', 'those', 'to', 'too', 'was', 'we', 'were', 'what',
+    'which', 'who', 'whom', 'will', 'with', 'you', 'your', 'yours', 'today',
+    'yesterday', 'tomorrow'
+]
+_STOP_SET = frozenset(STOP_WORDS)
+_NON_LETTERS = re.compile(r'[^a-zA-Z\s]')
+
+
+def clean_text(text):
+    return _NON_LETTERS.sub('', (text or '').lower())
+
+
+def find_phrases(text, phrase_length=2):
+    words = text.split()
+    if len(words) < phrase_length:
+        return []
+    return [' '.join(words[i:i + phrase_length]) for i in range(len(words) - phrase_length + 1)]
+
+
+def has_stop_word(phrase):
+    return any(w in _STOP_SET for w in phrase.split())
+
+
+def all_stop_words(phrase):
+    return all(w in _STOP_SET for w in phrase.split())
+
+
+def phrase_tf(text):
+    """
+    Term frequencies of the bigrams in one raw entry: {phrase: count / words}.
+    Phrases made only of stop words are left out; they never become topics.
+    """
+    words = clean_text(text).split()
+    if len(words) < 2:
+        return {}
+    counts = Counter(' '.join(words[i:i + 2]) for i in range(len(words) - 1))
+    return {p: c / len(words) for p, c in counts.items() if not all_stop_words(p)}
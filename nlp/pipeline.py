@@ -0,0 +1,64 @@
+"""
+Runs the three NLP stages (mood, productivity, tasks) for journal text,
+skipping all of them when a cached result exists for the same text and
+analyzer version.
+"""
+from nlp.analysis import engine, analyze_texts
+from nlp.scorer import get_scorer
+from nlp.task_extractor import extract_tasks, EXTRACTOR_VERSION
+from nlp.cache import nlp_cache, normalize_text, cache_key
+
+
+def analyzer_version():
+    """Combined version of every stage; part of every cache key."""
+    return f"mood:{engine.version}|score:{get_scorer().tag}|tasks:{EXTRACTOR_VERSION}"
+
+
+def warm_up():
+    """Loads the mood analyzers and scorer so the first request does not pay for it."""
+    engine.warm_up()
+    get_scorer().score_many(["warm up"])
+
+
+def _run_stages(texts):
+    analyses = analyze_texts(texts)
+    scorer = get_scorer()
+    scores = scorer.score_many(texts) if len(texts) > 1 else [scorer.score(t) for t in texts]
+    return [
+        {
+            "analysis": analysis,
+            "mood": analysis["mood"],
+            "productivity": score,
+            "tasks": extract_tasks(text),
+        }
+        for text, analysis, score in zip(texts, analyses, scores)
+    ]
+
+
+def analyze_entries(texts, use_cache=True):
+    """
+    Analyzes many texts. Returns one dict per text with keys
+    'analysis', 'mood', 'productivity' and 'tasks'.
+    """
+    normalized = [normalize_text(t) for t in texts]
+    if not use_cache:
+        return _run_stages(normalized)
+
+    version = analyzer_version()
+    keys = [cache_key(t, version) for t in normalized]
+    found = nlp_cache.get_many(list(dict.fromkeys(keys)), version)
+
+    todo = {}
+    for key, text in zip(keys, normalized):
+        if key not in found:
+            todo.setdefault(key, text)
+    if todo:
+        computed = dict(zip(todo.keys(), _run_stages(list(todo.values()))))
+        nlp_cache.set_many(computed, version)
+        found.update(computed)
+    return [found[key] for key in keys]
+
+
+def analyze_entry(text, use_cache=True):
+    """Single-text version of `analyze_entries`."""
+    return analyze_entries([text], use_cache=use_cache)[0]
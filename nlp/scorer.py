@@ -1,30 +1,160 @@
+import os
 import re
+import ast
+import csv
+from utils.scorer import SIMPLE_KEYWORDS, SIMPLE_SCORER_VERSION, combine_simple, productivity_score
 
-def custom_productivity_score(text):
+# Bump whenever the scoring formula or keyword list changes.
+SCORER_VERSION = "2"
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PRODUCTIVITY_KEYWORDS_PATH = os.getenv(
+    'PRODUCTIVITY_KEYWORDS_PATH', os.path.join(BASE_DIR, 'Datasets', 'productivity', 'productivity.csv')
+)
+DEFAULT_PRODUCTIVITY_KEYWORDS = [
+    'complete', 'completed', 'finished', 'done', 'achieved', 'accomplished', 'organized',
+    'planned', 'worked', 'progress', 'improve', 'improved', 'fixed', 'solved', 'resolved',
+    'created', 'built', 'started', 'developed', 'designed', 'reviewed', 'prepared', 'submitted'
+]
+
+WORD_RE = re.compile(r'\w+')
+
+
+def load_productivity_keywords(path=PRODUCTIVITY_KEYWORDS_PATH):
     """
-    Calculates a productivity score based on the density of "action" keywords
-    and the length of the journal entry.
+    Loads the keyword list from `path`. The bundled file is a Python-style
+    list literal; a plain CSV (comma- or newline-separated words) works too.
+    Falls back to the built-in list if the file is missing or empty.
     """
-    text = text.lower()
-    productivity_keywords = [
-        'complete', 'completed', 'finished', 'done', 'achieved', 'accomplished', 'organized',
-        'planned', 'worked', 'progress', 'improve', 'improved', 'fixed', 'solved', 'resolved',
-        'created', 'built', 'started', 'developed', 'designed', 'reviewed', 'prepared', 'submitted'
-    ]
-    
-    # Count how many productivity keywords are in the text
-    keyword_count = sum(text.count(word) for word in productivity_keywords)
-    
-    words = re.findall(r'\w+', text)
+    try:
+        with open(path, encoding='utf-8') as f:
+            raw = f.read()
+    except OSError:
+        return list(DEFAULT_PRODUCTIVITY_KEYWORDS)
+
+    try:
+        words = ast.literal_eval(raw)
+    except (ValueError, SyntaxError):
+        words = [cell for row in csv.reader(raw.splitlines()) for cell in row]
+    keywords = [str(w).strip().lower() for w in words if str(w).strip()]
+    return keywords or list(DEFAULT_PRODUCTIVITY_KEYWORDS)
+
+
+PRODUCTIVITY_KEYWORDS = frozenset(load_productivity_keywords())
+
+
+def _score_tokens(words):
     word_count = len(words)
-    
     if word_count == 0:
         return 0.0
-        
+
+    # Whole-word matches only: "done" no longer fires inside "abandoned",
+    # and "completed" counts once rather than also as "complete".
+    keyword_count = sum(map(PRODUCTIVITY_KEYWORDS.__contains__, words))
+
     # Calculate keyword density and add a bonus for longer entries
     keyword_density = keyword_count / word_count
     length_bonus = min(word_count / 100, 0.3) # Bonus caps out at 0.3
-    
+
     # The final score is the sum, capped at a max of 1.0
     score = min(keyword_density + length_bonus, 1.0)
     return round(score, 3)
+
+
+def custom_productivity_score(text):
+    """
+    Calculates a productivity score based on the density of "action" keywords
+    and the length of the journal entry. The text is tokenized once and
+    keywords are counted against a precomputed set in the same pass.
+    """
+    return _score_tokens(WORD_RE.findall(text.lower()))
+
+
+def custom_productivity_scores(texts):
+    """Batch version of `custom_productivity_score` for rescoring many entries."""
+    findall = WORD_RE.findall
+    return [_score_tokens(findall(text.lower())) for text in texts]
+
+
+# --- Scorer registry ---
+# Every productivity formula is registered under a name and version so stored
+# scores can be tagged ("custom@2") and recomputed when a formula changes.
+
+class Scorer:
+    """
+    A versioned productivity scorer. `combine` turns a keyword-count matrix
+    (one row per text, one column per keyword) and a word-count vector into
+    scores with array operations, so whole batches are scored at once.
+    """
+    def __init__(self, name, version, keywords, combine, tokenize=WORD_RE.findall, score_one=None):
+        self.name = name
+        self.version = str(version)
+        self.keywords = tuple(keywords)
+        self.combine = combine
+        self.tokenize = tokenize
+        self._score_one = score_one
+        self._columns = {kw: i for i, kw in enumerate(self.keywords)}
+
+    @property
+    def tag(self):
+        return f"{self.name}@{self.version}"
+
+    def count_matrix(self, texts):
+        """Tokenizes each text once; returns (keyword_counts, word_counts) arrays."""
+        import numpy as np
+        columns, tokenize = self._columns, self.tokenize
+        n_keywords = len(self.keywords)
+        word_counts = []
+        flat_index = []
+        for row, text in enumerate(texts):
+            words = tokenize(text.lower())
+            word_counts.append(len(words))
+            offset = row * n_keywords
+            flat_index.extend(offset + columns[w] for w in words if w in columns)
+        counts = np.bincount(np.asarray(flat_index, dtype=np.int64), minlength=len(word_counts) * n_keywords)
+        return counts.reshape(len(word_counts), n_keywords), np.asarray(word_counts, dtype=np.float64)
+
+    def score_many(self, texts):
+        texts = list(texts)
+        if not texts:
+            return []
+        counts, word_counts = self.count_matrix(texts)
+        return [round(float(s), 3) for s in self.combine(counts, word_counts)]
+
+    def score(self, text):
+        """Scores one text, using the scalar implementation when there is one."""
+        if self._score_one is not None:
+            return self._score_one(text)
+        return self.score_many([text])[0]
+
+
+def _combine_custom(counts, word_counts):
+    import numpy as np
+    safe = np.where(word_counts > 0, word_counts, 1.0)
+    density = counts.sum(axis=1) / safe
+    length_bonus = np.minimum(word_counts / 100, 0.3)
+    scores = np.minimum(density + length_bonus, 1.0)
+    return np.where(word_counts > 0, scores, 0.0)
+
+
+SCORERS = {}
+DEFAULT_SCORER = os.getenv('PRODUCTIVITY_SCORER', 'custom')
+
+
+def register_scorer(scorer):
+    SCORERS[scorer.name] = scorer
+    return scorer
+
+
+def get_scorer(name=None):
+    """Returns the scorer registered under `name` (default: PRODUCTIVITY_SCORER)."""
+    name = name or DEFAULT_SCORER
+    if name not in SCORERS:
+        raise ValueError(f"Unknown productivity scorer '{name}'. Registered: {sorted(SCORERS)}")
+    return SCORERS[name]
+
+
+register_scorer(Scorer('custom', SCORER_VERSION, sorted(PRODUCTIVITY_KEYWORDS), _combine_custom,
+                       score_one=custom_productivity_score))
+register_scorer(Scorer('simple', SIMPLE_SCORER_VERSION, SIMPLE_KEYWORDS, combine_simple,
+                       tokenize=str.split, score_one=productivity_score))
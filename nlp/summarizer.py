@@ -47,8 +47,9 @@ def generate_rule_based_summary(entries: List[Dict[str, Any]]) -> Dict[str, Any]
     completed_tasks = 0
 
     for entry in entries:
-        mood = entry.get('mood', 'neutral').lower()
-        productivity = float(entry.get('productivity', 0))
+        # Entries still awaiting analysis have mood/productivity set to None
+        mood = (entry.get('mood') or 'neutral').lower()
+        productivity = float(entry.get('productivity') or 0)
 
         # Count mood
         if mood in mood_counts:
@@ -1,22 +1,47 @@
 import re
 
+# Bump whenever the patterns or the clean-up rules change.
+EXTRACTOR_VERSION = "2"
+
+# Both task patterns compiled once into a single alternation, so the text is
+# scanned in one pass and a phrase can only be matched by one of them:
+#   - "need to do X", "must finish Y", ...
+#   - "todo: Z", "to-do: A"
+TASK_RE = re.compile(
+    r"\b(?:"
+    r"(?:need to|have to|must|should|want to|planning to|plan to|aim to|try to)\s+(?P<intent>.*?)"
+    r"|(?:to[- ]do|todo)[^\w]*(?P<todo>.*?)"
+    r")(?:[.!\n]|$)",
+    re.IGNORECASE
+)
+
+
+def normalize_task(task):
+    """Collapses whitespace and trims trailing punctuation from a task string."""
+    return ' '.join(task.split()).rstrip('.!,;:')
+
+
+def iter_tasks(text):
+    """
+    Yields the tasks found in `text` in reading order, normalized and with
+    case-insensitive duplicates removed.
+    """
+    seen = set()
+    for match in TASK_RE.finditer(text):
+        task = normalize_task(match.group('intent') or match.group('todo') or '')
+        key = task.casefold()
+        if task and key not in seen:
+            seen.add(key)
+            yield task
+
+
 def extract_tasks(text):
     """
     Extracts potential tasks from text using a list of common patterns.
     """
-    # Patterns to identify phrases that likely indicate a task
-    task_patterns = [
-        # Matches phrases like "need to do X", "must finish Y"
-        r"\b(?:need to|have to|must|should|want to|planning to|plan to|aim to|try to)\s+(.*?)(?:[.!\n]|$)",
-        # Matches phrases like "todo: Z" or "to-do: A"
-        r"\b(?:to[- ]do|todo)[^\w]*(.*?)(?:[.!\n]|$)"
-    ]
-    tasks = []
-    for pattern in task_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        for match in matches:
-            # Clean up the extracted task text
-            task = match.strip().rstrip('.!')
-            if task:
-                tasks.append(task)
-    return tasks
+    return list(iter_tasks(text))
+
+
+def extract_tasks_batch(texts):
+    """Extracts tasks for many texts; returns one list of tasks per text."""
+    return [list(iter_tasks(text)) for text in texts]
@@ -1,29 +1,9 @@
-import re
 from collections import Counter
 import random
 import math
 from bson import ObjectId
-from database.db import db
-
-# --- STOP WORDS ---
-STOP_WORDS = [
-    'a', 'about', 'am', 'an', 'and', 'are', 'as', 'at', 'be', 'been', 'being', 'but',
-    'by', 'can', 'did', 'do', 'does', 'doing', 'don', 'for', 'from', 'had', 'has',
-    'have', 'having', 'he', 'her', 'him', 'his', 'i', 'if', 'in', 'is', 'it', 'its',
-    'just', 'me', 'my', 'myself', 'now', 'of', 'off', 'on', 'or', 'our', 'ours',
-    's', 'she', 'should', 'so', 't', 'that', 'the', 'their', 'them', 'then',
-    'these', 'they', 'this', 'those', 'to', 'too', 'was', 'we', 'were', 'what',
-    'which', 'who', 'whom', 'will', 'with', 'you', 'your', 'yours', 'today',
-    'yesterday', 'tomorrow'
-]
-
-# --- HELPER: Find word pairs (phrases) ---
-def find_phrases(text, phrase_length=2):
-    words = text.split()
-    if len(words) < phrase_length:
-        return []
-    return [' '.join(words[i:i + phrase_length]) for i in range(len(words) - phrase_length + 1)]
-
+from database.db import db, get_phrase_totals, get_latest_entry, get_phrase_doc_freqs, get_top_phrases
+from nlp.phrases import STOP_WORDS, clean_text, find_phrases, has_stop_word
 
 # --- HELPER: Compute top TF-IDF phrases ---
 def get_top_tf_idf_phrases(docs):
@@ -36,11 +16,8 @@ def get_top_tf_idf_phrases(docs):
 
     doc_count = len(docs)
     phrase_doc_counts = Counter()
-    all_phrases = set(p for doc_tf in tf_scores for p in doc_tf)
-    for phrase in all_phrases:
-        for doc_tf in tf_scores:
-            if phrase in doc_tf:
-                phrase_doc_counts[phrase] += 1
+    for doc_tf in tf_scores:
+        phrase_doc_counts.update(doc_tf.keys())
 
     idf_scores = {phrase: math.log(doc_count / (1 + count)) for phrase, count in phrase_doc_counts.items()}
     tfidf_scores = Counter()
@@ -51,11 +28,54 @@ def get_top_tf_idf_phrases(docs):
     return [phrase for phrase, score in tfidf_scores.most_common(5)]
 
 
+# --- HELPER: Prompt wording for recurring topics ---
+def latest_topic_prompt(topic):
+    return f"In your last entry, you mentioned '{topic}'. Could you explore that thought a bit more?"
+
+
+def topic_prompt(topic, avg_mood):
+    if avg_mood > 0.2:
+        return f"The topic of '{topic}' seems to be a source of positivity for you. How can you cultivate more of that?"
+    if avg_mood < -0.2:
+        return f"Regarding '{topic}', which has been on your mind, what's one positive outcome you'd like to work towards?"
+    return f"'{topic}' has been a consistent theme. What is your next intended step regarding this?"
+
+
+# --- Topic prompts from precomputed phrase statistics ---
+def stats_prompts(user_id):
+    """
+    Topic prompts for one user from the phrase_stats counters kept by
+    database.db, covering all of their analysed entries. Returns None when the
+    counters have not been built for this user, so the caller can fall back.
+    """
+    entry_count = get_phrase_totals(user_id)
+    if entry_count is None:
+        return None
+    prompts = []
+
+    # LAYER 1: phrases in the latest entry that no other entry contains
+    latest = get_latest_entry(user_id)
+    if latest and entry_count > 1:
+        latest_phrases = set(p for p in find_phrases(clean_text(latest.get("text")), 2) if not has_stop_word(p))
+        own_count = 1 if latest.get("mood") is not None else 0  # pending entries are not counted yet
+        doc_freqs = get_phrase_doc_freqs(user_id, latest_phrases)
+        unique_latest_phrases = [p for p in latest_phrases if doc_freqs.get(p, 0) <= own_count]
+        if unique_latest_phrases:
+            prompts.append(latest_topic_prompt(random.choice(unique_latest_phrases)))
+
+    # LAYER 2: recurring topics, by tf-idf over the user's whole history
+    if entry_count > 2:
+        for stat in get_top_phrases(user_id, entry_count):
+            prompts.append(topic_prompt(stat["phrase"], stat["mood_sum"] / stat["df"]))
+    return prompts
+
+
 # --- MAIN FUNCTION: Generate intelligent prompt ---
 def generate_prompt(user_id=None):
     """
     Generates a varied, intelligent, and positive prompt using MongoDB journal entries.
-    If user_id is provided, only fetch that user's entries; else, fetch recent entries from all users.
+    If user_id is provided, topics come from that user's precomputed phrase
+    statistics; else (or before they are built), from the 30 most recent entries.
     """
     encouraging_thoughts = [
         "What is one small thing you can do today that your future self will thank you for?",
@@ -79,6 +99,9 @@ def generate_prompt(user_id=None):
     if db is None:
         return random.choice(encouraging_thoughts)
     if user_id:
+        topic_prompts = stats_prompts(user_id)
+        if topic_prompts is not None:
+            return random.choice(encouraging_thoughts + topic_prompts)
         try:
             query["user_id"] = ObjectId(user_id)
         except Exception:
@@ -90,10 +113,7 @@ def generate_prompt(user_id=None):
     possible_prompts = list(encouraging_thoughts)
 
     # Preprocess documents
-    all_docs = [
-        re.sub(r'[^a-zA-Z\s]', '', entry.get("text", "").lower())
-        for entry in recent_entries if "text" in entry
-    ]
+    all_docs = [clean_text(entry["text"]) for entry in recent_entries if "text" in entry]
 
     # --- LAYER 1: React to latest entry topic ---
     if len(all_docs) > 1:
@@ -101,15 +121,13 @@ def generate_prompt(user_id=None):
         historical_docs = all_docs[1:]
         latest_phrases = set(
             p for p in find_phrases(latest_entry_doc, 2)
-            if not any(w in STOP_WORDS for w in p.split())
+            if not has_stop_word(p)
         )
         historical_phrases = set(p for doc in historical_docs for p in find_phrases(doc, 2))
         unique_latest_phrases = latest_phrases - historical_phrases
         if unique_latest_phrases:
             topic = random.choice(list(unique_latest_phrases))
-            possible_prompts.append(
-                f"In your last entry, you mentioned '{topic}'. Could you explore that thought a bit more?"
-            )
+            possible_prompts.append(latest_topic_prompt(topic))
 
     # --- LAYER 2: Historical trend-based prompts ---
     if len(recent_entries) > 2:
@@ -124,14 +142,6 @@ def generate_prompt(user_id=None):
 
             mood_map = {'positive': 1, 'neutral': 0, 'negative': -1}
             avg_mood = sum(mood_map.get(e.get("mood", "neutral"), 0) for e in topic_entries) / len(topic_entries)
-
-            if avg_mood > 0.2:
-                prompt = f"The topic of '{topic}' seems to be a source of positivity for you. How can you cultivate more of that?"
-            elif avg_mood < -0.2:
-                prompt = f"Regarding '{topic}', which has been on your mind, what's one positive outcome you'd like to work towards?"
-            else:
-                prompt = f"'{topic}' has been a consistent theme. What is your next intended step regarding this?"
-
-            possible_prompts.append(prompt)
+            possible_prompts.append(topic_prompt(topic, avg_mood))
 
     return random.choice(possible_prompts)
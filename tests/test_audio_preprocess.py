@@ -0,0 +1,45 @@
+"""
+Streaming resampler checks for the Whisper preprocessing stage.
+
+    python -m pytest tests/test_audio_preprocess.py
+"""
+import os
+import sys
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+from nlp.audio_preprocess import WHISPER_RATE, StreamResampler, resample
+
+
+def _stream(signal, sr, block=4096):
+    resampler = StreamResampler(sr)
+    chunks = [resampler.process(signal[i:i + block]) for i in range(0, len(signal), block)]
+    chunks.append(resampler.flush())
+    return np.concatenate(chunks)
+
+
+def _tone(sr, seconds=3.0):
+    t = np.arange(int(sr * seconds)) / sr
+    return (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+
+def test_stream_at_whisper_rate_passes_through():
+    signal = _tone(WHISPER_RATE)
+    out = _stream(signal, WHISPER_RATE)
+    assert out.dtype == np.float32
+    np.testing.assert_array_equal(out, signal)
+
+
+@pytest.mark.parametrize("sr", [8000, 22050, 44100, 48000])
+def test_stream_matches_one_shot_resample(sr):
+    signal = _tone(sr)
+    streamed = _stream(signal, sr)
+    whole = resample(signal, sr)
+    assert len(streamed) == len(whole)
+    np.testing.assert_allclose(streamed, whole, atol=1e-5)
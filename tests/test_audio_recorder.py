@@ -0,0 +1,116 @@
+"""
+Recorder and ring buffer checks, driven by a fake input stream instead of a
+microphone.
+
+    python -m pytest tests/test_audio_recorder.py
+"""
+import os
+import sys
+import time
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+np = pytest.importorskip("numpy")
+sf = pytest.importorskip("soundfile")
+
+from audio_recorder import Recorder, RingBuffer
+
+
+class FakeStream:
+    """Stands in for sounddevice.InputStream; `feed` delivers a block to the recorder's callback."""
+    def __init__(self, samplerate, channels, callback):
+        self.channels = channels
+        self.callback = callback
+        self.started = self.closed = False
+
+    def start(self):
+        self.started = True
+
+    def stop(self):
+        self.started = False
+
+    def close(self):
+        self.closed = True
+
+    def feed(self, block, status=None):
+        self.callback(block.reshape(-1, self.channels), len(block), None, status)
+
+
+def _ramp(start, frames):
+    # Distinct, exactly representable 16-bit values so the WAV can be compared sample by sample
+    return (np.arange(start, start + frames, dtype=np.float32) / 1024).reshape(-1, 1)
+
+
+def _wait_for(recorder, frames, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while recorder.frames_written < frames and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert recorder.frames_written == frames
+
+
+def test_ring_buffer_wraps_around_the_end():
+    ring = RingBuffer(5, 1)
+    out = np.zeros((5, 1), dtype=np.float32)
+    ring.write(np.array([[1], [2], [3]], dtype=np.float32))
+    assert ring.read_into(out[:2]) == 2
+    np.testing.assert_array_equal(out[:2, 0], [1, 2])
+
+    # Starts at index 3 and continues at index 0
+    ring.write(np.array([[4], [5], [6], [7]], dtype=np.float32))
+    assert ring.dropped == 0
+    assert ring.read_into(out) == 5
+    np.testing.assert_array_equal(out[:, 0], [3, 4, 5, 6, 7])
+    assert ring.read_into(out, timeout=0.01) == 0
+
+
+def test_ring_buffer_drops_what_does_not_fit():
+    ring = RingBuffer(4, 1)
+    out = np.zeros((4, 1), dtype=np.float32)
+    ring.write(np.array([[1], [2], [3]], dtype=np.float32))
+    ring.write(np.array([[4], [5], [6]], dtype=np.float32))
+    assert ring.dropped == 2
+    assert ring.read_into(out) == 4
+    np.testing.assert_array_equal(out[:, 0], [1, 2, 3, 4])
+
+
+def test_recorder_pause_resume_and_overflow(tmp_path):
+    streams = []
+
+    def factory(samplerate, channels, callback):
+        streams.append(FakeStream(samplerate, channels, callback))
+        return streams[-1]
+
+    path = str(tmp_path / "entry.wav")
+    # 100-frame ring, drained 32 frames at a time
+    recorder = Recorder(path, samplerate=1000, channels=1, buffer_seconds=0.1, chunk_frames=32,
+                        stream_factory=factory)
+    recorder.start()
+    stream = streams[0]
+    assert stream.started and recorder.is_recording
+
+    first = _ramp(0, 60)
+    stream.feed(first)
+    _wait_for(recorder, 60)
+
+    recorder.pause()
+    stream.feed(_ramp(100, 40))
+    recorder.resume()
+
+    # Larger than the (now empty) ring: the first 100 frames are kept, 50 dropped
+    overflow = _ramp(200, 150)
+    stream.feed(overflow, status="input overflow")
+    _wait_for(recorder, 160)
+
+    assert recorder.stop() == path
+    assert stream.closed and not recorder.is_recording
+    assert recorder.frames_written == 160
+    assert recorder.dropped_frames == 50
+    assert recorder.status_errors == 1
+    assert recorder.duration == pytest.approx(0.16)
+
+    data, samplerate = sf.read(path, dtype='float32', always_2d=True)
+    assert samplerate == 1000
+    np.testing.assert_array_equal(data, np.concatenate([first, overflow[:100]]))
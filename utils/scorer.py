@@ -1,6 +1,14 @@
+SIMPLE_KEYWORDS = ['completed', 'organized', 'productive', 'focus', 'achieved', 'goal']
+SIMPLE_SCORER_VERSION = "1"
+
 
 def productivity_score(text):
-    keywords = ['completed', 'organized', 'productive', 'focus', 'achieved', 'goal']
     words = text.lower().split()
-    score = sum(word in words for word in keywords)
+    score = sum(word in words for word in SIMPLE_KEYWORDS)
     return min(score / 5, 1.0)
+
+
+def combine_simple(counts, word_counts):
+    """Array form of `productivity_score`, used by the scorer registry in nlp.scorer."""
+    import numpy as np
+    return np.minimum((counts > 0).sum(axis=1) / 5, 1.0)
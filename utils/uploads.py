@@ -0,0 +1,66 @@
+import os
+import time
+import hashlib
+import tempfile
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def save_upload(stream, directory, max_bytes, suffix=''):
+    """
+    Copies an upload stream to a new, uniquely named file in `directory`,
+    hashing it on the way. Returns (path, sha256 hex digest, size). Raises
+    UploadTooLarge, after removing the partial file, once more than
+    `max_bytes` have been read.
+    """
+    os.makedirs(directory, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix='upload-', suffix=suffix, dir=directory)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes.")
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        remove_quietly(path)
+        raise
+    return path, digest.hexdigest(), size
+
+
+def remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def cleanup_stale_uploads(directory, max_age_hours=24, keep=()):
+    """
+    Deletes leftover upload files (e.g. from a crashed worker) older than
+    `max_age_hours`, except the paths in `keep`.
+    """
+    if not os.path.isdir(directory):
+        return 0
+    cutoff = time.time() - max_age_hours * 3600
+    keep = {os.path.abspath(path) for path in keep}
+    removed = 0
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if name.startswith('upload-') and os.path.abspath(path) not in keep and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed